@@ -6,7 +6,7 @@ from django.urls import reverse
 
 from solutions.models import Solution
 from tasks.models import Task
-from attestation.models import Attestation
+from attestation.models import Attestation, RatingScale, RatingScaleItem
 
 class TestViews(TestCase):
     def setUp(self):
@@ -76,3 +76,19 @@ class TestTrainerViews(TestCase):
     def test_rating_export(self):
         response = self.client.get(reverse('rating_export'))
         self.assertEqual(response.status_code, 200)
+
+    def test_statistics_with_phase_timings(self):
+        from checker.basemodels import CheckerResult
+        from checker.checker.TextChecker import TextChecker
+        solution = Solution.objects.all()[0]
+        scale = RatingScale.objects.create(name = 'marks')
+        RatingScaleItem.objects.create(scale = scale, name = 'A', position = 0)
+        solution.task.final_grade_rating_scale = scale
+        solution.task.save()
+        checker = TextChecker.objects.create(task = solution.task, order = 0, text = 'System.out')
+        for runtime in (10, 30):
+            CheckerResult.objects.create(checker = checker, solution = solution, log = '', runtime = runtime,
+                                         timings = {'phases': {'setup': runtime, 'execute': 2 * runtime}})
+        response = self.client.get(reverse('statistics', args=[solution.task.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn({'phase': 'execute', 'durations': [20]}, response.context['phase_medians'])
@@ -14,8 +14,9 @@ from django.http import HttpResponse
 from django.template import loader
 from django import forms
 import datetime
+from statistics import median_low
 
-from tasks.models import Task, HtmlInjector
+from tasks.models import Task, HtmlInjector, Deadlines
 from solutions.models import Solution
 from checker.basemodels import check_solution
 from attestation.models import Attestation, AnnotatedSolutionFile, RatingResult, RatingScale, RatingScaleItem
@@ -23,6 +24,7 @@ from attestation.forms import AnnotatedFileFormSet, RatingResultFormSet, Attesta
 from accounts.models import User, Tutorial
 from accounts.views import access_denied
 from configuration import get_settings
+from utilities import timing
 
 
 @login_required
@@ -105,11 +107,24 @@ def statistics(request, task_id):
 
     has_runtimes = False
     runtimes = []
+    # median duration of each phase (see utilities.timing) per checker
+    phase_checkers = []
+    phase_durations = {}
     for i, checker in enumerate(task.get_checkers()):
         checker_runtimes = []
+        checker_phase_durations = {}
         for result in checker.results.order_by('creation_date').filter(runtime__gt = 0):
             has_runtimes = True
             checker_runtimes.append({ 'date': result.creation_date, 'value': result.runtime})
+            for phase, duration in result.timings.get('phases', {}).items():
+                checker_phase_durations.setdefault(phase, []).append(duration)
+
+        if checker_phase_durations:
+            for phase in checker_phase_durations:
+                phase_durations.setdefault(phase, [0] * len(phase_checkers))
+            for phase, durations in phase_durations.items():
+                durations.append(median_low(checker_phase_durations[phase]) if phase in checker_phase_durations else 0)
+            phase_checkers.append("%d: %s" % (i, checker.title()))
 
         if checker_runtimes:
             first = checker_runtimes[0]
@@ -150,6 +165,8 @@ def statistics(request, task_id):
             'all_ratings':                     all_ratings,
             'runtimes':                        runtimes,
             'has_runtime_chart':               has_runtimes,
+            'phase_checkers':                  phase_checkers,
+            'phase_medians':                   [{'phase': phase, 'durations': phase_durations[phase]} for phase in sorted(phase_durations, key=timing.phase_order)],
             })
 
 def daterange(start_date, end_date):
@@ -192,7 +209,8 @@ def attestation_list(request, task_id):
     if request.user.is_tutor: # the trainer sees them all
         unattested_solutions = unattested_solutions.filter(author__tutorial__in = request.user.tutored_tutorials.all())
     # Only show solutions from users for which the task expired
-    unattested_solutions = [solution for solution in unattested_solutions if task.expired_for_user(solution.author)]
+    deadlines = task.deadlines()
+    unattested_solutions = [solution for solution in unattested_solutions if deadlines.expired(task, solution.author_id)]
 
     all_attestations = Attestation.objects \
         .filter(solution__task = task, solution__final = True) \
@@ -200,7 +218,7 @@ def attestation_list(request, task_id):
         .select_related('solution', 'solution__author', 'author')
 
     # Filter out attestations that have already been created for students which get a deadline extension
-    invalid_attestation_ids = [attestation.id for attestation in all_attestations if not task.expired_for_user(attestation.solution.author)]
+    invalid_attestation_ids = [attestation.id for attestation in all_attestations if not deadlines.expired(task, attestation.solution.author_id)]
     all_attestations = all_attestations.exclude(id__in = invalid_attestation_ids)
 
     my_attestations = all_attestations \
@@ -454,6 +472,7 @@ def user_task_attestation_map(users,tasks,only_published=True):
     settings = get_settings()
     arithmetic_option = settings.final_grades_arithmetic_option
     plagiarism_option = settings.final_grades_plagiarism_option
+    deadlines = Deadlines(tasks, users if len(users) == 1 else None)
 
     rating_list = []
     for user in users:
@@ -472,7 +491,7 @@ def user_task_attestation_map(users,tasks,only_published=True):
                     rating = None
             except KeyError:
                 rating = None
-            if rating or (task.expired_for_user(user) and not solution):
+            if rating or (deadlines.expired(task, user) and not solution):
                 threshold += task.warning_threshold
 
             if rating is not None:
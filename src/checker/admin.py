@@ -2,7 +2,8 @@ from django.contrib import admin
 from django.forms.models import BaseInlineFormSet, ModelForm
 from django.urls import reverse
 from django.utils.html import format_html
-from .basemodels import CheckerResult
+from .basemodels import CheckerResult, CheckJob
+from utilities import timing
 
 class AlwaysChangedModelForm(ModelForm):
     """ This fixes the creation of inlines without modifying any of it's values. The standart ModelForm would just ignore these inlines. """
@@ -33,7 +34,7 @@ class CheckerInline(admin.StackedInline):
 class CheckerResultAdmin(admin.ModelAdmin):
     model = CheckerResult
     list_display = ["edit", "view_solution", "solution_final", "checker", "passed", "creation_date", "runtime"]
-    readonly_fields = ["solution", "checker", "passed", "creation_date", "runtime"]
+    readonly_fields = ["solution", "checker", "passed", "creation_date", "runtime", "timings_summary"]
     list_filter = ["solution__final", "passed", "solution__task", "creation_date"]
 
     def get_queryset(self, request):
@@ -54,7 +55,26 @@ class CheckerResultAdmin(admin.ModelAdmin):
         return checkerResult.solution.final
     solution_final.boolean = True
 
+    def timings_summary(self, checkerResult):
+        return timing.format_timings(checkerResult.timings)
+    timings_summary.short_description = 'Timings'
+
     def has_add_permission(self, request):
         return False
 
 admin.site.register(CheckerResult, CheckerResultAdmin)
+
+class CheckJobAdmin(admin.ModelAdmin):
+    model = CheckJob
+    list_display = ["solution", "status", "run_all", "submission", "created", "started", "finished", "attempts"]
+    readonly_fields = ["solution", "run_all", "submission", "uploader", "protocol", "domain", "created", "started", "finished", "attempts"]
+    list_filter = ["status", "solution__task", "created"]
+
+    def get_queryset(self, request):
+        qs = super(CheckJobAdmin, self).get_queryset(request)
+        return qs.select_related("solution", "solution__task", "solution__author")
+
+    def has_add_permission(self, request):
+        return False
+
+admin.site.register(CheckJob, CheckJobAdmin)
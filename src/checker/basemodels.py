@@ -1,9 +1,20 @@
+import atexit
+import collections
+import collections.abc
+import copy
+import functools
 import os.path
 import shutil
 import sys
+import threading
 import time
+import uuid
 
+from hashlib import sha256
+
+from django.apps import apps
 from django.conf import settings
+from django.core.cache import cache
 from django.db import models
 from tasks.models import Task
 from solutions.models import Solution
@@ -13,13 +24,14 @@ from django.utils.translation import gettext_lazy
 from django.utils.encoding import force_str
 from django.core.exceptions import ValidationError
 from django.core.files import File
-from django.db.models.signals import post_delete
+from django.db.models.signals import post_delete, post_save
 from django.dispatch.dispatcher import receiver
-from utilities import encoding, file_operations
+from utilities import encoding, file_operations, metrics, safeexec, timing
 from utilities.deleting_file_field import DeletingFileField
 
-from functools import partial
 from multiprocessing import Pool
+from multiprocessing.util import Finalize
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 from django.db import transaction
 from django import db
@@ -30,7 +42,7 @@ from tasks.models import Task
 from django.template import loader, Context
 from django.core.mail import EmailMultiAlternatives, mail_admins
 import sys
-from datetime import datetime
+from datetime import datetime, timedelta
 
 
 def get_checkerfile_storage_path(instance, filename):
@@ -67,9 +79,18 @@ class Checker(models.Model):
     required = models.BooleanField(default=False, help_text = gettext_lazy('The test must be passed to submit the solution.'))
     always = models.BooleanField(default=True, help_text = gettext_lazy('The test will run on submission time.'))
     critical = models.BooleanField(default=False, help_text = gettext_lazy('If this test fails, do not display further test results.'))
+    cache_results = models.BooleanField(default=True, help_text = gettext_lazy('Reuse earlier results of the same author for byte-identical solution files and unchanged checker configuration. Disable for non-deterministic tests.'))
 
     results = GenericRelation("CheckerResult") # enables cascade on delete.
 
+    # How the checker uses the sandbox, decides which checkers may run in parallel (see settings.CHECKERS_IN_PARALLEL):
+    # SANDBOX_READ checkers only read the sandbox and the sources, SANDBOX_PRIVATE checkers run on their own copy
+    # of the sandbox (their changes are discarded) and SANDBOX_WRITE checkers change the sandbox or the environment.
+    SANDBOX_READ = 'read'
+    SANDBOX_PRIVATE = 'private'
+    SANDBOX_WRITE = 'write'
+    sandbox_access = SANDBOX_WRITE
+
     class Meta:
         abstract = True
         app_label = 'checker'
@@ -114,10 +135,80 @@ class Checker(models.Model):
         Overloaded by subclasses. """
         return []
 
+    def may_reuse_results(self):
+        """ Whether results of an earlier run with the same fingerprint may be reused.
+        Overloaded by subclasses whose results do not only depend on the solution files and the configuration. """
+        return self.cache_results
+
+    def fingerprint(self):
+        """ Returns a hash of the configuration of this checker, including the content of its files. """
+        s = sha256(self.__class__.__name__.encode('utf-8'))
+        for field in self._meta.concrete_fields:
+            if field.name in ('id', 'created', 'task', 'cache_results'):
+                continue
+            value = field.value_from_object(self)
+            if isinstance(field, models.FileField):
+                s.update(field.name.encode('utf-8'))
+                if value:
+                    try:
+                        s.update(file_digest(value.path).encode('utf-8'))
+                    except (OSError, NotImplementedError):
+                        s.update(value.name.encode('utf-8'))
+            else:
+                s.update(("%s=%r;" % (field.name, value)).encode('utf-8'))
+        return s.hexdigest()
+
     def clean(self):
         if self.required and (not self.show_publicly(False)): raise ValidationError("Checker is required, but failure isn't publicly reported to student during submission")
 
 
+class Sources(collections.abc.Sequence):
+    """ The source files of a CheckerEnvironment, a list of (name, content) pairs.
+
+    A content may be given as a function returning it, which is called when the pair is first accessed. """
+
+    def __init__(self, entries=None, indices=None, lock=None):
+        # [name, content, function returning the content (None once called), whether the content is a str]
+        self._entries = entries if entries is not None else []
+        # the entries in this list, None for all of them
+        self._indices = indices
+        # checkers running in parallel (see run_checkers_in_parallel) must not read a file at the same time
+        self._lock = lock if lock is not None else threading.Lock()
+
+    def _entry(self, index):
+        return self._entries[index if self._indices is None else self._indices[index]]
+
+    def __len__(self):
+        return len(self._entries if self._indices is None else self._indices)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        entry = self._entry(index)
+        if entry[2] is not None:
+            with self._lock:
+                if entry[2] is not None:
+                    entry[1] = entry[2]()
+                    entry[2] = None
+        return (entry[0], entry[1])
+
+    def names(self):
+        return [self._entry(i)[0] for i in range(len(self))]
+
+    def append(self, name, content=None, load=None, string=None):
+        self._entries.append([name, content, load, isinstance(content, str) if string is None else string])
+
+    def strings(self):
+        """ Returns the list of the entries whose content is a str (read or not). """
+        indices = range(len(self._entries)) if self._indices is None else self._indices
+        return Sources(self._entries, [i for i in indices if self._entries[i][3]], self._lock)
+
+    def copy(self):
+        """ Returns a list with the same entries, to which further entries can be added independently. """
+        # the entries are shared, so a content is only read once
+        return Sources([self._entry(i) for i in range(len(self))], lock=self._lock)
+
+
 class CheckerEnvironment:
     """ The environment for running a checker. """
 
@@ -126,10 +217,12 @@ class CheckerEnvironment:
         # Temporary build directory
         sandbox = settings.SANDBOX_DIR
         self._tmpdir = file_operations.create_tempfolder(sandbox)
-        # Sources as [(name, content)...]
-        self._sources = []
+        # Commands of all checkers may share the sandbox (docker containers) until close()
+        self._sandbox_session = self._start_sandbox_session()
+        # Sources as [(name, content)...], read when a checker asks for them
+        self._sources = Sources()
         for file in solution.solutionfile_set.all().order_by('file'):
-            self._sources.append((file.path(), file.content()))
+            self._sources.append(file.path(), load=file.content, string=True)
         # Associated task for this solution
         self._task = solution.task
         # Submitter of this program
@@ -149,18 +242,26 @@ class CheckerEnvironment:
         return self._tmpdir
 
     def sources(self):
-        """ Returns the list of source files. [(name, content)...] """
+        """ Returns the list of source files. [(name, content)...]
+            The content of a file is read when its pair is accessed, use source_names() for the names only. """
         return self._sources
 
+    def source_names(self):
+        """ Returns the names of the source files. """
+        return self._sources.names()
+
     def string_sources(self):
         """ Returns the list of string-like source files,
             so it excludes byte-like content. [(name, content)...] """
-        return [(name, content) for (name, content) in self._sources
-                                if isinstance(content, str)]
+        return self._sources.strings()
 
     def add_source(self, path, content):
         """ Add source to the list of source files. [(name, content)...] """
-        self._sources.append((path, content))
+        self._sources.append(path, content)
+
+    def add_source_file(self, path, file_path):
+        """ Add the file at file_path (as bytes) to the list of source files, without reading it yet. """
+        self._sources.append(path, load=lambda: file_operations.read_file(file_path), string=False)
 
     def task(self):
         """ Returns the associated task for this solution. """
@@ -178,6 +279,26 @@ class CheckerEnvironment:
         """ Sets the name of the executable program. """
         self._program = program
 
+    def private_copy(self):
+        """ Returns a copy of this environment with its own copy of the temporary build directory. """
+        env = copy.copy(self)
+        env._tmpdir = file_operations.create_tempfolder(settings.SANDBOX_DIR)
+        file_operations.copy_tree(self._tmpdir, env._tmpdir)
+        env._sandbox_session = env._start_sandbox_session()
+        env._sources = self._sources.copy()
+        return env
+
+    def _start_sandbox_session(self):
+        """ Returns a sandbox session for the temporary build directory if settings.DOCKER_SANDBOX_SESSIONS is set, else None. """
+        if not settings.DOCKER_SANDBOX_SESSIONS:
+            return None
+        return safeexec.start_sandbox_session(self._tmpdir)
+
+    def close(self):
+        """ Ends the sandbox session of this environment. """
+        if self._sandbox_session is not None:
+            self._sandbox_session.close()
+
 
 
 
@@ -192,7 +313,7 @@ def truncated_log(log):
     log_length = len(log)
     if log_length > settings.TEST_MAXLOGSIZE*1024:
         # since we might be truncating utf8 encoded strings here, result may be erroneous, so we explicitly replace faulty byte tokens
-        return (force_str('======= Warning: Output too long, hence truncated ======\n' + log[0:(settings.TEST_MAXLOGSIZE*1024)//2] + "\n...\n...\n...\n...\n" + log[log_length-((settings.TEST_MAXLOGSIZE*1024)//2):], errors='replace'), True)
+        return (force_str(safeexec.TRUNCATION_WARNING + log[0:(settings.TEST_MAXLOGSIZE*1024)//2] + safeexec.TRUNCATION_GAP + log[log_length-((settings.TEST_MAXLOGSIZE*1024)//2):], errors='replace'), True)
     return (log, False)
 
 
@@ -212,9 +333,12 @@ class CheckerResult(models.Model):
 
     passed = models.BooleanField(default=True,  help_text=gettext_lazy('Indicates whether the test has been passed'))
     passed_with_warning = models.BooleanField(default=False, help_text=gettext_lazy('Indicates whether the test has been passed with a warning'))
+    skipped = models.BooleanField(default=False, help_text=gettext_lazy('Indicates whether the test was not run because an earlier critical test failed. Skipped tests only count for the acceptance of the solution if they are required, then as failed.'))
     log = models.TextField(help_text=gettext_lazy('Text result of the checker'))
     creation_date = models.DateTimeField(auto_now_add=True)
     runtime = models.IntegerField(default=0, help_text=gettext_lazy('Runtime in milliseconds'))
+    fingerprint = models.CharField(max_length=64, blank=True, db_index=True, help_text=gettext_lazy('Hash of the solution files and the configuration of this and all previously run checkers. Empty if the result must not be reused.'))
+    timings = models.JSONField(default=dict, blank=True, help_text=gettext_lazy('Durations of the phases of the run in milliseconds, CPU time and peak memory of the sandboxed commands (see utilities.timing)'))
 
     def title(self):
         """ Returns the title of the Checker that did run. """
@@ -244,9 +368,28 @@ class CheckerResult(models.Model):
             log = '<div class="error">Output too long, truncated</div>' + log
         if oom_ed:
             log = '<div class="error">Memory limit exceeded, execution cancelled.</div>' + log
+        if timed_out or oom_ed:
+            # Might be caused by server load, so don't reuse this result
+            self.set_transient()
 
         self.log = log
 
+    def set_transient(self):
+        """ Marks this result as possibly different in another run (e.g. because of a timeout), so it will not be reused. """
+        self._transient = True
+
+    def is_transient(self):
+        return getattr(self, '_transient', False)
+
+    def copy_to(self, solution):
+        """ Creates a copy of this result (incl. artefacts) for the given solution. """
+        result = CheckerResult(checker=self.checker, solution=solution, passed=self.passed, passed_with_warning=self.passed_with_warning, log=self.log, fingerprint=self.fingerprint)
+        result.save()
+        for artefact in self.artefacts.all():
+            if os.path.isfile(artefact.file.path):
+                result.add_artefact(artefact.filename, artefact.file.path)
+        return result
+
     def set_passed(self, passed):
         """ Sets the passing state of the Checker. """
         assert isinstance(passed, int)
@@ -263,6 +406,37 @@ class CheckerResult(models.Model):
         with open(path, 'rb') as fd:
             artefact.file.save(filename, File(fd))
 
+def load_checkers(keys):
+    """ Returns {(content type id, object id): checker} for the given (content type id, object id) pairs
+    (e.g. of CheckerResults), with one query per checker class. Deleted checkers are left out. """
+    ids_by_type = collections.defaultdict(set)
+    for content_type_id, object_id in keys:
+        ids_by_type[content_type_id].add(object_id)
+    checkers = {}
+    for content_type_id, ids in ids_by_type.items():
+        model = ContentType.objects.get_for_id(content_type_id).model_class()
+        if model is None:
+            continue
+        for checker in model.objects.filter(pk__in=ids):
+            checkers[(content_type_id, checker.pk)] = checker
+    return checkers
+
+def prefetch_checkers(results, task=None):
+    """ Resolves the checker (a GenericForeignKey) of the given CheckerResults in bulk and returns them as a list.
+
+    The checkers of the task are taken from the checker registry (see task_checkers), all others
+    (e.g. deleted checkers or results of another task) are loaded with load_checkers. """
+    results = list(results)
+    checkers = {}
+    if task is not None:
+        for checker in task_checkers(task):
+            checkers[(ContentType.objects.get_for_model(checker).id, checker.pk)] = checker
+    checkers.update(load_checkers({(result.content_type_id, result.object_id) for result in results} - checkers.keys()))
+    field = CheckerResult._meta.get_field('checker')
+    for result in results:
+        field.set_cached_value(result, checkers.get((result.content_type_id, result.object_id)))
+    return results
+
 def get_checkerresultartefact_upload_path(instance, filename):
     result = instance.result
     solution = result.solution
@@ -305,25 +479,199 @@ def solution_file_delete(sender, instance, **kwargs):
     except OSError:
         pass
 
-def check_solution(solution, run_all = 0, debug_keep_tmp = True, secondary_check = False):
-    """Builds and tests this solution."""
-    
-    # set up environment
-    env = CheckerEnvironment(solution)
 
-    solution.copySolutionFiles(env.tmpdir())
-    run_checks(solution, env, run_all, secondary_check)
+# The checker registry: the checkers of a task are cached in this process (task id -> (version, checkers))
+# and in the shared cache, both under the current version of the task's checker configuration.
+_task_checkers = {}
 
-    if run_all:
-        solution.all_checker_finished = True
-        solution.save()
+def checkers_version_key(task_id):
+    return "praktomat_checkers_version_%d" % task_id
+
+def checker_classes():
+    checker_app = apps.get_app_config('checker')
+    return [x for x in checker_app.get_models() if issubclass(x, Checker)]
+
+def task_checkers(task):
+    """ Returns (copies of) the checkers of the task ordered by their order, see Task.get_checkers().
+
+    The database is only queried if a checker of the task was saved or deleted since the last call
+    in any process (see invalidate_task_checkers), which needs a cache (settings.CACHES) shared by all processes. """
+    version = cache.get(checkers_version_key(task.id))
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(checkers_version_key(task.id), version, settings.CHECKER_REGISTRY_TIMEOUT):
+            version = cache.get(checkers_version_key(task.id), version)
+    cached = _task_checkers.get(task.id)
+    if cached is not None and cached[0] == version:
+        checkers = cached[1]
+    else:
+        checkers_key = "praktomat_checkers_%d_%s" % (task.id, version)
+        checkers = cache.get(checkers_key)
+        if checkers is None:
+            checkers = sorted(sum([list(x.objects.filter(task=task)) for x in checker_classes()], []), key=lambda checker: checker.order)
+            cache.set(checkers_key, checkers, settings.CHECKER_REGISTRY_TIMEOUT)
+        _task_checkers[task.id] = (version, checkers)
+    # Checkers keep state of a run in their attributes, so every caller gets its own instances
+    copies = [copy.copy(checker) for checker in checkers]
+    for checker in copies:
+        checker.task = task
+    return copies
+
+def invalidate_task_checkers(task_id):
+    """ Makes all processes load the checkers of the task from the database again. """
+    _task_checkers.pop(task_id, None)
+    cache.delete(checkers_version_key(task_id))
+
+@receiver([post_save, post_delete], dispatch_uid="checker_registry")
+def checker_changed(sender, instance, **kwargs):
+    if issubclass(sender, Checker):
+        invalidate_task_checkers(instance.task_id)
+        # others may have loaded the old configuration before the change was committed
+        transaction.on_commit(lambda: invalidate_task_checkers(instance.task_id))
+
+
+class CheckJob(models.Model):
+    """ A CheckJob queues the check of a solution.
+
+    Jobs are created on upload and consumed by worker processes
+    (./manage.py runcheckworker) via check_solution. Jobs of uploads
+    (submission=True) also decide about the final flag and send the
+    submission confirmation email once the checkers finished. """
+
+    QUEUED = 'Q'
+    RUNNING = 'R'
+    DONE = 'D'
+    FAILED = 'F'
+
+    STATUS_CHOICES = (
+        (QUEUED, 'queued'),
+        (RUNNING, 'running'),
+        (DONE, 'done'),
+        (FAILED, 'failed'),
+    )
+
+    solution = models.ForeignKey(Solution, on_delete=models.CASCADE)
+    status = models.CharField(max_length=1, choices=STATUS_CHOICES, default=QUEUED)
+    run_all = models.BooleanField(default=False, help_text=gettext_lazy('Run all checkers, not only those run at submission.'))
+    submission = models.BooleanField(default=False, help_text=gettext_lazy('Decide about the final flag and send the confirmation email after checking.'))
+    uploader = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+', help_text=gettext_lazy('Set if someone else uploaded the solution in the name of the author.'))
+    protocol = models.CharField(max_length=5, blank=True, default='https')
+    domain = models.CharField(max_length=255, blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    started = models.DateTimeField(null=True, blank=True)
+    finished = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0, help_text=gettext_lazy('Number of times a worker started the job (see recover_stale_check_jobs).'))
+
+    class Meta:
+        app_label = 'checker'
+        ordering = ['id']
 
-    # Delete temporary directory
-    if not(debug_keep_tmp and settings.DEBUG):
+    def __str__(self):
+        return "%s: %s" % (self.solution, self.get_status_display())
+
+    def is_pending(self):
+        return self.status in (self.QUEUED, self.RUNNING)
+
+    def claim(self):
+        """ Atomically mark this job as running. Returns False if another worker was faster. """
+        claimed = CheckJob.objects.filter(pk=self.pk, status=self.QUEUED).update(status=self.RUNNING, started=datetime.now(), attempts=models.F('attempts') + 1)
+        if claimed:
+            self.refresh_from_db()
+        return bool(claimed)
+
+    def own_run(self):
+        """ The job as long as it is run by this worker, i.e. was not requeued by recover_stale_check_jobs (and claimed again) meanwhile. """
+        return CheckJob.objects.filter(pk=self.pk, status=self.RUNNING, started=self.started)
+
+    def process(self):
+        """ Runs the checkers and, for submissions, the rest of the upload logic. """
         try:
-            shutil.rmtree(env.tmpdir())
+            check_solution(self.solution, self.run_all)
+            # another worker is in charge of a requeued job
+            if self.submission and self.own_run().exists():
+                self.solution.finish_submission(self.protocol, self.domain, self.uploader)
+            self.status = self.DONE
         except:
-            pass
+            self.status = self.FAILED
+            raise
+        finally:
+            self.finished = datetime.now()
+            # don't overwrite the state of a requeued job
+            self.own_run().update(status=self.status, finished=self.finished)
+
+
+def queue_check(solution, run_all = False, submission = False, uploader = None, protocol = 'https', domain = ''):
+    """ Queues a check of the given solution.
+
+    Without ASYNCHRONOUS_CHECKING the job is processed right away. """
+    job = CheckJob.objects.create(solution=solution, run_all=run_all, submission=submission, uploader=uploader, protocol=protocol, domain=domain)
+    if not settings.ASYNCHRONOUS_CHECKING and job.claim():
+        job.process()
+    return job
+
+
+def recover_stale_check_jobs():
+    """ Requeues the jobs which are running for longer than settings.CHECK_JOB_TIMEOUT seconds, i.e. whose worker
+    crashed or was killed, or marks them as failed once they were started settings.CHECK_JOB_MAX_ATTEMPTS times.
+    Returns the number of recovered jobs. """
+    stale = CheckJob.objects.filter(status=CheckJob.RUNNING, started__lt=datetime.now() - timedelta(seconds=settings.CHECK_JOB_TIMEOUT))
+    count = stale.filter(attempts__lt=settings.CHECK_JOB_MAX_ATTEMPTS).update(status=CheckJob.QUEUED, started=None)
+    for job in stale.filter(attempts__gte=settings.CHECK_JOB_MAX_ATTEMPTS).select_related('solution'):
+        if CheckJob.objects.filter(pk=job.pk, status=CheckJob.RUNNING).update(status=CheckJob.FAILED, finished=datetime.now()):
+            mail_admins(gettext_lazy("%s : check of %s failed") % (settings.SITE_NAME, job.solution), "The check was started %d times, but never finished." % job.attempts)
+            count += 1
+    return count
+
+def process_check_queue(max_jobs = None):
+    """ Processes queued check jobs in order of their creation. Returns the number of processed jobs. """
+    recover_stale_check_jobs()
+    count = 0
+    while max_jobs is None or count < max_jobs:
+        job = CheckJob.objects.filter(status=CheckJob.QUEUED).first()
+        if job is None:
+            break
+        if not job.claim():
+            # another worker took this one
+            continue
+        try:
+            job.process()
+        except Exception:
+            extype, exvalue, ectb = sys.exc_info()
+            mail_admins(gettext_lazy("%s : check of %s failed") % (settings.SITE_NAME, job.solution), "%s: %s" % (extype.__name__, exvalue))
+        count += 1
+    return count
+
+def check_solution(solution, run_all = 0, debug_keep_tmp = True, secondary_check = False):
+    """Builds and tests this solution."""
+    timings = timing.Timings()
+    with timing.recording(timings):
+        # set up environment
+        with timing.phase("setup"):
+            env = CheckerEnvironment(solution)
+
+        try:
+            with timing.phase("copy"):
+                solution.copySolutionFiles(env.tmpdir())
+            run_checks(solution, env, run_all, secondary_check)
+        finally:
+            with timing.phase("cleanup"):
+                env.close()
+
+        if run_all:
+            solution.all_checker_finished = True
+            with timing.phase("save"):
+                solution.save()
+
+        # Delete temporary directory
+        if not(debug_keep_tmp and settings.DEBUG):
+            with timing.phase("cleanup"):
+                try:
+                    shutil.rmtree(env.tmpdir())
+                except:
+                    pass
+
+    solution.check_timings = timings.as_dict()
+    Solution.objects.filter(pk=solution.pk).update(check_timings=solution.check_timings)
 
 # Assumes to be called from within a @transaction.autocommit Context!!!!
 def check_with_own_connection(solution,run_all = True, debug_keep_tmp = True, secondary_check = False):
@@ -335,108 +683,362 @@ def check_with_own_connection(solution,run_all = True, debug_keep_tmp = True, se
     # Don't leave idle connections behind
     connection.close()
 
-def check_with_own_connection_rev(run_all, debug_keep_tmp, solution, secondary_check = False):
-    return check_with_own_connection(solution, run_all, debug_keep_tmp, secondary_check)
-
-
-def check_multiple(solutions, run_secret = False, debug_keep_tmp = False, secondary_check = False):
+_check_pool = None
+_check_pool_size = None
+
+def get_check_pool():
+    """ Returns the pool of worker processes checking solutions in parallel.
+        The pool is started on first use and kept (and thus warm) for later calls. """
+    global _check_pool, _check_pool_size
+    size = settings.NUMBER_OF_TASKS_TO_BE_CHECKED_IN_PARALLEL
+    if _check_pool is not None and _check_pool_size != size:
+        shutdown_check_pool()
+    if _check_pool is None:
+        # Don't share the database connection with the forked workers, each worker opens its own
+        db.connections.close_all()
+        _check_pool = Pool(processes=size, maxtasksperchild=settings.CHECK_POOL_MAX_TASKS_PER_WORKER, initializer=init_check_worker)
+        _check_pool_size = size
+    return _check_pool
+
+@atexit.register
+def shutdown_check_pool():
+    """ Lets the workers finish their current checks and stops the check worker pool. """
+    global _check_pool
+    if _check_pool is not None:
+        _check_pool.close()
+        _check_pool.join()
+        _check_pool = None
+
+def init_check_worker():
+    """ Runs in each new process of the check worker pool. """
+    # Pool workers end without running atexit handlers, but with the finalizers of multiprocessing,
+    # so the containers started by the worker are removed when it is recycled or the pool is stopped
+    Finalize(None, safeexec.shutdown_container_pools, exitpriority=10)
+
+def check_in_worker(solution_id, run_all, debug_keep_tmp, secondary_check):
+    """ Checks a solution in a process of the check worker pool.
+        The worker keeps its database connection for the following solutions. """
+    if connection.connection is not None and not connection.is_usable():
+        connection.close()
+    try:
+        check_solution(Solution.objects.get(id=solution_id), run_all, debug_keep_tmp, secondary_check)
+    finally:
+        # pool workers end without running atexit handlers
+        metrics.flush()
+
+def check_multiple(solutions, run_secret = False, debug_keep_tmp = False, secondary_check = False, progress = None, cancel = None):
+    """ Checks the given solutions, in the check worker pool if settings.NUMBER_OF_TASKS_TO_BE_CHECKED_IN_PARALLEL > 1.
+
+        progress(checked, total) is called after each checked solution. Once the (threading.Event like) cancel
+        is set, no further checks are started, the running ones are finished.
+        Returns the number of checked solutions. """
+    solutions = list(solutions)
+    checked = 0
+    unchecked = collections.Counter(solution.task_id for solution in solutions)
     if settings.NUMBER_OF_TASKS_TO_BE_CHECKED_IN_PARALLEL <= 1:
-        for solution in solutions:
-            solution.check_solution(run_secret, debug_keep_tmp, secondary_check)
+        try:
+            for solution in solutions:
+                if cancel is not None and cancel.is_set():
+                    break
+                metrics.set_gauge("praktomat_pending_rechecks", unchecked[solution.task_id], task=solution.task_id)
+                solution.check_solution(run_secret, debug_keep_tmp, secondary_check)
+                unchecked[solution.task_id] -= 1
+                checked += 1
+                if progress:
+                    progress(checked, len(solutions))
+        finally:
+            for task_id in unchecked:
+                metrics.set_gauge("praktomat_pending_rechecks", 0, task=task_id)
     else:
-        check_it = partial(check_with_own_connection_rev, run_secret, debug_keep_tmp, secondary_check = secondary_check)
-
-        pool = Pool(processes=settings.NUMBER_OF_TASKS_TO_BE_CHECKED_IN_PARALLEL)  # Check n solutions at once
-        pool.map(check_it, solutions, 1)
+        pool = get_check_pool()
+        pending = collections.deque(solutions)
+        running = collections.deque()
+        metrics.set_gauge("praktomat_check_pool_workers", _check_pool_size)
+        try:
+            while pending or running:
+                if cancel is not None and cancel.is_set():
+                    pending.clear()
+                # Only keep a few checks queued in the pool so a cancellation takes effect quickly
+                while pending and len(running) < 2 * _check_pool_size:
+                    solution = pending.popleft()
+                    running.append((solution, pool.apply_async(check_in_worker, (solution.id, run_secret, debug_keep_tmp, secondary_check))))
+                metrics.set_gauge("praktomat_check_pool_busy_workers", min(len(running), _check_pool_size))
+                for task_id, count in unchecked.items():
+                    metrics.set_gauge("praktomat_pending_rechecks", count, task=task_id)
+                if running:
+                    solution, check = running.popleft()
+                    check.get()
+                    unchecked[solution.task_id] -= 1
+                    checked += 1
+                    if progress:
+                        progress(checked, len(solutions))
+        finally:
+            metrics.set_gauge("praktomat_check_pool_workers", 0)
+            metrics.set_gauge("praktomat_check_pool_busy_workers", 0)
+            for task_id in unchecked:
+                metrics.set_gauge("praktomat_pending_rechecks", 0, task=task_id)
+    return checked
+
+def file_digest(path):
+    """ Returns the sha256 hex digest of the file at path, memoized by its name, size and modification time. """
+    stat = os.stat(path)
+    return _file_digest(path, stat.st_size, stat.st_mtime_ns)
+
+@functools.lru_cache(maxsize=1024)
+def _file_digest(path, size, mtime):
+    s = sha256()
+    with open(path, 'rb') as fd:
+        for chunk in iter(lambda: fd.read(65536), b''):
+            s.update(chunk)
+    return s.hexdigest()
+
+def checker_fingerprints(solution, checkers):
+    """ Returns a dict mapping each of the given checkers to its fingerprint.
+
+    Since a checker may depend on everything that earlier checkers did to the
+    sandbox, the fingerprint of a checker also covers the solution files and
+    all checkers run before it.
+
+    The fingerprints are empty if the results could not be reused anyway
+    (see find_cached_results), so they are only computed if needed. """
+    if not settings.CHECKER_RESULT_CACHE or not all(checker.may_reuse_results() for checker in checkers):
+        return dict.fromkeys(checkers, '')
+    s = sha256()
+    for solution_file in sorted(solution.solutionfile_set.all(), key=lambda f: f.path()):
+        s.update(("%s:%s;" % (solution_file.path(), solution_file.get_hash())).encode('utf-8'))
+    fingerprints = {}
+    for checker in checkers:
+        s.update(checker.fingerprint().encode('utf-8'))
+        fingerprints[checker] = s.hexdigest()
+    return fingerprints
+
+def find_cached_results(solution, checkers, fingerprints):
+    """ Returns a dict mapping each checker to a reusable earlier result of the author of the solution,
+    or None unless there is such a result for every checker.
+
+    Results of other authors are never reused: they may depend on the author
+    (see may_reuse_results) and their logs must not be shown to somebody else.
+
+    Reusing only some results is not possible: the skipped checkers would
+    not prepare the sandbox for the remaining ones. """
+    if not settings.CHECKER_RESULT_CACHE or not checkers:
+        return None
+    cached_results = {}
+    for checker in checkers:
+        if not checker.may_reuse_results():
+            return None
+        result = checker.results.filter(fingerprint=fingerprints[checker], solution__author=solution.author).order_by('-id').first()
+        if result is None:
+            return None
+        cached_results[checker] = result
+    return cached_results
+
+def requirements_passed(checker, passed_checkers):
+    """ Whether for every checker class required by the checker one of the given passed checker classes is a subclass. """
+    return all(any(issubclass(passed_checker, requirement) for passed_checker in passed_checkers)
+               for requirement in checker.requires())
+
+def run_checker(solution, env, checker, can_run_checker, fingerprint, cached_result = None, failed_critical_checker = None, timings = None):
+    """ Runs a single checker (or copies its cached result) and saves its result with the timings of the run.
+        If failed_critical_checker is given, the checker is skipped (see settings.SKIP_CHECKERS_AFTER_CRITICAL_FAILURE). """
+    if timings is None:
+        timings = timing.Timings(parent=timing.current())
+    with timing.recording(timings):
+        result = run_checker_timed(solution, env, checker, can_run_checker, fingerprint, cached_result, failed_critical_checker)
+    # the duration of saving is only known afterwards
+    result.timings = timings.as_dict()
+    CheckerResult.objects.filter(pk=result.pk).update(timings=result.timings)
+    return result
+
+def run_checker_timed(solution, env, checker, can_run_checker, fingerprint, cached_result, failed_critical_checker):
+    """ Does the work of run_checker while its timings are recorded. """
+    start_time = time.time()
+
+    if cached_result:
+        with timing.phase("save"):
+            result = cached_result.copy_to(solution)
+    elif failed_critical_checker:
+        result = checker.create_result(env)
+        result.set_log("Checker was skipped because the critical checker \"%s\" failed." % failed_critical_checker.title())
+        result.set_passed(False)
+        result.skipped = True
+        # the result depends on the setting, so don't reuse it
+        result.set_transient()
+    elif can_run_checker:
+        metrics.inc("praktomat_checker_runs_started_total", checker=checker.__class__.__name__)
+        # Invoke Checker
+        # TODO: well perhaps we could use settings.MIRROR to let store mails as file for development or test
+        if settings.DEBUG or 'test' in sys.argv:
+            result = checker.run(env)
+            outcome = "passed" if result.passed else "failed"
+        else:
+            try:
+                result = checker.run(env)
+                outcome = "passed" if result.passed else "failed"
+            except:
+                result = checker.create_result(env)
+                result.set_log("The Checker caused an unexpected internal error.")
+                result.set_passed(False)
+                result.set_transient()
+                #TODO: signed Email Admins
+                # sys has been imported at top of file
+                extype, exvalue, ectb = sys.exc_info()
+                exnow = datetime.now()
+                dt_string = exnow.strftime("%d/%m/%Y %H:%M:%S")
+#                        myRequestUser = User.objects.filter(id=request.user.id)
+                myTask = Task.objects.filter(id=solution.task_id)
+                myerrmsg = " %s => %s " % (extype.__name__, exvalue) if exvalue else " %s " %(extype.__name__,)
+                plaintext = loader.get_template('checker/exception.txt')
+                htmly = loader.get_template('checker/exception.html')
+                c = {
+#                              'protocol' : request.is_secure() and "https" or "http",
+#                              'domain' : RequestSite(request).domain,
+                      'base_host' : settings.BASE_HOST,
+                      'site_name' : settings.SITE_NAME,
+                      'solution' : solution,
+                      'checker' : checker,
+                      'errormsg' : myerrmsg,
+                      'datetime' : dt_string,
+                }
+                mail_admins(gettext_lazy("%s : checker in %s failed")%(settings.SITE_NAME, myTask), plaintext.render(c),html_message=htmly.render(c))
+                if settings.DEBUG :
+                    print (gettext_lazy("%s : checker in %s failed \n %s")%(settings.SITE_NAME, myTask, plaintext.render(c)))
+                #raise
+                outcome = "error"
+        metrics.inc("praktomat_checker_runs_finished_total", checker=checker.__class__.__name__, result=outcome)
+    else:
+        # make non passed result
+        # this as well as the dependency check should propably go into checker class
+        # TODO: Move code to checker class ?
+        result = checker.create_result(env)
+        #result.set_log("Checker konnte nicht ausgeführt werden, da benötigte Checker nicht bestanden wurden.")
+        result.set_log("Checker failed to run because required checkers failed.")
+        result.set_passed(False)
+
+    elapsed_time = time.time() - start_time
+    result.runtime = int(elapsed_time*1000)
+    result.log = result.log.replace("\x00", "")
+    if fingerprint and not result.is_transient():
+        result.fingerprint = fingerprint
+    with timing.phase("save"):
+        result.save()
+    return result
+
+def checker_dependencies(checkers):
+    """ Maps each of the given (ordered) checkers to the earlier checkers which have to be finished before it may start.
+
+    A checker depends on the earlier checkers it requires(). Checkers which write to the sandbox
+    additionally wait for all earlier checkers, all other checkers wait for the last earlier writer
+    (and for all earlier required critical checkers if settings.SKIP_CHECKERS_AFTER_CRITICAL_FAILURE is set). """
+    dependencies = {}
+    last_writer = None
+    for index, checker in enumerate(checkers):
+        earlier = checkers[:index]
+        if checker.sandbox_access == Checker.SANDBOX_WRITE:
+            dependencies[checker] = list(earlier)
+            last_writer = checker
+        else:
+            dependencies[checker] = [earlier_checker for earlier_checker in earlier
+                                     if earlier_checker == last_writer
+                                     or (earlier_checker.critical and earlier_checker.required and settings.SKIP_CHECKERS_AFTER_CRITICAL_FAILURE)
+                                     or any(isinstance(earlier_checker, requirement) for requirement in checker.requires())]
+    return dependencies
+
+def first_critical_failure(checkers, results):
+    """ Returns the first of the given required checkers whose result is critical if settings.SKIP_CHECKERS_AFTER_CRITICAL_FAILURE is set.
+
+    Only the failure of a required checker rejects the solution anyway, so skipping the remaining checkers
+    after it doesn't change whether the solution is accepted. """
+    if settings.SKIP_CHECKERS_AFTER_CRITICAL_FAILURE:
+        for checker in checkers:
+            if checker.required and checker.is_critical(results[checker].passed):
+                return checker
+    return None
+
+def run_checker_in_thread(solution, env, checker, can_run_checker, fingerprint, failed_critical_checker = None, parent_timings = None):
+    """ Runs a checker in a worker thread of run_checkers_in_parallel. """
+    timings = timing.Timings(parent=parent_timings)
+    if checker.sandbox_access == Checker.SANDBOX_PRIVATE and not failed_critical_checker:
+        with timings.phase("copy"):
+            env = env.private_copy()
+    try:
+        return run_checker(solution, env, checker, can_run_checker, fingerprint, failed_critical_checker = failed_critical_checker, timings = timings)
+    finally:
+        if checker.sandbox_access == Checker.SANDBOX_PRIVATE and not failed_critical_checker:
+            env.close()
+            shutil.rmtree(env.tmpdir(), ignore_errors=True)
+        # Don't leave idle connections behind
         connection.close()
 
-
-
-
+def run_checkers_in_parallel(solution, env, checkers, fingerprints):
+    """ Runs the given checkers in up to settings.CHECKERS_IN_PARALLEL threads,
+        each as soon as the checkers it depends on are finished. Returns a dict checker -> result. """
+    dependencies = checker_dependencies(checkers)
+    # the timings of the check in this thread (if any) get the resource usage of all threads
+    parent_timings = timing.current()
+    results = {}
+    running = {}
+    pending = list(checkers)
+    with ThreadPoolExecutor(max_workers=settings.CHECKERS_IN_PARALLEL) as executor:
+        while pending or running:
+            for checker in [checker for checker in pending if all(dependency in results for dependency in dependencies[checker])]:
+                pending.remove(checker)
+                passed_checkers = set(dependency.__class__ for dependency in dependencies[checker] if results[dependency].passed)
+                future = executor.submit(run_checker_in_thread, solution, env, checker, requirements_passed(checker, passed_checkers), fingerprints[checker],
+                                         first_critical_failure(dependencies[checker], results), parent_timings)
+                running[future] = checker
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[running.pop(future)] = future.result()
+    return results
 
 def run_checks(solution, env, run_all, secondary_check = False):
     """  """
 
-    passed_checkers = set()
     checkers = solution.task.get_checkers()
 
     solution_accepted = True
     solution.warnings = False
 
-    for checker in checkers:
-        # dont rerun previously run checkers in nightly run
-        dont_rerun = secondary_check and checker.results.filter(solution=solution).exists()
-
-        if (checker.always or run_all) and not dont_rerun:
+    # dont rerun previously run checkers in nightly run
+    checkers_to_run = [checker for checker in checkers
+                       if (checker.always or run_all) and not (secondary_check and checker.results.filter(solution=solution).exists())]
+    fingerprints = checker_fingerprints(solution, checkers_to_run)
+    cached_results = find_cached_results(solution, checkers_to_run, fingerprints)
+
+    with timing.phase("checkers"):
+        # The threads use their own database connections, which don't see the changes of a
+        # transaction that is still open (e.g. Task.import_Tasks), so check sequentially then.
+        if not cached_results and settings.CHECKERS_IN_PARALLEL > 1 and not connection.in_atomic_block:
+            results = run_checkers_in_parallel(solution, env, checkers_to_run, fingerprints)
+        else:
             # Check dependencies -> This requires the right order of the checkers
-            can_run_checker = True
-            for requirement in checker.requires():
-                passed_requirement = False
-                for passed_checker in passed_checkers:
-                    passed_requirement = passed_requirement or issubclass(passed_checker, requirement)
-                can_run_checker = can_run_checker and passed_requirement
-
-            start_time = time.time()
-
-            if can_run_checker:
-                # Invoke Checker
-                # TODO: well perhaps we could use settings.MIRROR to let store mails as file for development or test
-                if settings.DEBUG or 'test' in sys.argv:
-                    result = checker.run(env)
-                else:
-                    try:
-                        result = checker.run(env)
-                    except:
-                        result = checker.create_result(env)
-                        result.set_log("The Checker caused an unexpected internal error.")
-                        result.set_passed(False)
-                        #TODO: signed Email Admins
-                        # sys has been imported at top of file
-                        extype, exvalue, ectb = sys.exc_info()
-                        exnow = datetime.now()
-                        dt_string = exnow.strftime("%d/%m/%Y %H:%M:%S")
-#                        myRequestUser = User.objects.filter(id=request.user.id)
-                        myTask = Task.objects.filter(id=solution.task_id)
-                        myerrmsg = " %s => %s " % (extype.__name__, exvalue) if exvalue else " %s " %(extype.__name__,)
-                        plaintext = loader.get_template('checker/exception.txt')
-                        htmly = loader.get_template('checker/exception.html')
-                        c = {
-#                              'protocol' : request.is_secure() and "https" or "http",
-#                              'domain' : RequestSite(request).domain,
-                              'base_host' : settings.BASE_HOST,
-                              'site_name' : settings.SITE_NAME,
-                              'solution' : solution,
-                              'checker' : checker,
-                              'errormsg' : myerrmsg,
-                              'datetime' : dt_string,
-                        }
-                        mail_admins(gettext_lazy("%s : checker in %s failed")%(settings.SITE_NAME, myTask), plaintext.render(c),html_message=htmly.render(c))
-                        if settings.DEBUG :
-                            print (gettext_lazy("%s : checker in %s failed \n %s")%(settings.SITE_NAME, myTask, plaintext.render(c)))
-                        #raise
+            results = {}
+            passed_checkers = set()
+            for checker in checkers_to_run:
+                cached_result = cached_results[checker] if cached_results else None
+                result = run_checker(solution, env, checker, requirements_passed(checker, passed_checkers), fingerprints[checker], cached_result,
+                                     first_critical_failure(results.keys(), results))
+                results[checker] = result
+                if result.passed:
+                    passed_checkers.add(checker.__class__)
+
+    for checker in checkers_to_run:
+        result = results[checker]
+        if result.skipped:
+            # a skipped checker must neither produce warnings nor let a solution pass a required test it was not run for
+            if checker.required:
+                solution_accepted = False
+            continue
+        if not result.passed and checker.show_publicly(result.passed):
+            if checker.required:
+                solution_accepted = False
             else:
-                # make non passed result
-                # this as well as the dependency check should propably go into checker class
-                # TODO: Move code to checker class ?
-                result = checker.create_result(env)
-                #result.set_log("Checker konnte nicht ausgeführt werden, da benötigte Checker nicht bestanden wurden.")
-                result.set_log("Checker failed to run because required checkers failed.")
-                result.set_passed(False)
+                solution.warnings= True
 
-            elapsed_time = time.time() - start_time
-            result.runtime = int(elapsed_time*1000)
-            result.log = result.log.replace("\x00", "")
-            result.save()
-
-            if not result.passed and checker.show_publicly(result.passed):
-                if checker.required:
-                    solution_accepted = False
-                else:
-                    solution.warnings= True
-
-            if result.passed:
-                passed_checkers.add(checker.__class__)
-                if result.passed_with_warning and checker.show_publicly(result.passed):
-                    solution.warnings = True
+        if result.passed:
+            if result.passed_with_warning and checker.show_publicly(result.passed):
+                solution.warnings = True
     solution.accepted = solution_accepted
-    solution.save()
+    with timing.phase("save"):
+        solution.save()
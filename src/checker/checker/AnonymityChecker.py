@@ -58,6 +58,7 @@ def line(content, match):
 
 
 class AnonymityChecker(Checker):
+    sandbox_access = Checker.SANDBOX_READ
 
     def title(self):
         """Returns the title for this checker category."""
@@ -70,6 +71,10 @@ class AnonymityChecker(Checker):
         #_de(u"Diese Prüfung ist bestanden, wenn alle eingereichten Dateien weder Ihren Vor- noch Ihre Nachnamen enthalten.")
         return gettext("This check fails if a submitted file contains your first or last name.")
 
+    def may_reuse_results(self):
+        """ Depends on the author of the solution, so always run it. """
+        return False
+
     def run(self, env):
         result = self.create_result(env)
         log = ""
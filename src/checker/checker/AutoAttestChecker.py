@@ -8,7 +8,7 @@ from django.db import models
 from django.utils.translation import gettext_lazy
 from django.utils.html import escape
 #from django.utils.encoding import force_unicode
-from checker.basemodels import Checker, CheckerFileField, CheckerResult, truncated_log
+from checker.basemodels import Checker, CheckerFileField, CheckerResult
 from django.core.exceptions import ValidationError
 from utilities.safeexec import execute_arglist
 from utilities.file_operations import *
@@ -37,6 +37,10 @@ class AutoAttestChecker(Checker):
         super(AutoAttestChecker, self).clean()
         if (self.required or self.always or self.public): raise ValidationError("Robert says: AutoAttestChecker have to be non-required, non-always, non-public")
 
+    def may_reuse_results(self):
+        """ Depends on the results of the other checkers and creates attestations, so always run it. """
+        return False
+
     def title(self):
         """ Returns the title for this checker category. """
         return u"Attestation eintragen, wenn alle bisherigen Checker erfolgreiches Ergebnis hatten."
@@ -52,7 +56,7 @@ class AutoAttestChecker(Checker):
 
         checkers_passed = 0
         checkers_failed = 0
-        for r in env.solution().checkerresult_set.all():
+        for r in env.solution().checkerResults():
             if r.required():
                 if r.passed:
                     checkers_passed += 1
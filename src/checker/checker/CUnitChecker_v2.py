@@ -4,7 +4,7 @@ from django.db import models
 from django.utils.translation import gettext_lazy
 from django.utils.html import escape, format_html
 from django.utils.safestring import mark_safe
-from checker.basemodels import Checker, CheckerResult, CheckerFileField, truncated_log, CheckerEnvironment
+from checker.basemodels import Checker, CheckerResult, CheckerFileField, CheckerEnvironment
 from checker.admin import    CheckerInline, AlwaysChangedModelForm
 from utilities.safeexec import execute_arglist
 from utilities.file_operations import *
@@ -30,7 +30,7 @@ class IgnoringCBuilder2(CBuilder):
 
     def get_file_names(self,env):
         rxarg = re.compile(self.rxarg())
-        ret = [name for (name,content) in env.sources() if rxarg.match(name) and (not name in self._ignore)]
+        ret = [name for name in env.source_names() if rxarg.match(name) and (not name in self._ignore)]
         return ret
 
     def runFail(self,env,_fail):
@@ -60,7 +60,7 @@ class IgnoringCXXBuilder2(CXXBuilder):
 
     def get_file_names(self,env):
         rxarg = re.compile(self.rxarg())
-        ret = [name for (name,content) in env.sources() if rxarg.match(name) and (not name in self._ignore)]
+        ret = [name for name in env.source_names() if rxarg.match(name) and (not name in self._ignore)]
         return ret
 
     def runFail(self,env,_fail):
@@ -283,8 +283,8 @@ class CUnitChecker2(CheckerWithFile):
     # TODO: How to deal with students static c-functions. Think again how to interact with scriptfile dressObjects from this Checker
 
 
-        my_env_Sources = env.sources()[:] #swallow copy because env.sources() gets manipulated by time
-        ignore_Filenames = [ seq[0] for seq in my_env_Sources if seq[0] not in self.instance_filenames(env) ]
+        my_env_Sources = env.source_names() # copy because env.sources() gets manipulated by time
+        ignore_Filenames = [ name for name in my_env_Sources if name not in self.instance_filenames(env) ]
 
 
         # copy testfiles to sandbox
@@ -377,11 +377,10 @@ class CUnitChecker2(CheckerWithFile):
 
         cmd_par = self._test_par.split(' ') if self._test_par else []
         cmd = [os.path.join(script_dir,self.runner()),self._test_name] + cmd_par
-        [output, error, exitcode,timed_out, oom_ed] = execute_arglist(cmd, env.tmpdir(),environment_variables=environ,timeout=settings.TEST_TIMEOUT,fileseeklimit=settings.TEST_MAXFILESIZE, filenumberlimit=settings.TEST_MAXFILENUMBER, extradirs=[script_dir])
+        [output, error, exitcode,timed_out, oom_ed, truncated] = execute_arglist(cmd, env.tmpdir(),environment_variables=environ,timeout=settings.TEST_TIMEOUT,fileseeklimit=settings.TEST_MAXFILESIZE, filenumberlimit=settings.TEST_MAXFILENUMBER, extradirs=[script_dir], maxlogsize=settings.TEST_MAXLOGSIZE)
 
         #result = self.create_result(env)
 
-        (output,truncated) = truncated_log(output)
         output = '<pre>' + escape(self.test_description) + '\n\n======== Test Results ======\n\n</pre><br/><pre>' + escape(output) + '</pre>'
 
 
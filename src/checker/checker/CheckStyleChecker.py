@@ -13,6 +13,8 @@ class CheckStyleChecker(Checker):
     name = models.CharField(max_length=100, default="CheckStyle", help_text=gettext_lazy("Name to be displayed on the solution detail page."))
     configuration = CheckerFileField(help_text=gettext_lazy("XML configuration of CheckStyle. See http://checkstyle.sourceforge.net/"))
 
+    sandbox_access = Checker.SANDBOX_PRIVATE
+
     def title(self):
         """ Returns the title for this checker category. """
         return self.name
@@ -35,8 +37,8 @@ class CheckStyleChecker(Checker):
         environ['LANGUAGE'] = settings.LANGUAGE
         environ['TASK_ID_CUSTOM'] = env.task().custom_id
 
-        args = [settings.JVM, "-cp", settings.CHECKSTYLEALLJAR, "-Dbasedir=.", "com.puppycrawl.tools.checkstyle.Main", "-c", "checks.xml"] + [name for (name, content) in env.sources()]
-        [output, error, exitcode, timed_out, oom_ed] = execute_arglist(args, working_directory=env.tmpdir(),environment_variables=environ)
+        args = [settings.JVM, "-cp", settings.CHECKSTYLEALLJAR, "-Dbasedir=.", "com.puppycrawl.tools.checkstyle.Main", "-c", "checks.xml"] + env.source_names()
+        [output, error, exitcode, timed_out, oom_ed, truncated] = execute_arglist(args, working_directory=env.tmpdir(),environment_variables=environ, maxlogsize=settings.TEST_MAXLOGSIZE)
 
         # Remove Praktomat-Path-Prefixes from result:
         #output = re.sub(r"^"+re.escape(env.tmpdir())+"/+", "", output, flags=re.MULTILINE)
@@ -49,7 +51,7 @@ class CheckStyleChecker(Checker):
             log = log + '<div class="error">Timeout occured!</div>'
         if oom_ed:
             log = log + '<div class="error">Out of memory!</div>'
-        result.set_log(log)
+        result.set_log(log, truncated=truncated)
 
 
         result.set_passed(not timed_out and not oom_ed and not exitcode and (not re.match('Starting audit...\nAudit done.', output) == None))
@@ -1,15 +1,27 @@
 import os
+import shutil
+from hashlib import sha256
 
+from django.conf import settings
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.utils.translation import gettext_lazy
 from django.core.exceptions import ValidationError
 from checker.basemodels import Checker, CheckerFileField
+from tasks.models import Task
 from utilities.file_operations import *
 from utilities.encoding import *
+from utilities import timing
 from django.utils.html import escape
 from django.contrib import admin
 
 
+def sandbox_templates_dir(task_id):
+    """ The directory the zip files of the checkers of the task are extracted to (see CheckerWithFile.sandbox_template). """
+    return os.path.join(settings.SANDBOX_TEMPLATE_DIR, 'Task_%d' % task_id)
+
+
 class CheckerWithFile(Checker):
     class Meta:
         abstract = True
@@ -29,10 +41,43 @@ class CheckerWithFile(Checker):
         filename = self.filename if self.filename else self.file.path
         return os.path.join(self.path.lstrip("/ "), os.path.basename(filename))
 
-    def add_to_environment(self, env, path):
+    def sandbox_template_dir(self):
+        """ The directory the zip file is extracted to once for all checks (see sandbox_template). It is named
+        after the stored zip file, so the zip file is extracted again when it is replaced. """
+        stat = os.stat(self.file.path)
+        key = sha256(("%s:%d:%d" % (self.file.name, stat.st_size, stat.st_mtime_ns)).encode('utf-8')).hexdigest()
+        return os.path.join(sandbox_templates_dir(self.task_id), self.sandbox_template_prefix() + key)
+
+    def sandbox_template_prefix(self):
+        return '%s_%d_' % (self.__class__.__name__, self.id)
+
+    def sandbox_template(self):
+        """ Returns the directory the zip file is extracted to once for all checks (see unpack_zipfile_template)
+        and the names of its entries. """
+        template_dir = self.sandbox_template_dir()
+        return template_dir, unpack_zipfile_template(self.file.path, template_dir)
+
+    def remove_stale_sandbox_templates(self, keep_current=True):
+        """ Removes what was extracted for earlier versions of this checker (and, unless keep_current, for this one).
+        Only called when the checker or its task is saved, never during checks, which may still use the files. """
+        task_dir = sandbox_templates_dir(self.task_id)
+        if not os.path.isdir(task_dir):
+            return
+        current = None
+        if keep_current and self.file:
+            try:
+                current = os.path.basename(self.sandbox_template_dir())
+            except OSError:
+                pass
+        for name in os.listdir(task_dir):
+            if name.startswith(self.sandbox_template_prefix()) and name != current:
+                shutil.rmtree(os.path.join(task_dir, name), ignore_errors=True)
+
+    def add_to_environment(self, env, path, file_path):
+        """ Adds the file put into the sandbox at path as a source, to be read from file_path
+        (which, unlike the sandbox, is not changed by later checkers) when needed. """
         if (self._add_to_environment):
-            with open(os.path.join(env.tmpdir(), path), 'rb') as fd:
-                env.add_source(path, fd.read())
+            env.add_source_file(path, file_path)
 
     def run_file(self, env):
         """ Tries to unpack all necessary files.
@@ -40,22 +85,25 @@ class CheckerWithFile(Checker):
         In that case, this function creates and returns the (failed) CheckerResult.
         Otherwise (if the unpacking succeeds), this function returns None.
         """
-        clashes = []
-        cleanpath = self.path.lstrip("/ ")
-        if (self.unpack_zipfile):
-            path = os.path.join(env.tmpdir(), cleanpath)
-            unpack_zipfile_to(self.file.path, path,
-                lambda n: clashes.append(os.path.join(cleanpath, n)),
-                lambda f: self.add_to_environment(env, os.path.join(cleanpath, f)))
-        else:
-            filename = self.filename if self.filename else self.file.path
-            source_path = os.path.join(cleanpath, os.path.basename(filename))
-            path = os.path.join(env.tmpdir(), source_path)
-            overridden = os.path.exists(path)
-            copy_file(self.file.path, path)
-            if overridden:
-                clashes.append(os.path.join(self.path, os.path.basename(filename)))
-            self.add_to_environment(env, source_path)
+        with timing.phase("copy"):
+            clashes = []
+            cleanpath = self.path.lstrip("/ ")
+            if (self.unpack_zipfile):
+                path = os.path.join(env.tmpdir(), cleanpath)
+                template_dir, names = self.sandbox_template()
+                copy_zipfile_template(template_dir, names, path,
+                    lambda n: clashes.append(os.path.join(cleanpath, n)),
+                    lambda f: self.add_to_environment(env, os.path.join(cleanpath, f), os.path.join(template_dir, 'files', f)),
+                    root=env.tmpdir())
+            else:
+                filename = self.filename if self.filename else self.file.path
+                source_path = os.path.join(cleanpath, os.path.basename(filename))
+                path = os.path.join(env.tmpdir(), source_path)
+                overridden = os.path.exists(path)
+                copy_file(self.file.path, path)
+                if overridden:
+                    clashes.append(os.path.join(self.path, os.path.basename(filename)))
+                self.add_to_environment(env, source_path, self.file.path)
 
         if clashes:
             result = self.create_result(env)
@@ -65,6 +113,21 @@ class CheckerWithFile(Checker):
 
         return None
 
+@receiver([post_save, post_delete], dispatch_uid="checker_sandbox_templates")
+def checker_with_file_changed(sender, instance, signal, **kwargs):
+    if issubclass(sender, CheckerWithFile):
+        instance.remove_stale_sandbox_templates(keep_current=signal is post_save)
+
+@receiver(post_save, sender=Task, dispatch_uid="task_sandbox_templates")
+def task_saved(sender, instance, **kwargs):
+    for checker in instance.get_checkers():
+        if isinstance(checker, CheckerWithFile):
+            checker.remove_stale_sandbox_templates()
+
+@receiver(post_delete, sender=Task, dispatch_uid="task_sandbox_templates")
+def task_deleted(sender, instance, **kwargs):
+    shutil.rmtree(sandbox_templates_dir(instance.id), ignore_errors=True)
+
 class CreateFileChecker(CheckerWithFile):
 
     def title(self):
@@ -92,6 +92,10 @@ class DejaGnuTester(Checker, DejaGnu):
         return  "<TT><PRE>" + re.sub(RXFAIL, r'\1 <B class="error"> \2 </B> \3', log) + "</PRE></TT>"
 
 
+    def may_reuse_results(self):
+        """ The tests get the name of the author (USER), so always run them. """
+        return False
+
     # Run tests.  Return a CheckerResult.
     def run(self, env):
 
@@ -122,7 +126,7 @@ class DejaGnuTester(Checker, DejaGnu):
         environ['LANGUAGE'] = settings.LANGUAGE
         environ['TASK_ID_CUSTOM'] = env.task().custom_id
 
-        [output, error, exitcode, timed_out, oom_ed] = \
+        [output, error, exitcode, timed_out, oom_ed, truncated] = \
                     execute_arglist(
                         cmd,
                         testsuite,
@@ -130,7 +134,8 @@ class DejaGnuTester(Checker, DejaGnu):
                         timeout=settings.TEST_TIMEOUT,
                         fileseeklimit=settings.TEST_MAXFILESIZE,
                         filenumberlimit=settings.TEST_MAXFILENUMBER,
-                        extradirs=[env.tmpdir(), script_dir]
+                        extradirs=[env.tmpdir(), script_dir],
+                        maxlogsize=settings.TEST_MAXLOGSIZE
                         )
         output = encoding.get_unicode(output)
         #TODO this is just a workaround for the deprecation of Java Security Manager (since java 17)
@@ -151,7 +156,7 @@ class DejaGnuTester(Checker, DejaGnu):
         complete_output = self.htmlize_output(output + log)
 
         result = self.create_result(env)
-        result.set_log(complete_output, timed_out=timed_out or oom_ed)
+        result.set_log(complete_output, timed_out=timed_out or oom_ed, truncated=truncated)
         result.set_passed(not exitcode and not timed_out and not oom_ed and self.output_ok(complete_output))
         return result
 
@@ -10,7 +10,7 @@ from django.db import models
 from django.utils.translation import gettext_lazy
 from django.utils.html import escape
 #from django.utils.encoding import force_unicode
-from checker.basemodels import Checker, CheckerFileField, CheckerResult, truncated_log
+from checker.basemodels import Checker, CheckerFileField, CheckerResult
 from django.core.exceptions import ValidationError
 from utilities.safeexec import execute_arglist
 from utilities.file_operations import *
@@ -24,6 +24,7 @@ class DiffChecker(Checker):
     input_file = CheckerFileField(blank=True, help_text=gettext_lazy("The file containing the input for the program."))
     output_file = CheckerFileField(blank=True, help_text=gettext_lazy("The file containing the output for the program."))
 
+    sandbox_access = Checker.SANDBOX_PRIVATE
 
     def clean(self):
         super(DiffChecker, self).clean()
@@ -38,6 +39,10 @@ class DiffChecker(Checker):
         """ Returns a description for this Checker. """
         return u"Diese Prüfung wird bestanden, wenn erwartete und tatsächliche Ausgabe übereinstimmen."
 
+    def may_reuse_results(self):
+        """ The script gets the author of the solution (USER, AUTHOR), so always run it. """
+        return False
+
     def run(self, env):
         """ Runs tests in a special environment. Here's the actual work.
         This runs the check in the environment ENV, returning a CheckerResult. """
@@ -79,7 +84,7 @@ class DiffChecker(Checker):
 
         #[output, error, exitcode,_] = execute_arglist(args, working_directory=test_dir, environment_variables=environ)
 
-        [output, error, exitcode,timed_out, oom_ed] = execute_arglist(
+        [output, error, exitcode,timed_out, oom_ed, truncated] = execute_arglist(
                             args,
                             working_directory=test_dir,
                             environment_variables=environ,
@@ -88,6 +93,7 @@ class DiffChecker(Checker):
                             fileseeklimit=settings.TEST_MAXFILESIZE,
                             filenumberlimit=settings.TEST_MAXFILENUMBER,
                             extradirs = [script_dir],
+                            maxlogsize=settings.TEST_MAXLOGSIZE,
                             )
         output = force_unicode(output, errors='replace')
         #TODO this is just a workaround for the deprecation of Java Security Manager (since java 17)
@@ -98,7 +104,7 @@ class DiffChecker(Checker):
 
         result = CheckerResult(checker=self, solution=env.solution())
 
-        result.set_log('<pre>' + escape(output) + '</pre>')
+        result.set_log('<pre>' + escape(output) + '</pre>', truncated=truncated)
 
         result.set_passed(not exitcode)
 
@@ -5,7 +5,7 @@ from django.utils.translation import gettext_lazy
 from django.utils.html import escape
 from django.contrib import admin
 from django.template.loader import get_template
-from checker.basemodels import Checker, CheckerFileField, truncated_log
+from checker.basemodels import Checker, CheckerFileField
 from checker.admin import    CheckerInline, AlwaysChangedModelForm
 from solutions.models import Solution
 from checker.basemodels import CheckerResult
@@ -25,7 +25,7 @@ class IgnoringHaskellBuilder(HaskellBuilder):
 
     def get_file_names(self, env):
         rxarg = re.compile(self.rxarg())
-        return [name for (name, content) in env.sources() if rxarg.match(name) and (not name in self._ignore)]
+        return [name for name in env.source_names() if rxarg.match(name) and (not name in self._ignore)]
 
     def create_result(self, env):
         assert isinstance(env.solution(), Solution)
@@ -111,11 +111,10 @@ class HaskellTestFrameWorkChecker(CheckerWithFile):
         environ['TASK_ID_CUSTOM'] = env.task().custom_id
 
         cmd = ["./"+self.module_binary_name(), "--maximum-generated-tests=1000"]
-        [output, error, exitcode, timed_out, oom_ed] = execute_arglist(cmd, env.tmpdir(), environment_variables=environ, timeout=settings.TEST_TIMEOUT, fileseeklimit=settings.TEST_MAXFILESIZE, filenumberlimit=settings.TEST_MAXFILENUMBER)
+        [output, error, exitcode, timed_out, oom_ed, truncated] = execute_arglist(cmd, env.tmpdir(), environment_variables=environ, timeout=settings.TEST_TIMEOUT, fileseeklimit=settings.TEST_MAXFILESIZE, filenumberlimit=settings.TEST_MAXFILENUMBER, maxlogsize=settings.TEST_MAXLOGSIZE)
 
         result = self.create_result(env)
 
-        (output, truncated) = truncated_log(output)
         output = '<pre>' + escape(self.test_description) + '\n\n======== Test Results ======\n\n</pre><br/><pre>' + escape(output) + '</pre>'
 
         if self.include_testcase_in_report in ["FULL", "DL"]:
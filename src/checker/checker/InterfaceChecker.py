@@ -20,6 +20,8 @@ class InterfaceChecker(Checker):
     interface6 = models.CharField(max_length=100, blank = True, help_text=gettext_lazy("The name of the interface that must be implemented."))
     interface7 = models.CharField(max_length=100, blank = True, help_text=gettext_lazy("The name of the interface that must be implemented."))
 
+    sandbox_access = Checker.SANDBOX_READ
+
     def title(self):
         """ Returns the title for this checker category. """
         return "Interface Checker"
@@ -16,6 +16,8 @@ class IsabelleChecker(Checker):
     logic = models.CharField(max_length=100, default="HOL", help_text=gettext_lazy("Default heap to use"))
     additional_theories = models.CharField(max_length=200, blank=True, help_text=gettext_lazy("Isabelle theories to be run in addition to those provided by the user (Library theories or theories uploaded using the Create File Checker). Do not include the file extensions. Separate multiple theories by space"))
 
+    sandbox_access = Checker.SANDBOX_PRIVATE
+
     def title(self):
         """ Returns the title for this checker category. """
         return "Isabelle-Checker"
@@ -32,7 +34,7 @@ class IsabelleChecker(Checker):
 
     def run(self, env):
 
-        thys = [('%s' % os.path.splitext(name__[0])[0]) for name__ in env.sources()]
+        thys = [('%s' % os.path.splitext(name)[0]) for name in env.source_names()]
         additional_thys = ['%s' % name for name in re.split(" |,", self.additional_theories) if name]
         user_thys = [name for name in thys if name not in additional_thys]
 
@@ -53,7 +55,7 @@ class IsabelleChecker(Checker):
         environ['LANG'] = settings.LANG
         environ['LANGUAGE'] = settings.LANGUAGE
         environ['TASK_ID_CUSTOM'] = env.task().custom_id
-        (output, error, exitcode, timed_out, oom_ed) = execute_arglist(args, working_directory=env.tmpdir(), environment_variables=environ, timeout=settings.TEST_TIMEOUT, error_to_output=False)
+        (output, error, exitcode, timed_out, oom_ed, truncated) = execute_arglist(args, working_directory=env.tmpdir(), environment_variables=environ, timeout=settings.TEST_TIMEOUT, error_to_output=False, maxlogsize=settings.TEST_MAXLOGSIZE)
 
         if timed_out:
             output += "\n\n---- check aborted after %d seconds ----\n" % settings.TEST_TIMEOUT
@@ -62,7 +64,7 @@ class IsabelleChecker(Checker):
             output += "\n\n---- check aborted, out of memory ----\n"
 
         result = self.create_result(env)
-        result.set_log('<pre>' + escape(output) + '</pre>')
+        result.set_log('<pre>' + escape(output) + '</pre>', truncated=truncated)
         result.set_passed(not timed_out and not oom_ed and self.output_ok(output))
 
         return result
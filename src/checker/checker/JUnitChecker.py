@@ -3,7 +3,7 @@ import re
 from django.db import models
 from django.utils.translation import gettext_lazy
 from django.utils.html import escape
-from checker.basemodels import Checker, CheckerResult, CheckerFileField, truncated_log
+from checker.basemodels import Checker, CheckerResult, CheckerFileField
 from checker.admin import    CheckerInline, AlwaysChangedModelForm
 from utilities.safeexec import execute_arglist
 from utilities.file_operations import *
@@ -18,7 +18,7 @@ class IgnoringJavaBuilder(JavaBuilder):
 
     def get_file_names(self, env):
         rxarg = re.compile(self.rxarg())
-        return [name for (name, content) in env.sources() if rxarg.match(name) and (not name in self._ignore)]
+        return [name for name in env.source_names() if rxarg.match(name) and (not name in self._ignore)]
 
     # Since this checkers instances  will not be saved(), we don't save their results, either
     def create_result(self, env):
@@ -44,6 +44,8 @@ class JUnitChecker(Checker):
     )
     junit_version = models.CharField(max_length=16, choices=JUNIT_CHOICES, default="junit3")
 
+    sandbox_access = Checker.SANDBOX_PRIVATE
+
     def runner(self):
         return {'junit4' : 'org.junit.runner.JUnitCore', 'junit3' : 'junit.textui.TestRunner' }[self.junit_version]
 
@@ -81,11 +83,10 @@ class JUnitChecker(Checker):
         environ['TASK_ID_CUSTOM'] = env.task().custom_id
 
         cmd = [settings.JVM_SECURE, "-cp", settings.JAVA_LIBS[self.junit_version]+":.", self.runner(), self.class_name]
-        [output, error, exitcode, timed_out, oom_ed] = execute_arglist(cmd, env.tmpdir(), environment_variables=environ, timeout=settings.TEST_TIMEOUT, fileseeklimit=settings.TEST_MAXFILESIZE, filenumberlimit=settings.TEST_MAXFILENUMBER, extradirs=[script_dir])
+        [output, error, exitcode, timed_out, oom_ed, truncated] = execute_arglist(cmd, env.tmpdir(), environment_variables=environ, timeout=settings.TEST_TIMEOUT, fileseeklimit=settings.TEST_MAXFILESIZE, filenumberlimit=settings.TEST_MAXFILENUMBER, extradirs=[script_dir], maxlogsize=settings.TEST_MAXLOGSIZE)
 
         result = self.create_result(env)
 
-        (output, truncated) = truncated_log(output)
         output = '<pre>' + escape(self.test_description) + '\n\n======== Test Results ======\n\n</pre><br/><pre>' + escape(output) + '</pre>'
 
         #TODO this is just a workaround for the deprecation of Java Security Manager (since java 17)
@@ -4,12 +4,14 @@ from django.utils.translation import gettext_lazy
 
 from . JUnitChecker import RXFAIL
 from checker.admin import CheckerInline
-from checker.basemodels import Checker, truncated_log
+from checker.basemodels import Checker
 from utilities.file_operations import *
 from utilities.safeexec import execute_arglist
 
 
 class JavaChecker(Checker):
+    sandbox_access = Checker.SANDBOX_PRIVATE
+
     def title(self):
         return "Java Checker"
 
@@ -42,6 +44,10 @@ class JavaChecker(Checker):
     def output_ok(self, output):
         return RXFAIL.search(output) is None
 
+    def may_reuse_results(self):
+        """ The java class gets the author and the solution as arguments, so always run it. """
+        return False
+
     def run(self, env):
         environ = {'UPLOAD_ROOT': settings.UPLOAD_ROOT, 'JAVA': settings.JVM}
 
@@ -56,11 +62,11 @@ class JavaChecker(Checker):
             str(env.user().last_name),
             str(env.solution().id),
             str(env.user().username)]
-        [output, error, exitcode, timed_out, oom_ed] = execute_arglist(cmd, env.tmpdir(), environment_variables=environ,
-            timeout=settings.TEST_TIMEOUT, fileseeklimit=settings.TEST_MAXFILESIZE, filenumberlimit=settings.TEST_MAXFILENUMBER, extradirs=[script_dir])
+        [output, error, exitcode, timed_out, oom_ed, truncated] = execute_arglist(cmd, env.tmpdir(), environment_variables=environ,
+            timeout=settings.TEST_TIMEOUT, fileseeklimit=settings.TEST_MAXFILESIZE, filenumberlimit=settings.TEST_MAXFILENUMBER, extradirs=[script_dir],
+            maxlogsize=settings.TEST_MAXLOGSIZE)
         result = self.create_result(env)
 
-        (output, truncated) = truncated_log(output)
         output = '<pre>' + escape(self.test_description) + '\n\n======== Test Results ======\n\n</pre><br/><pre>' + \
                  escape(output) + '</pre>'
 
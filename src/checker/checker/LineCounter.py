@@ -16,6 +16,8 @@ class LineCounter(Checker):
         - number of files
         - lines, lines of code and lines of comment """
 
+    sandbox_access = Checker.SANDBOX_READ
+
     def title(self):
         """ Returns the title for this checker category. """
         # _de("Lexikalische Statistik")
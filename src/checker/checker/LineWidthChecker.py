@@ -16,6 +16,8 @@ class LineWidthChecker(Checker):
     include = models.CharField(max_length=100, blank = True, default=".*", help_text=gettext_lazy("Regular expression describing the filenames to be checked. Case insensitive. Blank: use all files."))
     exclude = models.CharField(max_length=100, blank = True, default=r".*\.txt$", help_text=gettext_lazy("Regular expression describing included filenames, which shall be excluded. Case insensitive. Blank: use all files."))
 
+    sandbox_access = Checker.SANDBOX_READ
+
     def title(self):
         """ Returns the title for this checker category. """
         return "Maximale Zeilenbreite (%d Zeichen)" % self.max_line_length
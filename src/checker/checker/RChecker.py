@@ -20,7 +20,7 @@ class RChecker(Checker):
         help_text = gettext_lazy("If the R script creates a Rplots.pdf file, keep it.")
         )
 
-
+    sandbox_access = Checker.SANDBOX_PRIVATE
 
     def title(self):
         """ Returns the title for this checker category. """
@@ -34,11 +34,11 @@ class RChecker(Checker):
 
 
     def run(self, env):
-        thys = [('"%s"' % os.path.splitext(name__[0])[0]) for name__ in env.sources()]
+        thys = [('"%s"' % os.path.splitext(name)[0]) for name in env.source_names()]
 
         R_files = [
             name
-            for (name, content) in env.sources()
+            for name in env.source_names()
             if os.path.splitext(name)[1] == '.R'
             ]
 
@@ -77,7 +77,7 @@ class RChecker(Checker):
         environ['LANG'] = settings.LANG
         environ['LANGUAGE'] = settings.LANGUAGE
         environ['TASK_ID_CUSTOM'] = env.task().custom_id
-        (output, error, exitcode, timed_out, oom_ed) = execute_arglist(
+        (output, error, exitcode, timed_out, oom_ed, truncated) = execute_arglist(
             args,
             working_directory=env.tmpdir(),
             environment_variables=environ,
@@ -88,6 +88,7 @@ class RChecker(Checker):
             # else the program will crash right away with an error
             # (167 = ceil(100/0.6)).
             filenumberlimit=167,
+            maxlogsize=settings.TEST_MAXLOGSIZE,
             )
 
         if timed_out:
@@ -110,7 +111,7 @@ class RChecker(Checker):
 
         if self.require_plots and not rplots_exists:
             output += "\n\n---- No Rplots.pdf file was generated, this was required ----\n" % exitcode
-        result.set_log('<pre>' + escape(output) + '</pre>')
+        result.set_log('<pre>' + escape(output) + '</pre>', truncated=truncated)
         result.set_passed(exitcode == 0
             and not timed_out
             and not oom_ed
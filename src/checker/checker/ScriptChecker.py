@@ -5,7 +5,7 @@ from django.db import models
 from django.utils.translation import gettext_lazy
 from django.utils.html import escape
 from django.utils.encoding import force_str
-from checker.basemodels import Checker, CheckerFileField, truncated_log
+from checker.basemodels import Checker, CheckerFileField
 from checker.admin import    CheckerInline, AlwaysChangedModelForm
 from utilities.safeexec import execute_arglist
 from utilities.file_operations import *
@@ -36,6 +36,10 @@ class ScriptChecker(Checker):
         filename = self.filename if self.filename else self.shell_script.path
         return os.path.basename(filename)
 
+    def may_reuse_results(self):
+        """ The script gets the author and the solution (USER, USER_MATR, SOLUTION_ID), so always run it. """
+        return False
+
     def run(self, env):
         """ Runs tests in a special environment. Here's the actual work.
         This runs the check in the environment ENV, returning a CheckerResult. """
@@ -48,7 +52,7 @@ class ScriptChecker(Checker):
 
         # Run the tests -- execute dumped shell script 'script.sh'
 
-        filenames = [name for (name, content) in env.sources()]
+        filenames = env.source_names()
         script_args = shlex.split(self.arguments)
         args = [path] + script_args + filenames
 
@@ -70,7 +74,7 @@ class ScriptChecker(Checker):
 
         script_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'scripts')
 
-        [output, error, exitcode, timed_out, oom_ed] = execute_arglist(
+        [output, error, exitcode, timed_out, oom_ed, truncated] = execute_arglist(
                             args,
                             working_directory=env.tmpdir(),
                             environment_variables=environ,
@@ -79,11 +83,11 @@ class ScriptChecker(Checker):
                             fileseeklimit=settings.TEST_MAXFILESIZE,
                             filenumberlimit=settings.TEST_MAXFILENUMBER,
                             extradirs = [script_dir],
+                            maxlogsize=settings.TEST_MAXLOGSIZE,
                             )
         output = force_str(output, errors='replace')
 
         result = self.create_result(env)
-        (output, truncated) = truncated_log(output)
 
         if self.remove:
             output = re.sub(self.remove, "", output)
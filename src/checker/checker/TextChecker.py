@@ -36,6 +36,8 @@ class TextChecker(Checker):
         help_text="Space-separated start and end symbols for block comments (e.g., /* */)."
     )
 
+    sandbox_access = Checker.SANDBOX_READ
+
     def title(self):
         return "Text Checker"
 
@@ -154,7 +154,7 @@ class CompilerOrLinker(Checker, IncludeHelper):
         myenviron['LANG'] = settings.LANG
         myenviron['LANGUAGE'] = settings.LANGUAGE
         myenviron['TASK_ID_CUSTOM'] = env.task().custom_id
-        [output,error,exitcode,timed_out,oom_ed]  = execute_arglist(args, env.tmpdir(), myenviron, extradirs=[script_dir])
+        [output,error,exitcode,timed_out,oom_ed,_]  = execute_arglist(args, env.tmpdir(), myenviron, extradirs=[script_dir], phase="compile")
 
         output = escape(output)
         output = self.enhance_output(env, output)
@@ -220,9 +220,9 @@ class CompilerOrLinker(Checker, IncludeHelper):
     def get_file_names(self,env):
         if isinstance (self.rxarg(), str):
             rxarg = re.compile(self.rxarg())
-            return [name for (name,content) in env.sources() if rxarg.match(name)]
+            return [name for name in env.source_names() if rxarg.match(name)]
         else:
-            return [name for (name, content) in env.sources() if name in self.rxarg()]
+            return [name for name in env.source_names() if name in self.rxarg()]
 
 
 
@@ -406,7 +406,7 @@ class Builder(Checker):
 
     def get_file_names(self, env):
         rxarg = re.compile(self.rxarg())
-        return [name for (name, content) in env.sources() if rxarg.match(name)]
+        return [name for name in env.source_names() if rxarg.match(name)]
 
     def exec_file(self, tmpdir, program_name):
         """ File of the generated executable.  To be overloaded in subclasses. """
@@ -454,7 +454,7 @@ class Builder(Checker):
         environ = self.environment()
         environ['LANG'] = settings.LANG
         environ['LANGUAGE'] = settings.LANGUAGE
-        [output, _, _, _, _]  = execute_arglist(args, env.tmpdir(), environ, extradirs=[script_dir])
+        [output, _, _, _, _, _]  = execute_arglist(args, env.tmpdir(), environ, extradirs=[script_dir], phase="compile")
 
         output = escape(output)
         output = self.enhance_output(env, output)
@@ -34,7 +34,7 @@ class CLinker(Linker, LibraryHelper, MainNeedHelper):
         c_rx = re.compile(r'^(.*\.)[cC]')
         #ToDo: code review
         o_solution_list = [re.sub(r"\.[cC]",r".o",name)\
-            for (name,void) in env.sources()\
+            for name in env.source_names()\
             if name.endswith(('.c','.C'))]
 
         for dirpath, dirs, files in os.walk(env.tmpdir()):
@@ -47,7 +47,7 @@ class CLinker(Linker, LibraryHelper, MainNeedHelper):
                         # Next let's shell out and search in object file for main
                         script_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)),'scripts')
                         cmd = [os.path.join(script_dir, self._OBJECTINSPECTOR)] + self._OBJINSPECT_PAR + [os.path.join(dirpath,filename)]
-                        [objinfo,error,exitcode,timed_out,oom_ed]  = execute_arglist(cmd , env.tmpdir(), self.environment(), timeout=settings.TEST_TIMEOUT, fileseeklimit=settings.TEST_MAXFILESIZE, filenumberlimit=settings.TEST_MAXFILENUMBER, extradirs=[script_dir])
+                        [objinfo,error,exitcode,timed_out,oom_ed,_]  = execute_arglist(cmd , env.tmpdir(), self.environment(), timeout=settings.TEST_TIMEOUT, fileseeklimit=settings.TEST_MAXFILESIZE, filenumberlimit=settings.TEST_MAXFILENUMBER, extradirs=[script_dir], phase="compile")
                         if exitcode != 0 :
                             raise self.NotFoundError("Internal Server Error. Processing files %s" % ",".join(obj_files)+"\n"+objinfo)
                         tmp = re.search(nm_rx, objinfo)
@@ -72,7 +72,7 @@ class CLinker(Linker, LibraryHelper, MainNeedHelper):
         # Get all object files corresponding to solutions C files.
         c_rx = re.compile(r'^(.*\.)[cC]')
         o_solution_list = [re.sub(r"\.[cC]", r".o", name)\
-            for (name,void) in env.sources()\
+            for name in env.source_names()\
             if name.endswith(('.c','.C'))]
 
 
@@ -80,7 +80,7 @@ class CLinker(Linker, LibraryHelper, MainNeedHelper):
         # add these object files to env sources
         for f in o_solution_list:
             try:
-                for (name, void) in env.sources():
+                for name in env.source_names():
                      if f == name: raise StopIteration
                      env.add_source(f, None)
             except StopIteration: pass
@@ -49,7 +49,7 @@ class HaskellBuilder(Builder):
         environ['LANG'] = settings.LANG
         environ['LANGUAGE'] = settings.LANGUAGE
         environ['TASK_ID_CUSTOM'] = env.task().custom_id
-        [output, _, _, _, _]  = execute_arglist(args, env.tmpdir(), environ)
+        [output, _, _, _, _, _]  = execute_arglist(args, env.tmpdir(), environ, phase="compile")
 
         has_main = re.search(r"^Linking ([^ ]*) ...$", output, re.MULTILINE)
         if has_main: self._detected_main = has_main.group(1)
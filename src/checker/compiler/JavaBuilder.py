@@ -33,7 +33,7 @@ class ClassFileGeneratingBuilder(Builder):
                     environ['LANG'] = settings.LANG
                     environ['LANGUAGE'] = settings.LANGUAGE
                     environ['TASK_ID_CUSTOM'] = env.task().custom_id
-                    [classinfo, _, _, _, _]  = execute_arglist([settings.JAVAP, os.path.join(dirpath, filename)], env.tmpdir(), environ, unsafe=True)
+                    [classinfo, _, _, _, _, _]  = execute_arglist([settings.JAVAP, os.path.join(dirpath, filename)], env.tmpdir(), environ, unsafe=True, phase="compile")
                     if classinfo.find(main_method) >= 0 or classinfo.find(main_method_varargs) >= 0:
                         main_class_name = class_name.search(classinfo, re.MULTILINE).group(5)
                         return main_class_name
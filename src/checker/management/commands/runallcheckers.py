@@ -1,3 +1,6 @@
+import signal
+import threading
+
 from django.core.management.base import BaseCommand
 from tasks.models import Task
 
@@ -11,16 +14,31 @@ class Command(BaseCommand):
             help='nightly checkers run',
         )
 
+    def progress(self, checked, total):
+        if self.verbosity > 1:
+            self.stdout.write('  %d/%d solutions checked\n' % (checked, total))
+
+    def cancel(self, signum, frame):
+        self.stdout.write('Cancelling, waiting for the running checks to finish\n')
+        self.cancelled.set()
+
     def handle(self, *args, **options):
         secondary_check = options['secondary_check']
+        self.verbosity = options['verbosity']
+        # Stop gracefully on Ctrl-C or kill: finish the running checks, don't start new ones
+        self.cancelled = threading.Event()
+        signal.signal(signal.SIGINT, self.cancel)
+        signal.signal(signal.SIGTERM, self.cancel)
         for task in Task.objects.all():
+            if self.cancelled.is_set():
+                break
             if not task.expired():
                 continue
             if not task.all_checker_finished:
                 self.stdout.write('Running all checkers for "%s"\n' % task.title)
-                task.check_all_final_solutions(secondary_check = secondary_check)
-                task.check_all_latest_only_failed_solutions()
+                task.check_all_final_solutions(secondary_check = secondary_check, progress = self.progress, cancel = self.cancelled)
+                task.check_all_latest_only_failed_solutions(progress = self.progress, cancel = self.cancelled)
             else:
                 self.stdout.write('Running all checkers for unchecked solutions in "%s"\n' % task.title)
-                task.check_unchecked_final_solutions(secondary_check = secondary_check)
-        self.stdout.write('Done')
+                task.check_unchecked_final_solutions(secondary_check = secondary_check, progress = self.progress, cancel = self.cancelled)
+        self.stdout.write('Cancelled' if self.cancelled.is_set() else 'Done')
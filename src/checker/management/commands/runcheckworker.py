@@ -0,0 +1,28 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from checker.basemodels import process_check_queue
+
+class Command(BaseCommand):
+    help = 'Process queued solution checks (see setting ASYNCHRONOUS_CHECKING). Several workers may run at once.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='exit as soon as the queue is empty',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            count = process_check_queue()
+            if count:
+                self.stdout.write('Processed %d check jobs\n' % count)
+            if options['once']:
+                break
+            # Don't leave idle connections behind while waiting
+            connection.close()
+            time.sleep(settings.CHECK_WORKER_POLL_INTERVAL)
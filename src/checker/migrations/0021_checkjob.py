@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_accept_disclaimer'),
+        ('checker', '0020_textchecker_begin_with_and_more'),
+        ('solutions', '0007_solution_all_checker_finished'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CheckJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('Q', 'queued'), ('R', 'running'), ('D', 'done'), ('F', 'failed')], default='Q', max_length=1)),
+                ('run_all', models.BooleanField(default=False, help_text='Run all checkers, not only those run at submission.')),
+                ('submission', models.BooleanField(default=False, help_text='Decide about the final flag and send the confirmation email after checking.')),
+                ('protocol', models.CharField(blank=True, default='https', max_length=5)),
+                ('domain', models.CharField(blank=True, max_length=255)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('started', models.DateTimeField(blank=True, null=True)),
+                ('finished', models.DateTimeField(blank=True, null=True)),
+                ('solution', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='solutions.solution')),
+                ('uploader', models.ForeignKey(blank=True, help_text='Set if someone else uploaded the solution in the name of the author.', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='accounts.user')),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+    ]
@@ -0,0 +1,148 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('checker', '0021_checkjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='anonymitychecker',
+            name='cache_results',
+            field=models.BooleanField(default=True, help_text='Reuse earlier results of the same author for byte-identical solution files and unchanged checker configuration. Disable for non-deterministic tests.'),
+        ),
+        migrations.AddField(
+            model_name='autoattestchecker',
+            name='cache_results',
+            field=models.BooleanField(default=True, help_text='Reuse earlier results of the same author for byte-identical solution files and unchanged checker configuration. Disable for non-deterministic tests.'),
+        ),
+        migrations.AddField(
+            model_name='cbuilder',
+            name='cache_results',
+            field=models.BooleanField(default=True, help_text='Reuse earlier results of the same author for byte-identical solution files and unchanged checker configuration. Disable for non-deterministic tests.'),
+        ),
+        migrations.AddField(
+            model_name='checkerresult',
+            name='fingerprint',
+            field=models.CharField(blank=True, db_index=True, help_text='Hash of the solution files and the configuration of this and all previously run checkers. Empty if the result must not be reused.', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='checkstylechecker',
+            name='cache_results',
+            field=models.BooleanField(default=True, help_text='Reuse earlier results of the same author for byte-identical solution files and unchanged checker configuration. Disable for non-deterministic tests.'),
+        ),
+        migrations.AddField(
+            model_name='clinker',
+            name='cache_results',
+            field=models.BooleanField(default=True, help_text='Reuse earlier results of the same author for byte-identical solution files and unchanged checker configuration. Disable for non-deterministic tests.'),
+        ),
+        migrations.AddField(
+            model_name='createfilechecker',
+            name='cache_results',
+            field=models.BooleanField(default=True, help_text='Reuse earlier results of the same author for byte-identical solution files and unchanged checker configuration. Disable for non-deterministic tests.'),
+        ),
+        migrations.AddField(
+            model_name='cunitchecker2',
+            name='cache_results',
+            field=models.BooleanField(default=True, help_text='Reuse earlier results of the same author for byte-identical solution files and unchanged checker configuration. Disable for non-deterministic tests.'),
+        ),
+        migrations.AddField(
+            model_name='cxxbuilder',
+            name='cache_results',
+            field=models.BooleanField(default=True, help_text='Reuse earlier results of the same author for byte-identical solution files and unchanged checker configuration. Disable for non-deterministic tests.'),
+        ),
+        migrations.AddField(
+            model_name='dejagnusetup',
+            name='cache_results',
+            field=models.BooleanField(default=True, help_text='Reuse earlier results of the same author for byte-identical solution files and unchanged checker configuration. Disable for non-deterministic tests.'),
+        ),
+        migrations.AddField(
+            model_name='dejagnutester',
+            name='cache_results',
+            field=models.BooleanField(default=True, help_text='Reuse earlier results of the same author for byte-identical solution files and unchanged checker configuration. Disable for non-deterministic tests.'),
+        ),
+        migrations.AddField(
+            model_name='diffchecker',
+            name='cache_results',
+            field=models.BooleanField(default=True, help_text='Reuse earlier results of the same author for byte-identical solution files and unchanged checker configuration. Disable for non-deterministic tests.'),
+        ),
+        migrations.AddField(
+            model_name='fortranbuilder',
+            name='cache_results',
+            field=models.BooleanField(default=True, help_text='Reuse earlier results of the same author for byte-identical solution files and unchanged checker configuration. Disable for non-deterministic tests.'),
+        ),
+        migrations.AddField(
+            model_name='haskellbuilder',
+            name='cache_results',
+            field=models.BooleanField(default=True, help_text='Reuse earlier results of the same author for byte-identical solution files and unchanged checker configuration. Disable for non-deterministic tests.'),
+        ),
+        migrations.AddField(
+            model_name='haskelltestframeworkchecker',
+            name='cache_results',
+            field=models.BooleanField(default=True, help_text='Reuse earlier results of the same author for byte-identical solution files and unchanged checker configuration. Disable for non-deterministic tests.'),
+        ),
+        migrations.AddField(
+            model_name='interfacechecker',
+            name='cache_results',
+            field=models.BooleanField(default=True, help_text='Reuse earlier results of the same author for byte-identical solution files and unchanged checker configuration. Disable for non-deterministic tests.'),
+        ),
+        migrations.AddField(
+            model_name='isabellechecker',
+            name='cache_results',
+            field=models.BooleanField(default=True, help_text='Reuse earlier results of the same author for byte-identical solution files and unchanged checker configuration. Disable for non-deterministic tests.'),
+        ),
+        migrations.AddField(
+            model_name='javabuilder',
+            name='cache_results',
+            field=models.BooleanField(default=True, help_text='Reuse earlier results of the same author for byte-identical solution files and unchanged checker configuration. Disable for non-deterministic tests.'),
+        ),
+        migrations.AddField(
+            model_name='javachecker',
+            name='cache_results',
+            field=models.BooleanField(default=True, help_text='Reuse earlier results of the same author for byte-identical solution files and unchanged checker configuration. Disable for non-deterministic tests.'),
+        ),
+        migrations.AddField(
+            model_name='junitchecker',
+            name='cache_results',
+            field=models.BooleanField(default=True, help_text='Reuse earlier results of the same author for byte-identical solution files and unchanged checker configuration. Disable for non-deterministic tests.'),
+        ),
+        migrations.AddField(
+            model_name='keepfilechecker',
+            name='cache_results',
+            field=models.BooleanField(default=True, help_text='Reuse earlier results of the same author for byte-identical solution files and unchanged checker configuration. Disable for non-deterministic tests.'),
+        ),
+        migrations.AddField(
+            model_name='linecounter',
+            name='cache_results',
+            field=models.BooleanField(default=True, help_text='Reuse earlier results of the same author for byte-identical solution files and unchanged checker configuration. Disable for non-deterministic tests.'),
+        ),
+        migrations.AddField(
+            model_name='linewidthchecker',
+            name='cache_results',
+            field=models.BooleanField(default=True, help_text='Reuse earlier results of the same author for byte-identical solution files and unchanged checker configuration. Disable for non-deterministic tests.'),
+        ),
+        migrations.AddField(
+            model_name='rchecker',
+            name='cache_results',
+            field=models.BooleanField(default=True, help_text='Reuse earlier results of the same author for byte-identical solution files and unchanged checker configuration. Disable for non-deterministic tests.'),
+        ),
+        migrations.AddField(
+            model_name='scalabuilder',
+            name='cache_results',
+            field=models.BooleanField(default=True, help_text='Reuse earlier results of the same author for byte-identical solution files and unchanged checker configuration. Disable for non-deterministic tests.'),
+        ),
+        migrations.AddField(
+            model_name='scriptchecker',
+            name='cache_results',
+            field=models.BooleanField(default=True, help_text='Reuse earlier results of the same author for byte-identical solution files and unchanged checker configuration. Disable for non-deterministic tests.'),
+        ),
+        migrations.AddField(
+            model_name='textchecker',
+            name='cache_results',
+            field=models.BooleanField(default=True, help_text='Reuse earlier results of the same author for byte-identical solution files and unchanged checker configuration. Disable for non-deterministic tests.'),
+        ),
+    ]
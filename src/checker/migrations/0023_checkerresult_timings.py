@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('checker', '0022_checker_cache_results'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='checkerresult',
+            name='timings',
+            field=models.JSONField(blank=True, default=dict, help_text='Durations of the phases of the run in milliseconds, CPU time and peak memory of the sandboxed commands (see utilities.timing)'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('checker', '0023_checkerresult_timings'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='checkerresult',
+            name='skipped',
+            field=models.BooleanField(default=False, help_text='Indicates whether the test was not run because an earlier critical test failed. Skipped tests only count for the acceptance of the solution if they are required, then as failed.'),
+        ),
+    ]
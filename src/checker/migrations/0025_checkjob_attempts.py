@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('checker', '0024_checkerresult_skipped'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='checkjob',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0, help_text='Number of times a worker started the job (see recover_stale_check_jobs).'),
+        ),
+    ]
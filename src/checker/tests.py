@@ -1,9 +1,18 @@
 import os
+import sys
+import tempfile
+import time
 from os.path import dirname, join
 from django.conf import settings
-from utilities.TestSuite import TestCase
-from utilities.file_operations import copy_file, InvalidZipFile
+from django.core.cache import cache
+from django.urls import reverse
+from django.db import connection
+from django.test import TransactionTestCase
+from utilities.TestSuite import TestCase, create_test_data
+from utilities.file_operations import copy_file, create_tempfolder, InvalidZipFile
+from utilities import safeexec
 import unittest
+import unittest.mock
 
 from solutions.models import Solution, SolutionFile
 from django.core.files import File
@@ -123,7 +132,102 @@ class TestChecker(TestCase):
             if checkerresult.checker.order == 1:
                 self.assertFalse(checkerresult.passed, checkerresult.log)
 
+    def test_createfile_zip_template(self):
+        import shutil
+        import zipfile
+        from checker.basemodels import CheckerEnvironment
+        from utilities import file_operations
+        src = join(dirname(dirname(dirname(__file__))), 'examples', 'simple_zip_file.zip')
+        dest = join(settings.UPLOAD_ROOT, 'directdeposit', 'template_zip_file.zip')
+        # circumvent SuspiciousOperation exception
+        copy_file(src, dest)
+        checker = CreateFileChecker.CreateFileChecker.objects.create(
+                    task = self.task,
+                    order = 0,
+                    unpack_zipfile = True,
+                    path = 'data',
+                    file = dest
+                    )
+        with unittest.mock.patch('utilities.file_operations.unpack_zipfile_to', wraps=file_operations.unpack_zipfile_to) as unpack:
+            self.solution.check_solution()
+            for checkerresult in self.solution.checkerresult_set.all():
+                self.assertTrue(checkerresult.passed, checkerresult.log)
 
+            # the sandbox of every further check gets the files of the template
+            env = CheckerEnvironment(self.solution)
+            try:
+                self.assertIsNone(checker.run_file(env))
+                with open(join(env.tmpdir(), 'data', 'Power.sh'), 'rb') as fd, zipfile.ZipFile(dest) as zip:
+                    self.assertEqual(fd.read(), zip.read('Power.sh'))
+                self.assertIn('data/Power.sh', [name for (name, content) in env.sources()])
+                # which still clash with files of the solution
+                self.assertFalse(checker.run_file(env).passed)
+            finally:
+                env.close()
+                shutil.rmtree(env.tmpdir())
+        self.assertEqual(unpack.call_count, 1)
+        template_dir, names = checker.sandbox_template()
+        self.assertEqual(names, ['Power.sh'])
+        self.assertTrue(os.path.isfile(join(template_dir, 'files', 'Power.sh')))
+
+        # files are not written through symlinks out of the sandbox
+        env = CheckerEnvironment(self.solution)
+        outside = tempfile.mkdtemp()
+        try:
+            os.symlink(outside, join(env.tmpdir(), 'data'))
+            self.assertRaises(InvalidZipFile, checker.run_file, env)
+            self.assertEqual(os.listdir(outside), [])
+        finally:
+            env.close()
+            shutil.rmtree(env.tmpdir())
+            shutil.rmtree(outside)
+
+        # a new zip file is extracted again, the old one is removed once the checker is saved
+        with zipfile.ZipFile(dest, 'w') as zip:
+            zip.writestr('lib/Other.sh', 'echo other')
+        new_template_dir, names = checker.sandbox_template()
+        self.assertEqual(names, ['lib/Other.sh'])
+        self.assertNotEqual(new_template_dir, template_dir)
+        self.assertTrue(os.path.exists(template_dir))
+        checker.save()
+        self.assertFalse(os.path.exists(template_dir))
+        self.assertTrue(os.path.exists(new_template_dir))
+        checker.delete()
+        self.assertFalse(os.path.exists(new_template_dir))
+
+
+
+    def test_lazy_sources(self):
+        import shutil
+        from checker.basemodels import CheckerEnvironment
+        names = sorted(solution_file.path() for solution_file in self.solution.solutionfile_set.all())
+        self.assertTrue(names)
+        with unittest.mock.patch.object(SolutionFile, 'content', autospec=True, side_effect=lambda solution_file: "content of " + solution_file.path()) as content:
+            env = CheckerEnvironment(self.solution)
+            try:
+                self.assertEqual(sorted(env.source_names()), names)
+                self.assertEqual(content.call_count, 0)
+
+                data = join(env.tmpdir(), 'data.bin')
+                with open(data, 'wb') as fd:
+                    fd.write(b'\0' * 1024)
+                env.add_source_file('data.bin', data)
+                env.add_source('added.txt', 'added')
+                self.assertEqual(sorted(name for (name, content) in env.string_sources()), sorted(names + ['added.txt']))
+                self.assertEqual(content.call_count, len(names))
+
+                private_env = env.private_copy()
+                private_env.add_source('private.txt', 'private')
+                self.assertEqual(dict(private_env.sources())[names[0]], "content of " + names[0])
+                self.assertEqual(content.call_count, len(names))
+                self.assertNotIn('private.txt', env.source_names())
+                private_env.close()
+                shutil.rmtree(private_env.tmpdir())
+
+                self.assertEqual(dict(env.sources())['data.bin'], b'\0' * 1024)
+            finally:
+                env.close()
+                shutil.rmtree(env.tmpdir())
 
     def test_interface_checker(self):
         InterfaceChecker.InterfaceChecker.objects.create(
@@ -168,6 +272,77 @@ class TestChecker(TestCase):
         for checkerresult in self.solution.checkerresult_set.all():
             self.assertTrue(checkerresult.passed, checkerresult.log)
 
+    def test_checker_timings(self):
+        src = join(dirname(dirname(dirname(__file__))), 'examples', 'Power.sh')
+        dest = join(settings.UPLOAD_ROOT, 'directdeposit', 'Power.sh')
+        # circumvent SuspiciousOperation exception
+        copy_file(src, dest)
+        ScriptChecker.ScriptChecker.objects.create(
+                    task = self.task,
+                    order = 0,
+                    shell_script = dest
+                    )
+        self.solution.check_solution()
+        checkerresult = self.solution.checkerresult_set.get()
+        checkerresult.refresh_from_db()
+        self.assertIn('execute', checkerresult.timings['phases'])
+        self.assertIn('save', checkerresult.timings['phases'])
+        self.assertEqual(checkerresult.timings['total'], sum(checkerresult.timings['phases'].values()))
+        if not settings.USESAFEDOCKER:
+            self.assertIsNotNone(checkerresult.timings['cpu_time'])
+            self.assertGreater(checkerresult.timings['max_rss'], 0)
+        self.solution.refresh_from_db()
+        self.assertIn('copy', self.solution.check_timings['phases'])
+        self.assertIn('checkers', self.solution.check_timings['phases'])
+        self.assertEqual(self.solution.check_timings['max_rss'], checkerresult.timings['max_rss'])
+
+    def test_metrics(self):
+        src = join(dirname(dirname(dirname(__file__))), 'examples', 'Power.sh')
+        dest = join(settings.UPLOAD_ROOT, 'directdeposit', 'Power.sh')
+        # circumvent SuspiciousOperation exception
+        copy_file(src, dest)
+        ScriptChecker.ScriptChecker.objects.create(
+                    task = self.task,
+                    order = 0,
+                    shell_script = dest
+                    )
+        with tempfile.TemporaryDirectory() as metrics_dir, self.settings(METRICS_DIR=metrics_dir, METRICS_TOKEN="secret"):
+            self.solution.check_solution()
+            self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+            response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION="Bearer secret")
+            self.assertEqual(response.status_code, 200)
+            text = response.content.decode()
+            self.assertIn('praktomat_checker_runs_started_total{checker="ScriptChecker"}', text)
+            self.assertIn('praktomat_checker_runs_finished_total{checker="ScriptChecker",result="passed"}', text)
+            self.assertIn('praktomat_command_duration_seconds_bucket{phase="execute",le="+Inf"}', text)
+
+            self.client.login(username='trainer', password='demo')
+            response = self.client.get(reverse('metrics_dashboard'))
+            self.assertContains(response, 'praktomat_checker_runs_started_total')
+
+    def test_metrics_shared_dir(self):
+        from utilities import metrics
+        key = metrics.sample_key("praktomat_command_timeouts_total", {})
+        with tempfile.TemporaryDirectory() as metrics_dir, self.settings(METRICS_DIR=metrics_dir, METRICS_STALE_AFTER=60):
+            before = metrics.collect()["counters"].get(key, 0)
+            # a process on another host
+            other = metrics.process_file(os.getpid(), "otherhost-0")
+            metrics.write_file(other, {"counters": {key: 1}, "gauges": {}, "histograms": {}})
+            self.assertEqual(metrics.collect()["counters"][key], before + 1)
+            self.assertTrue(os.path.exists(other))
+            # which stopped writing
+            os.utime(other, (time.time() - 120, time.time() - 120))
+            self.assertEqual(metrics.collect()["counters"][key], before + 1)
+            self.assertFalse(os.path.exists(other))
+
+            # this process, taken for a stale one
+            metrics.inc("praktomat_command_timeouts_total")
+            metrics.flush()
+            os.remove(metrics.process_file(os.getpid()))
+            metrics.write_file(metrics.archive_file(), {"counters": {key: before + 2}, "gauges": {}, "histograms": {}})
+            metrics.inc("praktomat_command_timeouts_total")
+            self.assertEqual(metrics.collect()["counters"][key], before + 3)
+
     def test_script_timeout(self):
         src = join(dirname(dirname(dirname(__file__))), 'examples', 'loop.sh')
         dest = join(settings.UPLOAD_ROOT, 'directdeposit', 'loop.sh')
@@ -474,3 +649,372 @@ class TestChecker(TestCase):
         for checkerresult in self.solution.checkerresult_set.all():
             self.assertIn('Could not find file', checkerresult.log, "Test did not complain (%s)" % checkerresult.log)
             self.assertFalse(checkerresult.passed, checkerresult.log)
+
+    def test_cached_results(self):
+        checker = TextChecker.TextChecker.objects.create(
+                    task = self.task,
+                    order = 0,
+                    text = 'System.out',
+                    cache_results = True
+                    )
+        self.solution.check_solution()
+        first = self.solution.checkerresult_set.get()
+
+        # identical files and configuration: the checker must not run again
+        with unittest.mock.patch.object(TextChecker.TextChecker, 'run', side_effect=AssertionError("checker was run")):
+            self.solution.check_solution()
+        second = self.solution.checkerresult_set.exclude(id=first.id).get()
+        self.assertEqual(first.fingerprint, second.fingerprint)
+        self.assertEqual(first.log, second.log)
+        self.assertEqual(first.passed, second.passed)
+
+        # changed configuration
+        checker.text = 'System.err'
+        checker.save()
+        self.solution.check_solution()
+        third = self.solution.checkerresult_set.order_by('-id').first()
+        self.assertNotEqual(first.fingerprint, third.fingerprint)
+
+    def test_cached_results_other_author(self):
+        from accounts.models import User
+        TextChecker.TextChecker.objects.create(
+                    task = self.task,
+                    order = 0,
+                    text = 'System.out',
+                    cache_results = True
+                    )
+        self.solution.check_solution()
+
+        # identical files uploaded by somebody else
+        other = Solution.objects.create(task = self.task, author = User.objects.exclude(id = self.solution.author_id).get(username = 'tutor'))
+        for solution_file in self.solution.solutionfile_set.all():
+            with open(solution_file.file.path, 'rb') as fd:
+                SolutionFile(solution = other, file = File(fd, name = solution_file.path())).save()
+        with unittest.mock.patch.object(TextChecker.TextChecker, 'run', autospec=True, side_effect=TextChecker.TextChecker.run) as run:
+            other.check_solution()
+        self.assertEqual(run.call_count, 1)
+        for result in other.checkerresult_set.all():
+            for first in self.solution.checkerresult_set.filter(content_type = result.content_type, object_id = result.object_id):
+                self.assertEqual(first.fingerprint, result.fingerprint)
+                self.assertNotEqual(first.id, result.id)
+
+        # checkers depending on the author are always run
+        for checker_class in (AnonymityChecker.AnonymityChecker, ScriptChecker.ScriptChecker, JavaChecker.JavaChecker, DejaGnu.DejaGnuTester, DiffChecker.DiffChecker):
+            self.assertFalse(checker_class(task = self.task, cache_results = True).may_reuse_results())
+
+    def test_cached_results_disabled(self):
+        TextChecker.TextChecker.objects.create(
+                    task = self.task,
+                    order = 0,
+                    text = 'System.out',
+                    cache_results = False
+                    )
+        # the fingerprints are not even computed
+        with unittest.mock.patch.object(TextChecker.TextChecker, 'fingerprint', side_effect=AssertionError("fingerprint was computed")):
+            self.solution.check_solution()
+        self.assertEqual(self.solution.checkerresult_set.get().fingerprint, '')
+        with unittest.mock.patch.object(TextChecker.TextChecker, 'run', side_effect=AssertionError("checker was run")):
+            self.assertRaises(AssertionError, self.solution.check_solution)
+
+    def test_file_digest(self):
+        from checker.basemodels import file_digest
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'file')
+            with open(path, 'w') as fd:
+                fd.write('first')
+            digest = file_digest(path)
+            # memoized
+            with unittest.mock.patch('checker.basemodels.open', create=True, side_effect=AssertionError("file was read")):
+                self.assertEqual(file_digest(path), digest)
+            # but not for a changed file
+            with open(path, 'w') as fd:
+                fd.write('second')
+            self.assertNotEqual(file_digest(path), digest)
+
+    def test_checker_registry(self):
+        with self.settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            cache.clear()
+            checker = TextChecker.TextChecker.objects.create(task = self.task, order = 1, text = 'System.out')
+            self.assertEqual(self.task.get_checkers(), [checker])
+            # cached
+            with self.assertNumQueries(0):
+                checkers = self.task.get_checkers()
+            self.assertEqual(checkers, [checker])
+            self.assertIsNot(checkers[0], self.task.get_checkers()[0])
+
+            # saving or deleting a checker invalidates the cache
+            checker.text = 'System.err'
+            checker.save()
+            self.assertEqual(self.task.get_checkers()[0].text, 'System.err')
+            anonymity = AnonymityChecker.AnonymityChecker.objects.create(task = self.task, order = 0)
+            self.assertEqual(self.task.get_checkers(), [anonymity, checker])
+            checker.delete()
+            self.assertEqual(self.task.get_checkers(), [anonymity])
+            cache.clear()
+
+    def test_prefetch_checkers(self):
+        from django.contrib.contenttypes.models import ContentType
+        from checker.basemodels import CheckerResult
+        with self.settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            cache.clear()
+            checkers = [TextChecker.TextChecker.objects.create(task = self.task, order = i, text = 'System.out') for i in range(5)]
+            for checker in checkers:
+                CheckerResult.objects.create(solution = self.solution, content_type = ContentType.objects.get_for_model(checker), object_id = checker.id)
+            # e.g. a result copied from a solution of another task
+            other_task = Task.objects.create(title = 'Other', description = '', publication_date = self.task.publication_date, submission_date = self.task.submission_date)
+            other = AnonymityChecker.AnonymityChecker.objects.create(task = other_task, order = 0)
+            CheckerResult.objects.create(solution = self.solution, content_type = ContentType.objects.get_for_model(other), object_id = other.id)
+            self.task.get_checkers()
+
+            # the results, their artefacts and the checker of the other task
+            with self.assertNumQueries(3):
+                results = sorted(self.solution.checkerResults(), key = lambda result: result.id)
+                self.assertEqual([result.checker for result in results], checkers + [other])
+            with self.assertNumQueries(3):
+                self.assertEqual(len(self.solution.publicCheckerResults()), 6)
+            cache.clear()
+
+    def test_checker_dependencies(self):
+        from checker.basemodels import checker_dependencies
+        builder = JavaBuilder.JavaBuilder.objects.create(task = self.task, order = 0, _flags = "", _output_flags = "", _file_pattern = r"^.*\.java$")
+        text = TextChecker.TextChecker.objects.create(task = self.task, order = 1, text = 'System.out')
+        linewidth = LineWidthChecker.LineWidthChecker.objects.create(task = self.task, order = 2)
+        junit = JUnitChecker.JUnitChecker.objects.create(task = self.task, order = 3, class_name = 'GgTTest', name = 'GgT', test_description = '')
+        rebuilder = JavaBuilder.JavaBuilder.objects.create(task = self.task, order = 4, _flags = "", _output_flags = "", _file_pattern = r"^.*\.java$")
+        dependencies = checker_dependencies(self.task.get_checkers())
+        self.assertEqual(dependencies[builder], [])
+        # readers and checkers with a private sandbox only wait for the last writer
+        self.assertEqual(dependencies[text], [builder])
+        self.assertEqual(dependencies[linewidth], [builder])
+        self.assertEqual(dependencies[junit], [builder])
+        self.assertEqual(dependencies[rebuilder], [builder, text, linewidth, junit])
+
+    def test_check_multiple_progress_and_cancel(self):
+        from checker.basemodels import check_multiple
+        import threading
+        progress = []
+        self.assertEqual(check_multiple([self.solution, self.solution], progress=lambda checked, total: progress.append((checked, total))), 2)
+        self.assertEqual(progress, [(1, 2), (2, 2)])
+        cancel = threading.Event()
+        cancel.set()
+        self.assertEqual(check_multiple([self.solution, self.solution], cancel=cancel), 0)
+
+    def test_skip_checkers_after_critical_failure(self):
+        TextChecker.TextChecker.objects.create(task = self.task, order = 0, text = 'NotInTheSolution', critical = True, required = True)
+        line_width = LineWidthChecker.LineWidthChecker.objects.create(task = self.task, order = 1)
+        with self.settings(SKIP_CHECKERS_AFTER_CRITICAL_FAILURE=True):
+            with unittest.mock.patch.object(LineWidthChecker.LineWidthChecker, 'run', side_effect=AssertionError("checker was run")):
+                self.solution.check_solution()
+        result = line_width.results.get(solution=self.solution)
+        self.assertFalse(result.passed)
+        self.assertIn("skipped", result.log)
+        self.assertTrue(result.skipped)
+
+    def test_skipped_checkers(self):
+        # a failing critical checker, which is not required
+        text = TextChecker.TextChecker.objects.create(task = self.task, order = 0, text = 'NotInTheSolution', critical = True, required = False, cache_results = False)
+        line_width = LineWidthChecker.LineWidthChecker.objects.create(task = self.task, order = 1, required = True)
+        self.solution.check_solution()
+        self.assertTrue(line_width.results.get(solution=self.solution).passed)
+        self.assertTrue(self.solution.accepted)
+
+        # does not let the remaining checkers be skipped, they may still accept the solution
+        with self.settings(SKIP_CHECKERS_AFTER_CRITICAL_FAILURE=True):
+            self.solution.check_solution()
+        result = line_width.results.filter(solution=self.solution).order_by('-id').first()
+        self.assertFalse(result.skipped)
+        self.assertTrue(result.passed)
+        self.assertTrue(self.solution.accepted)
+        self.assertTrue(Solution.objects.get(id=self.solution.id).accepted)
+
+        # after a failing required critical checker the solution is rejected, skipped or not
+        text.required = True
+        text.save()
+        with self.settings(SKIP_CHECKERS_AFTER_CRITICAL_FAILURE=True):
+            self.solution.check_solution()
+        self.assertTrue(line_width.results.filter(solution=self.solution).order_by('-id').first().skipped)
+        self.assertFalse(self.solution.accepted)
+        self.assertFalse(Solution.objects.get(id=self.solution.id).accepted)
+
+    def test_docker_container_pool(self):
+        state_dir = tempfile.mkdtemp()
+        fake_docker = [sys.executable, join(dirname(dirname(__file__)), 'utilities', 'fake_docker.py'), state_dir]
+        working_directory = create_tempfolder(settings.SANDBOX_DIR)
+        # the default reset command would kill the test runner as fake docker does not isolate processes
+        reset_command = ["sh", "-c", "find /tmp /run /home %(sandbox)s -mindepth 1 -delete"]
+        with self.settings(USESAFEDOCKER=True, DOCKER_COMMAND=fake_docker, DOCKER_POOL_SIZE=1, DOCKER_POOL_RESET_COMMAND=reset_command):
+            try:
+                for run in range(3):
+                    [output, error, exitcode, timed_out, oom_ed, truncated] = safeexec.execute_arglist(["sh", "-c", "ls; touch run%d" % run], working_directory)
+                    self.assertEqual(exitcode, 0, output)
+            finally:
+                safeexec.shutdown_container_pools()
+        # the working directory is copied into the container and back
+        self.assertEqual(output.split(), ["run0", "run1"])
+        self.assertEqual(sorted(os.listdir(working_directory)), ["run0", "run1", "run2"])
+        with open(join(state_dir, "calls.log")) as log:
+            started = [call for call in log if call.startswith("run ")]
+        # one container for the first command, possibly one more from warming up the pool
+        self.assertLessEqual(len(started), 2)
+
+    def test_docker_container_pool_not_writable(self):
+        working_directory = create_tempfolder(settings.SANDBOX_DIR)
+        with self.settings(USESAFEDOCKER=True, DOCKER_POOL_SIZE=1, DOCKER_CONTAINER_WRITABLE=True):
+            # changes to the root file system would survive the reset
+            self.assertIsNone(safeexec.get_container_pool(working_directory, {}, [], None, []))
+
+    def test_docker_sandbox_session(self):
+        state_dir = tempfile.mkdtemp()
+        fake_docker = [sys.executable, join(dirname(dirname(__file__)), 'utilities', 'fake_docker.py'), state_dir]
+        working_directory = create_tempfolder(settings.SANDBOX_DIR)
+        # the default reset command would kill the test runner as fake docker does not isolate processes
+        with self.settings(USESAFEDOCKER=True, DOCKER_COMMAND=fake_docker, DOCKER_SESSION_RESET_COMMAND=["true"]):
+            session = safeexec.start_sandbox_session(working_directory)
+            try:
+                for run in range(3):
+                    [output, error, exitcode, timed_out, oom_ed, truncated] = safeexec.execute_arglist(["sh", "-c", "touch run%d" % run], working_directory)
+                    self.assertEqual(exitcode, 0, output)
+            finally:
+                session.close()
+        self.assertEqual(sorted(os.listdir(working_directory)), ["run0", "run1", "run2"])
+        with open(join(state_dir, "calls.log")) as log:
+            calls = [call.split()[0] for call in log]
+        # all commands ran in a single container, which is removed when the session is closed
+        self.assertEqual(calls.count("run"), 1)
+        self.assertEqual(calls[-1], "rm")
+
+    def test_sandbox_sessions_setting(self):
+        from checker.basemodels import CheckerEnvironment
+        env = CheckerEnvironment(self.solution)
+        self.assertNotIn(env.tmpdir(), safeexec._sandbox_sessions)
+        env.close()
+        with self.settings(DOCKER_SANDBOX_SESSIONS=True):
+            env = CheckerEnvironment(self.solution)
+            copy = env.private_copy()
+        self.assertIn(env.tmpdir(), safeexec._sandbox_sessions)
+        self.assertIn(copy.tmpdir(), safeexec._sandbox_sessions)
+        copy.close()
+        env.close()
+        self.assertNotIn(env.tmpdir(), safeexec._sandbox_sessions)
+
+    def test_container_pools_not_inherited(self):
+        working_directory = create_tempfolder(settings.SANDBOX_DIR)
+        session = safeexec.start_sandbox_session(working_directory)
+        with self.settings(DOCKER_POOL_SIZE=0):
+            try:
+                safeexec._container_pools["key"] = safeexec.ContainerPool(None, [], [], None)
+                pid = os.fork()
+                if pid == 0:
+                    # a forked check worker starts without containers
+                    os._exit(0 if not safeexec._container_pools and not safeexec._sandbox_sessions else 1)
+                self.assertEqual(os.waitpid(pid, 0)[1], 0)
+            finally:
+                session.close()
+                safeexec.shutdown_container_pools()
+
+    def test_execute_arglist_maxlogsize(self):
+        working_directory = create_tempfolder(settings.SANDBOX_DIR)
+        # 1 MB of output, only 1 kbyte is kept
+        [output, error, exitcode, timed_out, oom_ed, truncated] = safeexec.execute_arglist(["sh", "-c", "echo begin; yes | head -c 1000000; echo end"], working_directory, maxlogsize=1)
+        self.assertTrue(truncated)
+        self.assertEqual(exitcode, 0)
+        self.assertLess(len(output), 1200)
+        self.assertIn("begin", output)
+        self.assertIn("end", output)
+        self.assertIn("Output too long", output)
+
+    def test_execute_arglist_maxlogsize_zero(self):
+        working_directory = create_tempfolder(settings.SANDBOX_DIR)
+        [output, error, exitcode, timed_out, oom_ed, truncated] = safeexec.execute_arglist(["sh", "-c", "yes | head -c 1000000"], working_directory, maxlogsize=0)
+        self.assertTrue(truncated)
+        self.assertLess(len(output), 200)
+
+    def test_execute_arglist_kill_on_maxlogsize_once(self):
+        working_directory = create_tempfolder(settings.SANDBOX_DIR)
+        terminate_process = safeexec.terminate_process
+        def slow_terminate_process(*args):
+            # the timeout expires while the process is stopped because of its output
+            time.sleep(1.5)
+            terminate_process(*args)
+        with self.settings(TEST_KILL_ON_MAXLOGSIZE=True), \
+             unittest.mock.patch('utilities.safeexec.terminate_process', side_effect=slow_terminate_process) as terminate:
+            [output, error, exitcode, timed_out, oom_ed, truncated] = safeexec.execute_arglist(["sh", "-c", "yes | head -c 100000; sleep 60"], working_directory, timeout=0.5, maxlogsize=1)
+        self.assertTrue(truncated)
+        self.assertEqual(terminate.call_count, 1)
+
+    def test_execute_arglist_termination_schedule(self):
+        working_directory = create_tempfolder(settings.SANDBOX_DIR)
+        with self.settings(TEST_TERMINATION_SCHEDULE=[("TERM", 0.5), ("KILL", 5)]):
+            start = time.time()
+            # ignores all but the last signal
+            [output, error, exitcode, timed_out, oom_ed, truncated] = safeexec.execute_arglist(["sh", "-c", "trap '' TERM; echo started; sleep 60"], working_directory, timeout=1)
+            elapsed = time.time() - start
+        self.assertTrue(timed_out)
+        self.assertIn("started", output)
+        self.assertLess(elapsed, 5)
+
+    def test_execute_arglist_environment_per_call(self):
+        from concurrent.futures import ThreadPoolExecutor
+        working_directory = create_tempfolder(settings.SANDBOX_DIR)
+        def run(value):
+            return safeexec.execute_arglist(["sh", "-c", "sleep 0.5; echo $PRAKTOMAT_TEST_VALUE"], working_directory, environment_variables={"PRAKTOMAT_TEST_VALUE": value})[0]
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            outputs = list(executor.map(run, ["first", "second"]))
+        self.assertEqual(outputs, ["first\n", "second\n"])
+        self.assertNotIn("PRAKTOMAT_TEST_VALUE", os.environ)
+
+    def test_execute_arglist_timeout_covers_output(self):
+        working_directory = create_tempfolder(settings.SANDBOX_DIR)
+        start = time.time()
+        # the shell exits at once, but the background process keeps the output open
+        [output, error, exitcode, timed_out, oom_ed, truncated] = safeexec.execute_arglist(["sh", "-c", "sleep 60 & echo started"], working_directory, timeout=1)
+        elapsed = time.time() - start
+        self.assertTrue(timed_out)
+        self.assertIn("started", output)
+        self.assertLess(elapsed, 10)
+
+
+class TestParallelCheckers(TransactionTestCase):
+    """ The threads running checkers in parallel use their own database connections,
+    which only see committed data, so these tests do not run in a transaction. """
+
+    # restores the data of the migrations (e.g. the groups) after each test
+    serialized_rollback = True
+
+    def setUp(self):
+        self.solution = Solution.objects.all()[0]
+        self.task = self.solution.task
+
+    def _fixture_teardown(self):
+        # the tables are emptied after each test, the other tests need the test data
+        super()._fixture_teardown()
+        connection.creation.deserialize_db_from_string(connection._test_serialized_contents)
+        create_test_data()
+
+    def test_checkers_in_parallel(self):
+        import threading
+        from checker import basemodels
+        TextChecker.TextChecker.objects.create(task = self.task, order = 0, text = 'System.out')
+        LineWidthChecker.LineWidthChecker.objects.create(task = self.task, order = 1)
+        AnonymityChecker.AnonymityChecker.objects.create(task = self.task, order = 2)
+        threads = set()
+        run_checker = basemodels.run_checker
+        def record_thread(*args, **kwargs):
+            threads.add(threading.get_ident())
+            return run_checker(*args, **kwargs)
+        with self.settings(CHECKERS_IN_PARALLEL=4), \
+             unittest.mock.patch('checker.basemodels.run_checker', side_effect=record_thread):
+            self.solution.check_solution()
+        self.assertNotIn(threading.get_ident(), threads)
+        self.assertEqual(self.solution.checkerresult_set.count(), 3)
+        self.assertTrue(self.solution.checkerresult_set.filter(passed=True).exists())
+
+    def test_checkers_in_parallel_within_transaction(self):
+        from django.db import transaction
+        TextChecker.TextChecker.objects.create(task = self.task, order = 0, text = 'System.out')
+        LineWidthChecker.LineWidthChecker.objects.create(task = self.task, order = 1)
+        with self.settings(CHECKERS_IN_PARALLEL=4), \
+             unittest.mock.patch('checker.basemodels.run_checkers_in_parallel', side_effect=AssertionError("checkers were run in threads")):
+            with transaction.atomic():
+                self.solution.check_solution()
+                self.assertEqual(self.solution.checkerresult_set.count(), 2)
@@ -1,3 +1,31 @@
+import copy
+import time
+
+from utilities import request_memo
+
+# Process wide cache: (Settings object, time it was loaded)
+_cached_settings = None
+
 def get_settings():
+    """ Returns (a copy of) the site wide Settings object.
+
+    It is loaded from the database once per request (see utilities.request_memo) and otherwise at most every
+    settings.SETTINGS_CACHE_TIMEOUT seconds per process, or when it was saved in this process.
+    Other processes see a change after that timeout. """
+    return copy.copy(request_memo.memoized('settings', load_settings))
+
+def load_settings():
+    global _cached_settings
+    from django.conf import settings
     from configuration.models import Settings
-    return Settings.objects.get(id=1)
+    cached = _cached_settings
+    if cached is None or time.monotonic() - cached[1] >= settings.SETTINGS_CACHE_TIMEOUT:
+        cached = (Settings.objects.get(id=1), time.monotonic())
+        _cached_settings = cached
+    return cached[0]
+
+def invalidate_settings():
+    """ Makes get_settings() load the settings from the database again in this process. """
+    global _cached_settings
+    _cached_settings = None
+    request_memo.forget('settings')
@@ -1,6 +1,10 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
 from datetime import date, timedelta
 
+from configuration import invalidate_settings
+
 class Settings(models.Model):
     """ Singleton object containing site wide settings configurable by the trainer. """
 
@@ -161,3 +165,10 @@ class Chunk(models.Model):
 
     def __str__(self):
         return "%s" % (self.key,)
+
+
+@receiver(post_save, sender=Settings)
+def settings_saved(sender, instance, **kwargs):
+    invalidate_settings()
+    # others may have loaded the old settings before the change was committed
+    transaction.on_commit(invalidate_settings)
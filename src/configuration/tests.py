@@ -2,6 +2,8 @@ from datetime import datetime, timedelta
 
 from utilities.TestSuite import TestCase
 
+from configuration import get_settings, invalidate_settings
+from utilities.request_memo import RequestMemoMiddleware
 from configuration.models import Chunk
 
 class TestConfiguration(TestCase):
@@ -19,3 +21,26 @@ class TestConfiguration(TestCase):
     def testLoginMessage(self):
         chunk = Chunk.objects.get(key="Login Message")
         self.assertIsNotNone(chunk)
+
+    def testSettingsCache(self):
+        with self.settings(SETTINGS_CACHE_TIMEOUT=60):
+            invalidate_settings()
+            with self.assertNumQueries(1):
+                get_settings()
+                settings = get_settings()
+            # callers get their own copy
+            settings.deadline_tolerance = timedelta(hours=1)
+            self.assertNotEqual(get_settings().deadline_tolerance, timedelta(hours=1))
+            # saving invalidates the cache
+            settings.save()
+            self.assertEqual(get_settings().deadline_tolerance, timedelta(hours=1))
+            invalidate_settings()
+
+    def testSettingsPerRequest(self):
+        def view(request):
+            get_settings()
+            get_settings()
+        with self.assertNumQueries(1):
+            RequestMemoMiddleware(view)(None)
+        with self.assertNumQueries(2):
+            view(None)
@@ -99,6 +99,7 @@ def load_defaults(settings):
 
     d.MIDDLEWARE = [
         'django.middleware.common.CommonMiddleware',
+        'utilities.request_memo.RequestMemoMiddleware',
         #'sessionprofile.middleware.SessionProfileMiddleware', #phpBB integration
         'django.contrib.sessions.middleware.SessionMiddleware',
         'django.contrib.messages.middleware.MessageMiddleware',
@@ -137,6 +138,44 @@ def load_defaults(settings):
     # up the processing
     d.SANDBOX_DIR = join(UPLOAD_ROOT, 'SolutionSandbox')
 
+    # Zip files of checkers which are unpacked into the sandbox are extracted into this directory once,
+    # and the files are copied from there into the sandbox of every check (as reflinks where the file
+    # system supports them, so it should be on the same file system as SANDBOX_DIR).
+    d.SANDBOX_TEMPLATE_DIR = join(UPLOAD_ROOT, 'SandboxTemplates')
+
+    # Every process writes its metrics of the checking subsystem (see utilities/metrics.py) into this
+    # directory, at most every METRICS_FLUSH_INTERVAL seconds. They are served in the Prometheus text
+    # format at /metrics (to staff and to requests with the header "Authorization: Bearer <METRICS_TOKEN>")
+    # and shown at /admin/metrics/. None only shows the metrics of the web server process.
+    d.METRICS_DIR = join(UPLOAD_ROOT, 'Metrics')
+    d.METRICS_FLUSH_INTERVAL = 10
+    # Processes on other hosts sharing METRICS_DIR count as gone once their file was not written for this many seconds
+    d.METRICS_STALE_AFTER = 3600
+    d.METRICS_TOKEN = None
+
+    # How uploaded files are sent once the views checked the permissions (see utilities/views.py):
+    # "xsendfile" hands them to Apache's mod_xsendfile with the header X-Sendfile,
+    # "nginx" to nginx with the header X-Accel-Redirect: SENDFILE_NGINX_LOCATION followed by the path
+    # below UPLOAD_ROOT, which has to be an internal location aliased to UPLOAD_ROOT,
+    # "python" sends them from Django (for development). None uses "python" with the development
+    # server and "xsendfile" otherwise.
+    d.SENDFILE_BACKEND = None
+    d.SENDFILE_NGINX_LOCATION = '/protected/'
+
+    # Does Apache use "mod_xsendfile" version 1.0?
+    # If you use "libapache2-mod-xsendfile", this flag needs to be set to False
+    d.MOD_XSENDFILE_V1_0 = True
+
+    # The cache has to be shared by all processes (web server, check workers), as it
+    # holds e.g. the checker configuration of the tasks (see CHECKER_REGISTRY_TIMEOUT).
+    # Use memcached or redis if the processes run on several hosts.
+    d.CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': join(UPLOAD_ROOT, 'Cache'),
+        }
+    }
+
     d.ROOT_URLCONF = 'urls'
 
     d.LOGIN_REDIRECT_URL = 'task_list'
@@ -236,6 +275,14 @@ def load_defaults(settings):
     # Is this a mirror of another instance (different styling)
     d.MIRROR = False
 
+    # Limits of the zip files uploaded as solutions: number of files and their total size in KiB once
+    # unpacked (see SolutionFile.expand_zip)
+    d.SOLUTION_ZIP_MAX_FILES = 2000
+    d.SOLUTION_ZIP_MAX_SIZE = 200 * 1024
+
+    # Number of students shown per page of the checker result overview of a task
+    d.CHECKER_RESULT_LIST_PAGE_SIZE = 100
+
     # The Compiler binarys used to compile a submitted solution
     d.C_BINARY = 'gcc'
     d.CXX_BINARY = 'c++'
@@ -299,6 +346,37 @@ def load_defaults(settings):
     # after running a check with safe-docker.
     d.DOCKER_DISCARD_ARTEFACTS = False
 
+    # The command used to run docker
+    d.DOCKER_COMMAND = ["sudo", "docker"]
+
+    # Number of started containers kept per image and resource limits, to execute
+    # commands in (with "docker exec") instead of starting a new container for each
+    # command. 0 disables the pool, as does DOCKER_CONTAINER_WRITABLE (the containers
+    # are used for the commands of different solutions).
+    # The working directory is copied into a tmpfs in the container, whose content counts
+    # against the memory limit (TEST_MAXMEM) of the commands: choose the limit large enough
+    # for the commands and their working directory, including build outputs.
+    d.DOCKER_POOL_SIZE = 0
+
+    # Number of commands after which a pooled container is replaced by a new one
+    d.DOCKER_POOL_MAX_USES = 100
+
+    # Idle pooled containers are checked to be still running after this many seconds
+    d.DOCKER_POOL_HEALTH_CHECK_INTERVAL = 60
+    d.DOCKER_POOL_HEALTH_CHECK_TIMEOUT = 10
+
+    # Command resetting a pooled container after use: killing remaining processes and
+    # deleting temporary files. %(sandbox)s is replaced by the SANDBOX_DIR.
+    d.DOCKER_POOL_RESET_COMMAND = ["sh", "-c", "kill -KILL -1; find /tmp /run /home %(sandbox)s -mindepth 1 -delete"]
+
+    # Run the commands of all checkers of a solution in containers started once for the solution
+    # (a sandbox session, with "docker exec") instead of in a new container per command.
+    # The containers mount the sandbox directory of the solution.
+    d.DOCKER_SANDBOX_SESSIONS = False
+
+    # Command run in the container of a sandbox session (shared by the commands of all checkers of a solution) after each command.
+    d.DOCKER_SESSION_RESET_COMMAND = ["sh", "-c", "kill -KILL -1; find /tmp /run /home -mindepth 1 -delete"]
+
 
     # be sure that you change file permission
     # sudo chown praktomat:tester praktomat/src/checker/scripts/java
@@ -388,11 +466,66 @@ def load_defaults(settings):
     # JUnitChecker, ScriptChecker,
     d.TEST_MAXLOGSIZE=64
 
+    # Kill a checker's program as soon as its output exceeds TEST_MAXLOGSIZE,
+    # instead of discarding the excess output until the program ends.
+    d.TEST_KILL_ON_MAXLOGSIZE = False
+
+    # Signals sent to a checker's program (and everything it started) when it has to be stopped (e.g. on timeout),
+    # each followed by the maximal number of seconds to wait for the processes to end before sending the next one.
+    d.TEST_TERMINATION_SCHEDULE = [("TERM", 5), ("INT", 9), ("HUP", 5), ("KILL", 5)]
+
     # Maximum number of open file descriptors for a checker.
     d.TEST_MAXFILENUMBER=128
 
     d.NUMBER_OF_TASKS_TO_BE_CHECKED_IN_PARALLEL = 1
 
+    # Number of solutions a worker process of the check pool (see NUMBER_OF_TASKS_TO_BE_CHECKED_IN_PARALLEL)
+    # checks before it is replaced by a fresh process. None keeps the workers for the lifetime of the pool.
+    d.CHECK_POOL_MAX_TASKS_PER_WORKER = 500
+
+    # Number of threads running the checkers of a single solution. Checkers which only read the sandbox
+    # (or work on a private copy of it) run in parallel, checkers writing to the sandbox wait for all earlier ones.
+    # Checks within a database transaction always run their checkers one after another.
+    d.CHECKERS_IN_PARALLEL = 1
+
+    # Don't run the remaining checkers of a solution once a required critical checker failed (the solution is rejected
+    # and their results would be hidden anyway), record a failed "skipped" result for them instead.
+    d.SKIP_CHECKERS_AFTER_CRITICAL_FAILURE = False
+
+    # Set this to True to check uploaded solutions in separate worker processes
+    # instead of within the web request. The upload then returns immediately
+    # and the solution page shows the state of the check. At least one worker
+    # has to be running in this case:
+    #    ./manage.py runcheckworker
+    # If False, the check is done before the upload request returns.
+    d.ASYNCHRONOUS_CHECKING = False
+
+    # Seconds a check worker waits before polling an empty queue again
+    d.CHECK_WORKER_POLL_INTERVAL = 2
+
+    # A check job running for longer than this many seconds is assumed to be left behind by a worker
+    # which crashed or was killed. It is queued again, unless it was already started CHECK_JOB_MAX_ATTEMPTS
+    # times, then it is marked as failed.
+    d.CHECK_JOB_TIMEOUT = 60 * 60
+    d.CHECK_JOB_MAX_ATTEMPTS = 2
+
+    # Seconds each process keeps the settings configured in the admin (see configuration.get_settings)
+    # before reading them from the database again. Changes take effect in other processes after this time.
+    d.SETTINGS_CACHE_TIMEOUT = 10
+
+    # Seconds the checkers of a task are kept in the cache. Changes made in the admin
+    # (or anywhere else the checkers are saved) take effect immediately anyway.
+    d.CHECKER_REGISTRY_TIMEOUT = 24 * 3600
+
+    # Seconds the start and end of the exams (see Task.exam) are kept in the cache. Tasks saved
+    # in the admin take effect immediately, changes which bypass Task.save (e.g. queryset updates) after this time.
+    d.EXAM_WINDOWS_CACHE_TIMEOUT = 5 * 60
+
+    # Reuse checker results of earlier runs if the solution files and the
+    # configuration of all checkers of the task did not change (e.g. for
+    # re-uploads of identical files or rechecks). Can be disabled per checker.
+    d.CHECKER_RESULT_CACHE = True
+
     d.MIMETYPE_ADDITIONAL_EXTENSIONS = \
         [("text/plain", ".properties"),
          ("text/x-gradle", ".gradle"),
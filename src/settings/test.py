@@ -33,6 +33,16 @@ DATABASES = {
     }
 }
 
+# Don't cache anything, the database is rolled back after each test (without any signals)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+    }
+}
+
+# The database is rolled back after each test, don't keep the settings
+SETTINGS_CACHE_TIMEOUT = 0
+
 DEBUG = False
 
 PRIVATE_KEY = join(dirname(dirname(dirname(__file__))), 'examples', 'certificates', 'privkey.pem')
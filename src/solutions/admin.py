@@ -8,6 +8,7 @@ from django.db import transaction
 from django.db.models import Max
 from django.utils.html import format_html
 from django.utils.safestring import mark_safe
+from utilities import timing
 
 
 
@@ -22,7 +23,7 @@ class SolutionFileInline(admin.TabularInline):
     model = SolutionFile
     extra = 0
     can_delete = False
-    readonly_fields=["mime_type", "file"]
+    readonly_fields=["mime_type", "file", "size", "line_count", "charset"]
 
 
 class IsLatestOfOnlyFailedFilter(admin.SimpleListFilter):
@@ -84,9 +85,9 @@ class SolutionAdmin(admin.ModelAdmin):
     list_display = ["edit", "view_url", "download_url", "run_checker_url", "task", "show_author", "number", "creation_date", "final", "accepted", "tests_failed", "all_checker_finished", "latest_of_only_failed", "plagiarism"]
     list_filter = ["task", "author", "author__groups", "creation_date" , IsLatestOfOnlyFailedFilter ,"final", "accepted", "warnings", "plagiarism"]
     fieldsets = ((None, {
-                    'fields': ( "task", "show_author", "creation_date", ("final", "accepted", "warnings", "all_checker_finished"), "plagiarism", 'useful_links')
+                    'fields': ( "task", "show_author", "creation_date", ("final", "accepted", "warnings", "all_checker_finished"), "plagiarism", "check_timings_summary", 'useful_links')
                 }),)
-    readonly_fields=["task", "show_author", "creation_date", "accepted", "final", "all_checker_finished", "tests_failed", 'useful_links']
+    readonly_fields=["task", "show_author", "creation_date", "accepted", "final", "all_checker_finished", "tests_failed", "check_timings_summary", 'useful_links']
     inlines =  [CheckerResultInline, SolutionFileInline]
     actions = ['run_checkers', 'run_checkers_all', 'mark_plagiarism', 'mark_no_plagiarism']
 
@@ -136,7 +137,7 @@ class SolutionAdmin(admin.ModelAdmin):
              #    ) AS "has failed Checkers"
              # FROM solutions_solution s
 
-            _tests_failed_computed_for_sorting=  Exists( CheckerResult.objects.only('id').filter( solution_id=OuterRef('id'),passed=False)) ,
+            _tests_failed_computed_for_sorting=  Exists( CheckerResult.objects.only('id').filter( solution_id=OuterRef('id'),passed=False,skipped=False)) ,
 
 
             # In pure SQL we could use a correlated Subquery with EXISTS in outer SELECT-statement:
@@ -167,15 +168,15 @@ class SolutionAdmin(admin.ModelAdmin):
 
     def run_checkers_all(self, request, queryset):
         """ Run Checkers (including those not run at submission) for selected solution """
-        check_multiple(queryset, True)
-        self.message_user(request, "Checkers (including those not run at submission) for selected solutions were successfully run.")
+        count = check_multiple(queryset, True)
+        self.message_user(request, "Checkers (including those not run at submission) for %d selected solutions were successfully run." % count)
 
     run_checkers_all.short_description = "Run Checkers (including those not run at submission) for selected solution "
 
     def run_checkers(self, request, queryset):
         """ Run Checkers (only those also run at submission) for selected solutions"""
-        check_multiple(queryset, False)
-        self.message_user(request, "Checkers (only those also run at submission) for selected solutions were successfully run.")
+        count = check_multiple(queryset, False)
+        self.message_user(request, "Checkers (only those also run at submission) for %d selected solutions were successfully run." % count)
 
     run_checkers.short_description = "Run Checkers (only those also run at submission) for selected solutions"
 
@@ -231,6 +232,10 @@ class SolutionAdmin(admin.ModelAdmin):
         else:
             return ""
 
+    def check_timings_summary(self, solution):
+        return timing.format_timings(solution.check_timings)
+    check_timings_summary.short_description = 'Timings of the last check'
+
     def tests_failed(self,solution):
         #return CheckerResult.objects.filter(solution=solution,passed=False).exists();
         #since we had annotated the queryset already, for sorting this computed column, just reuse that annotated values for visualisation
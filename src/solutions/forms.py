@@ -1,6 +1,7 @@
 from django.utils.translation import gettext_lazy
 from django.forms.models import ModelForm, inlineformset_factory, BaseInlineFormSet
 from django import forms
+from django.conf import settings
 import zipfile
 from utilities.mimetypes import guess_mime_type_with_fallback as guess_mime_type
 import re
@@ -38,14 +39,17 @@ class SolutionFileForm(ModelForm):
                     zip = zipfile.ZipFile(data)
                     if zip.testzip():
                         raise forms.ValidationError(gettext_lazy('The zip file seems to be corrupt.'))
-                    if sum(fileinfo.file_size for fileinfo in zip.infolist()) > (max_file_size * min(len(zip.infolist()), 8)):
+                    # only the files which are added to the solution count (see SolutionFile.expand_zip)
+                    members = SolutionFile.zip_members(zip)
+                    if sum(fileinfo.file_size for fileinfo in members) > min(max_file_size * min(len(members), 8), settings.SOLUTION_ZIP_MAX_SIZE * 1024):
                         # Protect against zip bombs
                         raise forms.ValidationError(gettext_lazy('The zip file is too big.'))
-                    for fileinfo in zip.infolist():
+                    if len(members) > settings.SOLUTION_ZIP_MAX_FILES:
+                        raise forms.ValidationError(gettext_lazy('The zip file contains more than %(count)d files, which is not supported.') % {'count': settings.SOLUTION_ZIP_MAX_FILES})
+                    for fileinfo in members:
                         filename = fileinfo.filename
                         mime_type = guess_mime_type(filename)
-                        ignorred = SolutionFile.ignorred_file_names_re.search(filename)
-                        is_text_file = not ignorred and mime_type and mime_type.startswith("text")
+                        is_text_file = mime_type and mime_type.startswith("text")
                         if is_text_file and contains_NUL_char(zip.read(filename)):
                             raise forms.ValidationError(gettext_lazy("The plain text file '%(file)s' in this zip file contains a NUL character, which is not supported." %{'file':filename}))
                         # check whole zip instead of contained files
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from solutions.models import SolutionFile
+
+class Command(BaseCommand):
+    help = 'Compute the hash, size, line count and charset of solution files uploaded before they were stored (see SolutionFile.set_metadata).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='number of solution files updated at once',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        count = 0
+        last_id = 0
+        while True:
+            batch = list(SolutionFile.objects.filter(sha256='', id__gt=last_id).order_by('id')[:batch_size])
+            if not batch:
+                break
+            last_id = batch[-1].id
+            updated = []
+            for solution_file in batch:
+                try:
+                    solution_file.set_metadata()
+                    solution_file.file.close()
+                except OSError as e:
+                    self.stderr.write('Skipping %s: %s\n' % (solution_file.file.name, e))
+                    continue
+                updated.append(solution_file)
+            SolutionFile.objects.bulk_update(updated, ['sha256', 'size', 'line_count', 'charset'])
+            count += len(updated)
+        self.stdout.write("%i solution files have been updated." % count)
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('solutions', '0007_solution_all_checker_finished'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='solution',
+            name='check_timings',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Durations of the phases of the last check in milliseconds, CPU time and peak memory of the sandboxed commands (see utilities.timing)'),
+        ),
+    ]
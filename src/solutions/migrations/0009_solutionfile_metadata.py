@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('solutions', '0008_solution_check_timings'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='solutionfile',
+            name='charset',
+            field=models.CharField(blank=True, editable=False, help_text='Detected character set of text files. Automatically set on save().', max_length=50),
+        ),
+        migrations.AddField(
+            model_name='solutionfile',
+            name='line_count',
+            field=models.IntegerField(editable=False, help_text='Number of lines of the file. Automatically set on save().', null=True),
+        ),
+        migrations.AddField(
+            model_name='solutionfile',
+            name='sha256',
+            field=models.CharField(blank=True, editable=False, help_text='SHA-256 hash of the content. Automatically set on save().', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='solutionfile',
+            name='size',
+            field=models.BigIntegerField(editable=False, help_text='Size of the file in bytes. Automatically set on save().', null=True),
+        ),
+    ]
@@ -1,3 +1,4 @@
+import io
 import zipfile
 import tempfile
 import shutil
@@ -8,17 +9,21 @@ from hashlib import sha256
 from django.db import models
 from django.utils.translation import gettext_lazy
 from django.core.files import File
+from django.core.files.base import ContentFile
 from django.db.models import Max
 from django.db import transaction
 from django.conf import settings
+from django.template import loader
 from django.template.loader import render_to_string
 from django.db.models.signals import post_delete
 from django.dispatch.dispatcher import receiver
-from django.core.mail import EmailMessage
+from django.core.mail import EmailMessage, send_mail, get_connection
 
 from accounts.models import User
 from utilities import encoding, file_operations
 from utilities.mimetypes import guess_mime_type_with_fallback as guess_mime_type
+from utilities.safeexec import execute_arglist
+from utilities.zipstream import ZipStream
 from configuration import get_settings
 
 class Solution(models.Model):
@@ -36,19 +41,23 @@ class Solution(models.Model):
     plagiarism = models.BooleanField( default = False, help_text = gettext_lazy('Indicates whether the solution is a rip-off of another one.'))
     final = models.BooleanField( default = False, help_text = gettext_lazy('Indicates whether this solution is the last (accepted) of the author.'))
     all_checker_finished = models.BooleanField(default = False, help_text = gettext_lazy('Indicates whether all checkers have been run for this solution.'))
+    check_timings = models.JSONField(default = dict, blank = True, editable = False, help_text = gettext_lazy('Durations of the phases of the last check in milliseconds, CPU time and peak memory of the sandboxed commands (see utilities.timing)'))
 
     def __str__(self):
         return "%s:%s:%s" % (self.task, self.author , self.number)
         #return str(self.task) + ":" + str(self.author) + ":" + str(self.number)
 
+    def checkerResults(self):
+        """ Returns the checker results with their checkers and artefacts loaded in bulk. """
+        from checker.basemodels import prefetch_checkers
+        return prefetch_checkers(self.checkerresult_set.all().prefetch_related('artefacts'), self.task)
+
     def allCheckerResults(self):
-        results = self.checkerresult_set.all().prefetch_related('artefacts')
-        return until_critical(sorted(results, key=lambda result: result.checker.order))
+        return until_critical(sorted(self.checkerResults(), key=lambda result: result.checker.order))
 
     def publicCheckerResults(self):
         # return self.checkerresult_set.filter(checker__public=True) won't work, because checker is a genericForeignKey!
-        results = self.checkerresult_set.all().prefetch_related('artefacts')
-        return until_critical(sorted([x for x in self.checkerresult_set.all() if x.public()], key = lambda result: result.checker.order))
+        return until_critical(sorted([x for x in self.checkerResults() if x.public()], key = lambda result: result.checker.order))
 
     def copySolutionFiles(self, toTempDir):
         for file in self.solutionfile_set.all():
@@ -73,6 +82,31 @@ class Solution(models.Model):
         from checker.basemodels import check_solution
         check_solution(self, run_secret, debug_keep_tmp, secondary_check)
 
+    def queue_check(self, run_secret = False, submission = False, uploader = None, protocol = 'https', domain = ''):
+        """Queues a check of this solution, see checker.basemodels.CheckJob"""
+        from checker.basemodels import queue_check
+        return queue_check(self, run_secret, submission, uploader, protocol, domain)
+
+    def latest_check_job(self):
+        return self.checkjob_set.order_by('-id').first()
+
+    def finish_submission(self, protocol, domain, uploader = None):
+        """ Called once the checkers of an uploaded solution finished:
+        makes the solution final if appropriate and sends the confirmation email. """
+        current_final_solution = Solution.objects.filter(task=self.task, author=self.author, final=True).first()
+        newer_final_solution_existing = False
+        if current_final_solution is not None:
+            if current_final_solution.creation_date > self.creation_date:
+                # The student (re-)submitted another final solution while the checkers were running
+                # This can't be the final solution anymore
+                newer_final_solution_existing = True
+        if (self.accepted or get_settings().accept_all_solutions) and not newer_final_solution_existing:
+            self.final = True
+            self.save()
+
+        if self.accepted:
+            send_submission_confirmation(self, protocol, domain, uploader)
+
     def attestations_by(self, user):
         return self.attestation_set.filter(author=user)
 
@@ -124,6 +158,10 @@ class SolutionFile(models.Model):
     solution = models.ForeignKey(Solution, on_delete=models.CASCADE)
     file = models.FileField(upload_to = get_solutionfile_upload_path, max_length=500, help_text = gettext_lazy('Source code file as part of a solution an archive file (.zip) containing multiple solution files.'))
     mime_type = models.CharField(max_length=100, help_text = gettext_lazy("Guessed file type. Automatically  set on save()."))
+    sha256 = models.CharField(max_length=64, blank=True, editable=False, help_text = gettext_lazy("SHA-256 hash of the content. Automatically set on save()."))
+    size = models.BigIntegerField(null=True, editable=False, help_text = gettext_lazy("Size of the file in bytes. Automatically set on save()."))
+    line_count = models.IntegerField(null=True, editable=False, help_text = gettext_lazy("Number of lines of the file. Automatically set on save()."))
+    charset = models.CharField(max_length=50, blank=True, editable=False, help_text = gettext_lazy("Detected character set of text files. Automatically set on save()."))
 
     # ignore hidden or os-specific files, etc. in zipfiles
     regex = r'(' + '|'.join([
@@ -136,27 +174,88 @@ class SolutionFile(models.Model):
 
     ignorred_file_names_re = re.compile(regex)
 
+    @classmethod
+    def zip_members(cls, zip):
+        """ Returns the infos of the files in the zip file which are added to a solution (no folders, hidden or os-specific files). """
+        return [info for info in zip.infolist() if not info.is_dir() and not cls.ignorred_file_names_re.search(info.filename)]
+
     def save(self, *args, **kwargs):
         """ override save method to automatically expand zip files"""
         if self.file.name.upper().endswith('.ZIP'):
-            zip = zipfile.ZipFile(self.file, 'r')
-            for zip_file_name in zip.namelist():
-                if not self.ignorred_file_names_re.search(zip_file_name):
-                    new_solution_file = SolutionFile(solution=self.solution)
-                    temp_file = tempfile.NamedTemporaryFile()                                    # autodeleted
-                    temp_file.write(zip.open(zip_file_name).read())
-                    zip_file_name = zip_file_name  if isinstance(zip_file_name, str) else str(zip_file_name, errors='replace')
-                    new_solution_file.file.save(zip_file_name, File(temp_file), save=True)        # need to check for filenames begining with / or ..?
+            self.expand_zip()
         else:
             self.mime_type = guess_mime_type(self.file.name)
+            if not self.sha256:
+                self.set_metadata()
+                self.normalize_encoding()
             if 'update_fields' in kwargs:
-                kwargs['update_fields'] = {'mime_type'}.union(kwargs['update_fields'])
+                kwargs['update_fields'] = {'file', 'mime_type', 'sha256', 'size', 'line_count', 'charset'}.union(kwargs['update_fields'])
             super().save(*args, **kwargs)
 
+    def set_metadata(self, reader=None):
+        """ Sets the hash, size, line count and charset from the content of the file, or from a
+        file_operations.HashingReader which has read it (and detected the charset if it is a text file). """
+        if reader is None:
+            self.file.open('rb')
+            reader = file_operations.HashingReader(self.file, detect_charset=not self.isBinary())
+            reader.consume()
+            self.file.seek(0)
+        self.sha256 = reader.hexdigest()
+        self.size = reader.size
+        self.line_count = reader.line_count()
+        self.charset = reader.charset()
+
+    def normalize_encoding(self):
+        """ Stores a text file in another charset (see set_metadata) as utf-8 instead, which is how it was
+        written into the sandbox, so it can be copied there unchanged (see copyTo). """
+        if self.isBinary() or self.charset in ('', 'utf-8'):
+            return
+        self.file.open('rb')
+        content = encoding.get_utf8(encoding.decode(self.file.read(), self.charset))
+        if self.file._committed:
+            name = self.path()
+            self.file.delete(save=False)
+        else:
+            name = self.file.name
+        self.file.save(name, ContentFile(content), save=False)
+        reader = file_operations.HashingReader(io.BytesIO(content))
+        reader.consume()
+        self.set_metadata(reader)
+        self.charset = 'utf-8'
+
+    def expand_zip(self):
+        """ Adds the files in the uploaded zip file to the solution instead of the zip file itself.
+
+        The files are copied to the storage in chunks, their hash, size, line count and charset are
+        computed on the way (see set_metadata) and the rows are inserted at once. Raises InvalidZipFile if the zip file contains more than
+        settings.SOLUTION_ZIP_MAX_FILES files or more than settings.SOLUTION_ZIP_MAX_SIZE KiB. """
+        zip = zipfile.ZipFile(self.file, 'r')
+        members = self.zip_members(zip)
+        if len(members) > settings.SOLUTION_ZIP_MAX_FILES:
+            raise file_operations.InvalidZipFile("The zip file contains more than %d files." % settings.SOLUTION_ZIP_MAX_FILES)
+        budget = file_operations.ReadBudget(settings.SOLUTION_ZIP_MAX_SIZE * 1024)
+        new_solution_files = []
+        try:
+            for info in members:
+                new_solution_file = SolutionFile(solution=self.solution, mime_type=guess_mime_type(info.filename))
+                with zip.open(info) as member:
+                    reader = file_operations.HashingReader(member, budget, detect_charset=not new_solution_file.isBinary())
+                    new_solution_file.file.save(info.filename, File(reader, info.filename), save=False)        # need to check for filenames begining with / or ..?
+                new_solution_file.set_metadata(reader)
+                new_solution_file.normalize_encoding()
+                new_solution_files.append(new_solution_file)
+        except Exception:
+            for new_solution_file in new_solution_files:
+                new_solution_file.file.delete(save=False)
+            raise
+        SolutionFile.objects.bulk_create(new_solution_files)
+
     def __str__(self):
         return self.file.name.rpartition('/')[2]
 
     def get_hash(self):
+        if self.sha256:
+            return self.sha256
         self.file.seek(0)
         s = sha256()
         s.update(self.file.read())
@@ -194,18 +293,19 @@ class SolutionFile(models.Model):
         """docstring for content"""
         if self.isBinary():
             return "Binary Data"
+        elif self.charset:
+            return encoding.decode(self.file.read(), self.charset)
         else:
             return encoding.get_unicode(self.file.read())
 
     def copyTo(self, directory):
         """ Copies this file to the given directory """
         new_file_path = os.path.join(directory, self.path())
-        if self.isBinary():
-            full_directory = os.path.join(directory, os.path.dirname(self.path()))
-            if not os.path.exists(full_directory):
-                file_operations.makedirs(full_directory)
-            shutil.copy(self.file.file.name, new_file_path)
+        if self.isBinary() or self.charset == 'utf-8':
+            # utf-8 text files would be written unchanged by create_file
+            file_operations.copy_file(self.file.path, new_file_path)
         else:
+            # uploaded before the charset was stored (see normalize_encoding)
             file_operations.create_file(new_file_path, self.content())
 
 # from http://stackoverflow.com/questions/5372934
@@ -231,22 +331,32 @@ class DummyFile:
 
 
 def get_solutions_zip(solutions,include_copy_checker_files=False,include_artifacts=False):
-    zip_file = tempfile.TemporaryFile()
-    zip = zipfile.ZipFile(zip_file, 'w', allowZip64 = True)
+    """ Yields the chunks of a zip archive of the solutions (see utilities.zipstream), for a StreamingHttpResponse.
+
+    The files, checker results and artefacts of all solutions are loaded in bulk and the checker
+    configuration and the files rendered from it once per task (see SolutionsZipTask). """
+    zip = ZipStream()
     praktomat_files_destination          = "praktomat-files/"
-    testsuite_destination                = praktomat_files_destination + "testsuite/"
     createfile_checker_files_destination = praktomat_files_destination + "other/"
-    script_checker_files_destination     = praktomat_files_destination + "other/"
-    checkstyle_checker_files_destination = praktomat_files_destination + "checkstyle/"
     artefact_files_destination           = praktomat_files_destination + "artefacts/"
     solution_files_destination           = "solution/"
 
+    if isinstance(solutions, models.QuerySet):
+        solutions = solutions.select_related('task', 'author')
+    solutions = list(solutions)
+    models.prefetch_related_objects(solutions, 'solutionfile_set', *(['checkerresult_set__artefacts'] if include_artifacts else []))
+    tasks = {solution.task_id: solution.task for solution in solutions}
+    if include_artifacts:
+        from checker.basemodels import prefetch_checkers
+        for task_id, task in tasks.items():
+            prefetch_checkers([result for solution in solutions if solution.task_id == task_id for result in solution.checkerresult_set.all()], task)
+
     tmpdir = None
     createfile_checker_files_destinations = []
     createfile_checker_files = []
 
     if include_copy_checker_files:
-        createfile_checker = { checker for solution in solutions for checker in solution.task.createfilechecker_set.all().filter(include_in_solution_download=True) }
+        createfile_checker = [ checker for task in tasks.values() for checker in task.createfilechecker_set.all().filter(include_in_solution_download=True) ]
         createfile_checker_files = [(createfile_checker_files_destination + checker.path + '/' + checker.path_relative_to_sandbox(),        checker.file)          for checker in createfile_checker if not checker.unpack_zipfile]
         # Temporary build directory
         sandbox = settings.SANDBOX_DIR
@@ -263,75 +373,91 @@ def get_solutions_zip(solutions,include_copy_checker_files=False,include_artifac
             )
         createfile_checker_files_destinations = {createfile_checker_files_destination + checker.path for checker in createfile_checker if checker.is_sourcecode}
 
+    zip_tasks = {task_id: SolutionsZipTask(task, include_copy_checker_files, createfile_checker_files_destinations) for task_id, task in tasks.items()}
+    anonymous_attestation = get_settings().anonymous_attestation
 
+    try:
+        for solution in solutions:
+            zip_task = zip_tasks[solution.task_id]
+            # TODO: make this work for anonymous attestation, too
+            if anonymous_attestation:
+                project_path = 'User' + index
+                project_name = str(solution.task) + "-" + 'User ' + index
+            else:
+                project_path = path_for_user(solution.author)
+                project_name = str(solution.task) + "-" + solution.author.get_full_name()
+            base_name = path_for_task(solution.task) + '/' + project_path + '/'
+
+            # We need to pass unicode strings to ZipInfo to ensure that it sets bit
+            # 11 appropriately if the filename contains non-ascii characters.
+            assert isinstance(base_name, str)
+
+            artefact_files = []
+            if include_artifacts:
+                results = until_critical(sorted(solution.checkerresult_set.all(), key=lambda result: result.checker.order))
+                artefacts = [ artefact for result in results for artefact in result.artefacts.all() ]
+                artefact_files = [(artefact_files_destination + os.path.basename(artefact.file.name), artefact.file) for artefact in artefacts]
+
+            yield from zip.writestr(base_name+'.project', render_to_string('solutions/eclipse/project.xml', { 'name': project_name, 'checkstyle' : zip_task.checkstyle }).encode("utf-8"))
+            for name, content in zip_task.rendered_files:
+                yield from zip.writestr(base_name+name, content)
+
+            if zip_task.junit4:
+                yield from zip.writestr(base_name+praktomat_files_destination+'AllJUnitTests.launch', render_to_string('solutions/eclipse/AllJUnitTests.launch', { 'project_name' : project_name, 'praktomat_files_destination' : praktomat_files_destination}).encode("utf-8"))
+                yield from zip.write(os.path.dirname(__file__)+"/../checker/scripts/eclipse-junit.policy", (base_name+praktomat_files_destination+'eclipse-junit.policy'))
+
+            solution_files  = [ (solution_files_destination+solutionfile.path(), solutionfile.file) for solutionfile in solution.solutionfile_set.all()]
+
+            for (name, file) in solution_files + createfile_checker_files + zip_task.checker_files + artefact_files:
+                zippath = os.path.normpath(base_name + name)
+                assert isinstance(zippath, str)
+                if zippath not in zip: # Do not overwrite files from the solution by checker files
+                    yield from zip.write(file.path, zippath)
+                    assert zip.getinfo(zippath) # file was really added under name "zippath" (not only some normalization thereof)
+
+        yield from zip.close()
+    finally:
+        if include_copy_checker_files:
+            if (tmpdir is None) or (not os.path.isdir(tmpdir)) or (not os.path.basename(tmpdir).startswith("tmp")):
+                raise Exception("Invalid tmpdir: " + tmpdir)
+            shutil.rmtree(tmpdir)
 
-    for solution in solutions:
-        # TODO: make this work for anonymous attestation, too
-        if get_settings().anonymous_attestation:
-            project_path = 'User' + index
-            project_name = str(solution.task) + "-" + 'User ' + index
-        else:
-            project_path = path_for_user(solution.author)
-            project_name = str(solution.task) + "-" + solution.author.get_full_name()
-        base_name = path_for_task(solution.task) + '/' + project_path + '/'
+class SolutionsZipTask:
+    """ What get_solutions_zip adds to the project of every solution of a task: the files rendered from the
+    checker configuration (which only depend on the task) and the checker files. """
 
-        # We need to pass unicode strings to ZipInfo to ensure that it sets bit
-        # 11 appropriately if the filename contains non-ascii characters.
-        assert isinstance(base_name, str)
+    def __init__(self, task, include_copy_checker_files, createfile_checker_files_destinations):
+        praktomat_files_destination          = "praktomat-files/"
+        testsuite_destination                = praktomat_files_destination + "testsuite/"
+        createfile_checker_files_destination = praktomat_files_destination + "other/"
+        script_checker_files_destination     = praktomat_files_destination + "other/"
+        checkstyle_checker_files_destination = praktomat_files_destination + "checkstyle/"
 
         checkstyle_checker_files = []
         script_checker_files     = []
-        artefact_files           = []
         junit3 = False
-        junit4 = False
-        checkstyle = False
+        self.junit4 = False
+        self.checkstyle = False
         if include_copy_checker_files:
-            checkstyle_checker = solution.task.checkstylechecker_set.all()
-            script_checker     = solution.task.scriptchecker_set.all()
-            junit_checker      = solution.task.junitchecker_set.all()
-            junit3     = bool([ 0 for j in junit_checker if  j.junit_version == 'junit3' ])
-            junit4     = bool([ 0 for j in junit_checker if  j.junit_version == 'junit4' ])
-            checkstyle = bool(checkstyle_checker)
+            checkstyle_checker = list(task.checkstylechecker_set.all())
+            script_checker     = list(task.scriptchecker_set.all())
+            junit_checker      = list(task.junitchecker_set.all())
+            junit3      = bool([ 0 for j in junit_checker if  j.junit_version == 'junit3' ])
+            self.junit4 = bool([ 0 for j in junit_checker if  j.junit_version == 'junit4' ])
+            self.checkstyle = bool(checkstyle_checker)
 
             checkstyle_checker_files = [(checkstyle_checker_files_destination + os.path.basename(checker.configuration.name), checker.configuration) for checker in checkstyle_checker]
             script_checker_files     = [(script_checker_files_destination     + checker.path_relative_to_sandbox(),    checker.shell_script)  for checker in script_checker]
+        self.checker_files = checkstyle_checker_files + script_checker_files
 
-        if include_artifacts:
-            artefacts = [ artefact for result in solution.allCheckerResults() for artefact in result.artefacts.all() ]
-            artefact_files = [(artefact_files_destination + os.path.basename(artefact.file.name), artefact.file) for artefact in artefacts]
-
-        zip.writestr(base_name+'.project', render_to_string('solutions/eclipse/project.xml', { 'name': project_name, 'checkstyle' : checkstyle }).encode("utf-8"))
-        zip.writestr(base_name+'.settings/org.eclipse.jdt.core.prefs', render_to_string('solutions/eclipse/settings/org.eclipse.jdt.core.prefs', { }).encode("utf-8"))
-
-        zip.writestr(base_name+'.classpath', render_to_string('solutions/eclipse/classpath.xml', {'junit3' : junit3, 'junit4': junit4, 'createfile_checker_files' : include_copy_checker_files, 'createfile_checker_files_destinations' : createfile_checker_files_destinations, 'testsuite_destination' : testsuite_destination }).encode("utf-8"))
-        if checkstyle:
-            zip.writestr(base_name+'.checkstyle', render_to_string('solutions/eclipse/checkstyle.xml', {'checkstyle_files' : [filename for (filename, _) in checkstyle_checker_files], 'createfile_checker_files_destination' : createfile_checker_files_destination, 'testsuite_destination' : testsuite_destination }).encode("utf-8"))
-
-        if junit4:
-            zip.writestr(base_name+testsuite_destination+'AllJUnitTests.java', render_to_string('solutions/eclipse/AllJUnitTests.java', { 'testclasses' : [ j.class_name for j in junit_checker if j.junit_version == 'junit4' ]}).encode("utf-8"))
-            zip.writestr(base_name+praktomat_files_destination+'AllJUnitTests.launch', render_to_string('solutions/eclipse/AllJUnitTests.launch', { 'project_name' : project_name, 'praktomat_files_destination' : praktomat_files_destination}).encode("utf-8"))
-            zip.write(os.path.dirname(__file__)+"/../checker/scripts/eclipse-junit.policy", (base_name+praktomat_files_destination+'eclipse-junit.policy'))
-
-        solution_files  = [ (solution_files_destination+solutionfile.path(), solutionfile.file) for solutionfile in solution.solutionfile_set.all()]
-
-        for (name, file) in solution_files + createfile_checker_files + checkstyle_checker_files + script_checker_files + artefact_files:
-            zippath = os.path.normpath(base_name + name)
-            assert isinstance(zippath, str)
-            try: # Do not overwrite files from the solution by checker files
-                zip.getinfo(zippath)
-            except KeyError:
-                zip.write(file.path, zippath)
-                assert zip.getinfo(zippath) # file was really added under name "zippath" (not only some normalization thereof)
-
-    zip.close()
-    zip_file.seek(0)
-
-    if include_copy_checker_files:
-        if (tmpdir is None) or (not os.path.isdir(tmpdir)) or (not os.path.basename(tmpdir).startswith("tmp")):
-            raise Exception("Invalid tmpdir: " + tmpdir)
-        shutil.rmtree(tmpdir)
-
-    return zip_file
+        self.rendered_files = [
+            ('.settings/org.eclipse.jdt.core.prefs', render_to_string('solutions/eclipse/settings/org.eclipse.jdt.core.prefs', { }).encode("utf-8")),
+            ('.classpath', render_to_string('solutions/eclipse/classpath.xml', {'junit3' : junit3, 'junit4': self.junit4, 'createfile_checker_files' : include_copy_checker_files, 'createfile_checker_files_destinations' : createfile_checker_files_destinations, 'testsuite_destination' : testsuite_destination }).encode("utf-8")),
+        ]
+        if self.checkstyle:
+            self.rendered_files.append(('.checkstyle', render_to_string('solutions/eclipse/checkstyle.xml', {'checkstyle_files' : [filename for (filename, _) in checkstyle_checker_files], 'createfile_checker_files_destination' : createfile_checker_files_destination, 'testsuite_destination' : testsuite_destination }).encode("utf-8")))
+        if self.junit4:
+            self.rendered_files.append((testsuite_destination+'AllJUnitTests.java', render_to_string('solutions/eclipse/AllJUnitTests.java', { 'testclasses' : [ j.class_name for j in junit_checker if j.junit_version == 'junit4' ]}).encode("utf-8")))
 
 def path_for_user(user):
     return user.get_full_name().replace("/","\u2044")+'-'+str(user.mat_number)+'-'+str(user.id)
@@ -344,6 +470,42 @@ path_regexp = re.compile(r'[^-]*-[^-]*-(.*)')
 def id_for_path(path):
     return path_regexp.match(path).group(1)
 
+def send_submission_confirmation(solution, protocol, domain, uploader = None):
+    """ Send submission confirmation email """
+    t = loader.get_template('solutions/submission_confirmation_email.html')
+    c = {
+        'protocol': protocol,
+        'domain': domain,
+        'site_name': settings.SITE_NAME,
+        'solution': solution,
+    }
+    if uploader:
+        # in case someone else uploaded the solution, add this to the email
+        c['uploader'] = uploader
+
+    # we create an smime signed message with openssl, if a private-key and certificate is configured
+    if settings.PRIVATE_KEY and settings.CERTIFICATE:
+        with tempfile.NamedTemporaryFile(mode='w+') as tmp:
+            tmp.write("Content-Type: text/plain; charset=utf-8\n")
+            tmp.write("Content-Transfer-Encoding: quoted-printable\n\n")
+
+            tmp.write(t.render(c))
+            tmp.flush()
+            tmp.seek(0)
+            environ = {}
+            environ['LANG'] = settings.LANG
+            environ['LANGUAGE'] = settings.LANGUAGE
+            [signed_mail, __, __, __, __, __]  = execute_arglist(["openssl", "smime", "-sign", "-signer", settings.CERTIFICATE, "-inkey", settings.PRIVATE_KEY, "-in", tmp.name], ".", environment_variables=environ, unsafe=True)
+
+        connection = get_connection()
+        message = ConfirmationMessage(gettext_lazy("%s submission confirmation") % settings.SITE_NAME, signed_mail, None, [solution.author.email], connection=connection)
+        if solution.author.email:
+             message.send() # any PY2-PY3 problem in here ?
+
+    else: #we are sending unsigned email
+        if solution.author.email:
+             send_mail(gettext_lazy("%s submission confirmation") % settings.SITE_NAME, t.render(c), None, [solution.author.email])
+
 class ConfirmationMessage(EmailMessage):
     """
     Special EmailMessage to combine headers set by OpenSSL S/MIME and django sendmail.
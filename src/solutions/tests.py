@@ -1,12 +1,24 @@
+import io
+import shutil
+import tempfile
+from hashlib import sha256
+import os
+import zipfile
 from os.path import dirname, join
 from datetime import datetime, timedelta
 
 from utilities.TestSuite import TestCase
 from django.test.client import Client
 from django.urls import reverse
+from django.conf import settings
+from django.contrib.auth.models import Group
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from solutions.models import Solution
+from checker.basemodels import CheckJob, process_check_queue
 from tasks.models import Task
+from accounts.models import User
 
 class TestViews(TestCase):
     def setUp(self):
@@ -43,10 +55,259 @@ class TestViews(TestCase):
                             }, follow=True)
         self.assertEqual(response.status_code, 403)
 
+    def test_post_solution_asynchronous(self):
+        path = join(dirname(dirname(dirname(__file__))), 'examples', 'Tasks', 'AMI', 'ModelSolution(flat).zip')
+        with self.settings(ASYNCHRONOUS_CHECKING=True):
+            with open(path, 'rb') as f:
+                response = self.client.post(reverse('solution_list', args=[self.task.id]), data={
+                                    'solutionfile_set-INITIAL_FORMS': '0',
+                                    'solutionfile_set-TOTAL_FORMS': '3',
+                                    'solutionfile_set-0-file': f
+                                }, follow=True)
+            self.assertRedirectsToView(response, 'solution_detail')
+            self.assertContains(response, 'queued for checking')
+            solution = response.context['solution']
+            self.assertEqual(solution.latest_check_job().status, CheckJob.QUEUED)
+
+            self.assertEqual(process_check_queue(), 1)
+            solution.refresh_from_db()
+            self.assertEqual(solution.latest_check_job().status, CheckJob.DONE)
+            self.assertTrue(solution.final)
+
+    def test_recover_stale_check_jobs(self):
+        from datetime import datetime, timedelta
+        from django.core import mail
+        solution = self.task.solution_set.all()[0]
+        with self.settings(ASYNCHRONOUS_CHECKING=True, CHECK_JOB_TIMEOUT=60, CHECK_JOB_MAX_ATTEMPTS=2, ADMINS=[('Admin', 'admin@example.com')]):
+            # a worker took the job and died
+            job = solution.queue_check()
+            self.assertTrue(job.claim())
+            self.assertEqual(process_check_queue(), 0)
+            CheckJob.objects.filter(pk=job.pk).update(started=datetime.now() - timedelta(minutes=2))
+            self.assertEqual(process_check_queue(), 1)
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts), (CheckJob.DONE, 2))
+
+            # and again, too often
+            job = solution.queue_check()
+            self.assertTrue(job.claim())
+            CheckJob.objects.filter(pk=job.pk).update(started=datetime.now() - timedelta(minutes=2), attempts=2)
+            self.assertEqual(process_check_queue(), 0)
+            job.refresh_from_db()
+            self.assertEqual(job.status, CheckJob.FAILED)
+            self.assertFalse(job.is_pending())
+            self.assertEqual(len(mail.outbox), 1)
+
+    def test_requeued_check_job_not_overwritten(self):
+        solution = self.task.solution_set.all()[0]
+        with self.settings(ASYNCHRONOUS_CHECKING=True):
+            # a slow worker took the job, which was requeued and claimed by another worker meanwhile
+            job = solution.queue_check()
+            self.assertTrue(job.claim())
+            CheckJob.objects.filter(pk=job.pk).update(status=CheckJob.QUEUED, started=None)
+            self.assertTrue(CheckJob.objects.get(pk=job.pk).claim())
+            job.process()
+            self.assertEqual(CheckJob.objects.get(pk=job.pk).status, CheckJob.RUNNING)
+
     def test_get_solution(self):
         response = self.client.get(reverse('solution_detail', args=[self.task.solution_set.all()[0].id]))
         self.assertEqual(response.status_code, 200)
 
+    def test_solution_download(self):
+        solution = self.task.solution_set.all()[0]
+        self.client.login(username='trainer', password='demo')
+        for view, args in [('solution_download', [solution.id]), ('solution_download_full', [solution.id]), ('solution_download_for_task', [self.task.id])]:
+            response = self.client.get(reverse(view, args=args))
+            self.assertTrue(response.streaming)
+            zip = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+            self.assertIsNone(zip.testzip())
+            if view != 'solution_download_for_task':
+                for solution_file in solution.solutionfile_set.all():
+                    self.assertIn(solution_file.path(), [name.split('/solution/', 1)[-1] for name in zip.namelist()])
+
+    def zip_upload(self, files):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        data = io.BytesIO()
+        with zipfile.ZipFile(data, 'w') as zip:
+            for name, content in files.items():
+                zip.writestr(name, content)
+        return SimpleUploadedFile('solution.zip', data.getvalue())
+
+    def test_expand_zip(self):
+        from solutions.models import SolutionFile
+        solution = Solution.objects.create(task = self.task, author = User.objects.get(username='user'))
+        files = {'src/Main.java': b'class Main {}', 'README.txt': b'x' * 100000, '.hidden': b'', '__MACOSX/Main.java': b''}
+        solution_file = SolutionFile(solution = solution, file = self.zip_upload(files))
+        with self.assertNumQueries(1):
+            solution_file.save()
+        saved = {saved_file.path(): saved_file for saved_file in solution.solutionfile_set.all()}
+        self.assertEqual(sorted(saved), ['README.txt', 'src/Main.java'])
+        for path, saved_file in saved.items():
+            with open(saved_file.file.path, 'rb') as f:
+                self.assertEqual(f.read(), files[path])
+            self.assertEqual(saved_file.get_hash(), sha256(files[path]).hexdigest())
+        self.assertEqual(saved['src/Main.java'].mime_type, 'text/x-java')
+        self.assertEqual((saved['README.txt'].size, saved['README.txt'].line_count, saved['README.txt'].charset), (100000, 1, 'utf-8'))
+
+    def test_post_solution_zip_max_files(self):
+        # the os-specific files of a zip file are not added to the solution and don't count
+        files = {'Main.java': b'class Main {}', 'Util.java': b'class Util {}', '__MACOSX/._Main.java': b'x', '__MACOSX/._Util.java': b'x'}
+        with self.settings(SOLUTION_ZIP_MAX_FILES=2):
+            response = self.client.post(reverse('solution_list', args=[self.task.id]), data={
+                                'solutionfile_set-INITIAL_FORMS': '0',
+                                'solutionfile_set-TOTAL_FORMS': '3',
+                                'solutionfile_set-0-file': self.zip_upload(files)
+                            }, follow=True)
+        self.assertRedirectsToView(response, 'solution_detail')
+
+    def test_post_solution_zip_too_many_files(self):
+        files = {'Main.java': b'class Main {}', 'Util.java': b'class Util {}', 'Test.java': b'class Test {}'}
+        count = Solution.objects.count()
+        with self.settings(SOLUTION_ZIP_MAX_FILES=2):
+            response = self.client.post(reverse('solution_list', args=[self.task.id]), data={
+                                'solutionfile_set-INITIAL_FORMS': '0',
+                                'solutionfile_set-TOTAL_FORMS': '3',
+                                'solutionfile_set-0-file': self.zip_upload(files)
+                            }, follow=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'more than 2 files')
+        # no solution without files is left behind
+        self.assertEqual(Solution.objects.count(), count)
+
+    def test_solutionfile_metadata(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from django.core.management import call_command
+        from solutions.models import SolutionFile
+        solution = Solution.objects.create(task = self.task, author = User.objects.get(username='user'))
+        text = '// Grüße aus Köln, Äpfel und Öl für die Übung\n' * 20
+        content = text.encode('utf-8')
+        solution_file = SolutionFile(solution = solution, file = SimpleUploadedFile('Main.java', content))
+        solution_file.save()
+        solution_file = SolutionFile.objects.get(id = solution_file.id)
+        self.assertEqual((solution_file.size, solution_file.line_count, solution_file.charset), (len(content), 20, 'utf-8'))
+        self.assertEqual(solution_file.content(), text)
+        self.assertEqual(solution_file.get_hash(), sha256(content).hexdigest())
+
+        # files uploaded before
+        SolutionFile.objects.update(sha256 = '', size = None, line_count = None, charset = '')
+        call_command('backfill_solutionfile_metadata', stdout = io.StringIO())
+        solution_file.refresh_from_db()
+        self.assertEqual((solution_file.sha256, solution_file.size, solution_file.charset), (sha256(content).hexdigest(), len(content), 'utf-8'))
+        self.assertFalse(SolutionFile.objects.filter(sha256 = '').exists())
+
+    def test_solutionfile_normalized_to_utf8(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from solutions.models import SolutionFile
+        solution = Solution.objects.create(task = self.task, author = User.objects.get(username='user'))
+        text = '// Grüße aus Köln, Äpfel und Öl für die Übung\n' * 20
+        latin1 = SolutionFile(solution = solution, file = SimpleUploadedFile('Main.java', text.encode('ISO-8859-1')))
+        latin1.save()
+        SolutionFile(solution = solution, file = self.zip_upload({'src/Other.java': text.encode('ISO-8859-1'), 'data.bin': b'\xff\x00\xfe'})).save()
+        for solution_file in solution.solutionfile_set.all():
+            with open(solution_file.file.path, 'rb') as f:
+                stored = f.read()
+            if solution_file.path() == 'data.bin':
+                self.assertEqual(stored, b'\xff\x00\xfe')
+                continue
+            self.assertEqual(stored, text.encode('utf-8'))
+            self.assertEqual((solution_file.charset, solution_file.size, solution_file.sha256), ('utf-8', len(stored), sha256(stored).hexdigest()))
+            self.assertEqual(solution_file.content(), text)
+        self.assertEqual(solution.solutionfile_set.count(), 3)
+
+        # copied unchanged into the sandbox
+        sandbox = tempfile.mkdtemp()
+        try:
+            solution.copySolutionFiles(sandbox)
+            with open(os.path.join(sandbox, 'src', 'Other.java'), 'rb') as f:
+                self.assertEqual(f.read(), text.encode('utf-8'))
+            with open(os.path.join(sandbox, 'data.bin'), 'rb') as f:
+                self.assertEqual(f.read(), b'\xff\x00\xfe')
+        finally:
+            shutil.rmtree(sandbox)
+
+    def test_serve_solution_file(self):
+        solution_file = self.task.solution_set.all()[0].solutionfile_set.all()[0]
+        self.client.login(username='trainer', password='demo')
+        url = '/upload/' + solution_file.file.name
+        with self.settings(SENDFILE_BACKEND='nginx', SENDFILE_NGINX_LOCATION='/protected/'):
+            response = self.client.get(url)
+            self.assertEqual(response['X-Accel-Redirect'], '/protected/' + solution_file.file.name)
+            self.assertEqual(response.content, b'')
+        with self.settings(SENDFILE_BACKEND='xsendfile', MOD_XSENDFILE_V1_0=False):
+            response = self.client.get(url)
+            self.assertEqual(response['X-Sendfile'], solution_file.file.path)
+            self.assertEqual(int(response['Content-Length']), solution_file.file.size)
+        with self.settings(SENDFILE_BACKEND='python'):
+            response = self.client.get(url)
+            with open(solution_file.file.path, 'rb') as f:
+                self.assertEqual(b''.join(response.streaming_content), f.read())
+
+    def test_solutions_zip_queries(self):
+        from solutions.models import get_solutions_zip
+        from checker.checker.ScriptChecker import ScriptChecker
+        from utilities.file_operations import copy_file
+        dest = join(settings.UPLOAD_ROOT, 'directdeposit', 'Power.sh')
+        copy_file(join(dirname(dirname(dirname(__file__))), 'examples', 'Power.sh'), dest)
+        ScriptChecker.objects.create(task = self.task, order = 0, shell_script = dest)
+        solution = self.task.solution_set.all()[0]
+        solutions = Solution.objects.filter(task = self.task)
+        queries = CaptureQueriesContext(connection)
+        with queries:
+            first = zipfile.ZipFile(io.BytesIO(b''.join(get_solutions_zip(solutions, True, True))))
+        # the number of queries does not depend on the number of solutions
+        files = list(solution.solutionfile_set.all())
+        solution.id = None
+        solution.number = None
+        solution.author = User.objects.get(username='tutor')
+        solution.save()
+        for solution_file in files:
+            solution_file.id = None
+            solution_file.solution = solution
+            solution_file.save()
+        more_queries = CaptureQueriesContext(connection)
+        with more_queries:
+            second = zipfile.ZipFile(io.BytesIO(b''.join(get_solutions_zip(solutions, True, True))))
+        self.assertLessEqual(len(more_queries), len(queries))
+        self.assertEqual(len(second.namelist()), 2 * len(first.namelist()))
+
+    def test_checker_result_list(self):
+        from django.contrib.contenttypes.models import ContentType
+        from checker.basemodels import CheckerResult
+        from checker.checker.TextChecker import TextChecker
+        from checker.checker.AnonymityChecker import AnonymityChecker
+        text = TextChecker.objects.create(task = self.task, order = 1, text = 'System.out')
+        anonymity = AnonymityChecker.objects.create(task = self.task, order = 0)
+        for solution in self.task.solution_set.all():
+            solution.final = True
+            solution.save()
+            for checker, passed in [(text, False), (anonymity, True)]:
+                CheckerResult.objects.create(solution = solution, content_type = ContentType.objects.get_for_model(checker), object_id = checker.id, passed = passed)
+        self.client.login(username='trainer', password='demo')
+
+        def get():
+            with self.settings(CHECKER_RESULT_LIST_PAGE_SIZE=1):
+                return self.client.get(reverse('checker_result_list', args=[self.task.id]))
+        response = get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['checkers_seen'], [anonymity, text])
+        rows = response.context['users_with_checkerresults']
+        self.assertEqual(len(rows), 1)
+        user, results, solution = rows[0]
+        self.assertEqual(user, solution.author)
+        self.assertEqual([result.passed for result in results], [True, False])
+
+        # the number of queries does not depend on the number of students
+        queries = CaptureQueriesContext(connection)
+        with queries:
+            get()
+        solution = self.task.solution_set.first()
+        solution.id = None
+        solution.author = User.objects.get(username='tutor')
+        solution.save()
+        solution.author.groups.add(Group.objects.get(name='User'))
+        with self.assertNumQueries(len(queries)):
+            get()
+
 
 def test_concurrently(times):
     """
@@ -1,34 +1,35 @@
 import zipfile
-import tempfile
+from collections import defaultdict
 
 from django.contrib.auth.decorators import login_required
 from django.contrib.admin.views.decorators import staff_member_required
 from django.shortcuts import render, get_object_or_404
 from django.http import Http404
-from django.http import HttpResponseRedirect, HttpResponse
+from django.http import HttpResponseRedirect, StreamingHttpResponse
 from django.urls import reverse
 from django.views.decorators.cache import cache_control
 from django.template import loader
 from django.conf import settings
-from django.core.mail import send_mail, get_connection , mail_admins
+from django.core.mail import send_mail, mail_admins
 from django.utils.translation import gettext_lazy
 from django.contrib.sites.requests import RequestSite
+from django.core.paginator import Paginator
 
 
 from datetime import datetime, timedelta
 
 from tasks.models import Task, HtmlInjector
 from attestation.models import Attestation
-from solutions.models import Solution, SolutionFile, get_solutions_zip, ConfirmationMessage
+from solutions.models import Solution, SolutionFile, get_solutions_zip
 from solutions.forms import SolutionFormSet
 from accounts.views import access_denied
 from accounts.models import User
 from configuration import get_settings
-from checker.basemodels import CheckerResult
+from checker.basemodels import CheckerResult, load_checkers
 from checker.basemodels import check_solution
+from utilities import file_operations
 from django.db import transaction
 
-from utilities.safeexec import execute_arglist
 
 @login_required
 @cache_control(must_revalidate=True, no_cache=True, no_store=True, max_age=0) #reload the page from the server even if the user used the back button
@@ -87,84 +88,47 @@ def solution_list(request, task_id, user_id=None):
         solution = Solution(task = task, author=author)
         formset = SolutionFormSet(request.POST, request.FILES, instance=solution)
         if formset.is_valid():
-            solution.save()
+            # a zip file exceeding the limits is only noticed while it is expanded, don't keep the solution then
             try:
-                formset.save() # Handle UnicodeEncodeError while saving solution
-            except UnicodeError as inst:
-                import sys
-                extyp, exvalue, ectb = sys.exc_info()
-                exnow = datetime.now() # reinserted
-                dt_string = exnow.strftime("%d/%m/%Y %H:%M:%S")
-                # Send Encoding Error to user via mail
-                myRequestUser = User.objects.filter(id=request.user.id)
-                myerrmsg = " %s => %s " % (extyp.__name__, exvalue) if exvalue else " %s " %(extyp.__name__,)
-                t = loader.get_template('solutions/submission_upload_UnicodeError_email.html')
-                c = {
-                      'protocol' : request.is_secure() and "https" or "http",
-                      'domain' : RequestSite(request).domain,
-                      'site_name' : settings.SITE_NAME,
-                      'solution' : solution,
-                      'request_user': myRequestUser,
-                      'errormsg' : myerrmsg,
-                      'datetime' : dt_string,
-                }
-                #ToDo: change to send signed e-mails or unsigned e-mails depending on settings configuration
-                send_mail(gettext_lazy("%s submission failed") %settings.SITE_NAME, t.render(c),None, [request.user.email])
-                mail_admins(gettext_lazy("%s submission failed") %settings.SITE_NAME, t.render(c))
-                raise inst
-
-            #run_all_checker = bool(User.objects.filter(id=user_id, tutorial__tutors__pk=request.user.id) or request.user.is_trainer)
-            run_all_checker = bool(User.objects.filter(id=user_id, tutorial__tutors__pk=request.user.id) and task.expired() or request.user.is_trainer and task.expired() )
-            solution.check_solution(run_all_checker)
-
-            current_final_solution = Solution.objects.filter(task=task, author=author, final=True).first()
-            newer_final_solution_existing = False
-            if current_final_solution is not None:
-                if current_final_solution.creation_date > solution.creation_date:
-                    # The student (re-)submitted another final solution while the checkers were running
-                    # This can't be the final solution anymore
-                    newer_final_solution_existing = True
-            if (solution.accepted or get_settings().accept_all_solutions) and not newer_final_solution_existing:
-                solution.final = True
-                solution.save()
-
-            if solution.accepted:
-                # Send submission confirmation email
-                t = loader.get_template('solutions/submission_confirmation_email.html')
-                c = {
-                    'protocol': request.is_secure() and "https" or "http",
-                    'domain': RequestSite(request).domain,
-                    'site_name': settings.SITE_NAME,
-                    'solution': solution,
-                }
-                if user_id:
-                    # in case someone else uploaded the solution, add this to the email
-                    c['uploader'] = request.user
-
-                # we create an smime signed message with openssl, if a private-key and certificate is configured
-                if settings.PRIVATE_KEY and settings.CERTIFICATE:
-                    with tempfile.NamedTemporaryFile(mode='w+') as tmp:
-                        tmp.write("Content-Type: text/plain; charset=utf-8\n")
-                        tmp.write("Content-Transfer-Encoding: quoted-printable\n\n")
-
-                        tmp.write(t.render(c))
-                        tmp.flush()
-                        tmp.seek(0)
-                        environ = {}
-                        environ['LANG'] = settings.LANG
-                        environ['LANGUAGE'] = settings.LANGUAGE
-                        [signed_mail, __, __, __, __]  = execute_arglist(["openssl", "smime", "-sign", "-signer", settings.CERTIFICATE, "-inkey", settings.PRIVATE_KEY, "-in", tmp.name], ".", environment_variables=environ, unsafe=True)
-
-                    connection = get_connection()
-                    message = ConfirmationMessage(gettext_lazy("%s submission confirmation") % settings.SITE_NAME, signed_mail, None, [solution.author.email], connection=connection)
-                    if solution.author.email:
-                         message.send() # any PY2-PY3 problem in here ?
-
-                else: #we are sending unsigned email
-                    if solution.author.email:
-                         send_mail(gettext_lazy("%s submission confirmation") % settings.SITE_NAME, t.render(c), None, [solution.author.email])
-
-            return HttpResponseRedirect(reverse('solution_detail', args=[solution.id]))
+                with transaction.atomic():
+                    solution.save()
+                    try:
+                        formset.save() # Handle UnicodeEncodeError while saving solution
+                    except UnicodeError as inst:
+                        import sys
+                        extyp, exvalue, ectb = sys.exc_info()
+                        exnow = datetime.now() # reinserted
+                        dt_string = exnow.strftime("%d/%m/%Y %H:%M:%S")
+                        # Send Encoding Error to user via mail
+                        myRequestUser = User.objects.filter(id=request.user.id)
+                        myerrmsg = " %s => %s " % (extyp.__name__, exvalue) if exvalue else " %s " %(extyp.__name__,)
+                        t = loader.get_template('solutions/submission_upload_UnicodeError_email.html')
+                        c = {
+                              'protocol' : request.is_secure() and "https" or "http",
+                              'domain' : RequestSite(request).domain,
+                              'site_name' : settings.SITE_NAME,
+                              'solution' : solution,
+                              'request_user': myRequestUser,
+                              'errormsg' : myerrmsg,
+                              'datetime' : dt_string,
+                        }
+                        #ToDo: change to send signed e-mails or unsigned e-mails depending on settings configuration
+                        send_mail(gettext_lazy("%s submission failed") %settings.SITE_NAME, t.render(c),None, [request.user.email])
+                        mail_admins(gettext_lazy("%s submission failed") %settings.SITE_NAME, t.render(c))
+                        raise inst
+            except file_operations.InvalidZipFile as error:
+                formset.non_form_errors().append(str(error))
+            else:
+                #run_all_checker = bool(User.objects.filter(id=user_id, tutorial__tutors__pk=request.user.id) or request.user.is_trainer)
+                run_all_checker = bool(User.objects.filter(id=user_id, tutorial__tutors__pk=request.user.id) and task.expired() or request.user.is_trainer and task.expired() )
+                # The final flag and the confirmation email are handled once the check job is done, see Solution.finish_submission
+                solution.queue_check(run_all_checker,
+                                     submission = True,
+                                     uploader = request.user if user_id else None,
+                                     protocol = request.is_secure() and "https" or "http",
+                                     domain = RequestSite(request).domain)
+
+                return HttpResponseRedirect(reverse('solution_detail', args=[solution.id]))
     else:
         formset = SolutionFormSet()
 
@@ -187,11 +151,16 @@ def test_upload(request, task_id):
         solution = Solution(task = task, author=request.user, testupload = True)
         formset = SolutionFormSet(request.POST, request.FILES, instance=solution)
         if formset.is_valid():
-            solution.save()
-            formset.save()
-            solution.check_solution(run_secret = True)
-
-            return HttpResponseRedirect(reverse('solution_detail_full', args=[solution.id]))
+            try:
+                with transaction.atomic():
+                    solution.save()
+                    formset.save()
+            except file_operations.InvalidZipFile as error:
+                formset.non_form_errors().append(str(error))
+            else:
+                solution.queue_check(run_secret = True)
+
+                return HttpResponseRedirect(reverse('solution_detail_full', args=[solution.id]))
     else:
         formset = SolutionFormSet()
 
@@ -207,11 +176,16 @@ def test_upload_student(request, task_id):
         solution = Solution(task = task, author=request.user, testupload = True)
         formset = SolutionFormSet(request.POST, request.FILES, instance=solution)
         if formset.is_valid():
-            solution.save()
-            formset.save()
-            solution.check_solution(run_secret = False)
-
-            return HttpResponseRedirect(reverse('solution_detail', args=[solution.id]))
+            try:
+                with transaction.atomic():
+                    solution.save()
+                    formset.save()
+            except file_operations.InvalidZipFile as error:
+                formset.non_form_errors().append(str(error))
+            else:
+                solution.queue_check(run_secret = False)
+
+                return HttpResponseRedirect(reverse('solution_detail', args=[solution.id]))
     else:
         formset = SolutionFormSet()
 
@@ -272,8 +246,7 @@ def solution_download(request, solution_id, include_checker_files, include_artif
     if not (request.user.is_superuser or request.user.is_trainer or allowed_tutor or allowed_user) or hide:
         return access_denied(request)
 
-    zip_file = get_solutions_zip([solution], include_checker_files, include_artifacts)
-    response = HttpResponse(zip_file.read(), content_type="application/zip")
+    response = StreamingHttpResponse(get_solutions_zip([solution], include_checker_files, include_artifacts), content_type="application/zip")
     response['Content-Disposition'] = 'attachment; filename=Solution.zip'
     return response
 
@@ -286,8 +259,7 @@ def solution_download_for_task(request, task_id, include_checker_files, include_
     solutions = task.solution_set.filter(final=True)
     if not request.user.is_trainer:
         solutions = solutions.filter(author__tutorial__id__in=request.user.tutored_tutorials.values_list('id', flat=True))
-    zip_file = get_solutions_zip(solutions, include_checker_files, include_artifacts)
-    response = HttpResponse(zip_file.read(), content_type="application/zip")
+    response = StreamingHttpResponse(get_solutions_zip(solutions, include_checker_files, include_artifacts), content_type="application/zip")
     response['Content-Disposition'] = 'attachment; filename=Solutions.zip'
     return response
 
@@ -311,22 +283,23 @@ def checker_result_list(request, task_id):
     if not request.user.is_trainer and not request.user.is_superuser:
         return access_denied(request)
     else:
-        users_with_checkerresults = [(user, dict(checkerresults), final_solution)              \
-        for user           in User.objects.filter(groups__name='User').order_by('mat_number')          \
-        for final_solution in Solution.objects.filter(author=user, final=True, task=task).values() \
-        for checkerresults in [[ (result.checker, result) for result in CheckerResult.objects.all().filter(solution=final_solution['id'])]] ]
-
-        checkers_seen = set([])
-        for _, results, _  in users_with_checkerresults:
-            checkers_seen |= set(results.keys())
-        checkers_seen = sorted(checkers_seen, key=lambda checker: checker.order)
-
-        for i, (user, results, final_solution) in enumerate(users_with_checkerresults):
-            users_with_checkerresults[i] = (user,
-                                            [results[checker] if checker in results else None for (checker) in checkers_seen],
-                                            final_solution)
-
-        return render(request, "solutions/checker_result_list.html", {"users_with_checkerresults": users_with_checkerresults,  'checkers_seen':checkers_seen, "task":task})
+        final_solutions = Solution.objects.filter(task=task, final=True, author__groups__name='User') \
+                                          .select_related('author').order_by('author__mat_number', 'author__id', 'id')
+
+        # the columns: all checkers with a result for any final solution, not only for those on this page
+        checkers = load_checkers(CheckerResult.objects.filter(solution__in=final_solutions).values_list('content_type_id', 'object_id').distinct())
+        columns = sorted(checkers, key=lambda key: checkers[key].order)
+        checkers_seen = [checkers[key] for key in columns]
+
+        page = Paginator(final_solutions, settings.CHECKER_RESULT_LIST_PAGE_SIZE).get_page(request.GET.get('page'))
+
+        results = defaultdict(dict)
+        for result in CheckerResult.objects.filter(solution__in=[solution.id for solution in page]).order_by('id'):
+            results[result.solution_id][(result.content_type_id, result.object_id)] = result
+
+        users_with_checkerresults = [(solution.author, [results[solution.id].get(key) for key in columns], solution) for solution in page]
+
+        return render(request, "solutions/checker_result_list.html", {"users_with_checkerresults": users_with_checkerresults,  'checkers_seen':checkers_seen, "task":task, "page":page})
 
 @staff_member_required
 def solution_run_checker(request, solution_id):
@@ -17,6 +17,12 @@ from django.db.models import Max
 from accounts.models import User
 from configuration import get_settings
 
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from utilities import request_memo
+
 from utilities.deleting_file_field import DeletingFileField
 from utilities.safeexec import execute_arglist
 
@@ -61,30 +67,32 @@ class Task(models.Model):
 
     def expired_for_user(self, user):
         """returns whether the task has expired for a certain user"""
-        if SubmissionBlacklistEntry.objects.filter(task=self, user=user).exists():
-            return True
-        for deadline_extension in DeadlineExtension.objects.filter(task=self, user=user):
-            return deadline_extension.timestamp + get_settings().deadline_tolerance < datetime.now()
-        return self.expired()
+        return self.deadlines([user]).expired(self, user)
 
     def submission_date_for_user(self, user):
         """returns the effective submission date for a certain user"""
-        for deadline_extension in DeadlineExtension.objects.filter(task=self, user=user):
-            return deadline_extension.timestamp
-        return self.submission_date
+        return self.deadlines([user]).submission_date(self, user)
 
-    def check_all_final_solutions(self, secondary_check = False):
+    def deadlines(self, users = None):
+        """returns the Deadlines of this task for the given users (default: all users)"""
+        return Deadlines([self], users)
+
+    def check_all_final_solutions(self, secondary_check = False, progress = None, cancel = None):
         from checker.basemodels import check_multiple
-        final_solutions = [solution for solution in self.solution_set.filter(final=True) if self.expired_for_user(solution.author)]
-        count = check_multiple(final_solutions, True, secondary_check=secondary_check)
+        deadlines = self.deadlines()
+        final_solutions = [solution for solution in self.solution_set.filter(final=True) if deadlines.expired(self, solution.author_id)]
+        count = check_multiple(final_solutions, True, secondary_check=secondary_check, progress=progress, cancel=cancel)
+        if count < len(final_solutions):
+            # cancelled
+            return count
 
         if self.expired():
             self.all_checker_finished = True
             self.save()
         return len(final_solutions)
 
-    def check_all_latest_only_failed_solutions(self):
-        from checker.basemodels import check_solution
+    def check_all_latest_only_failed_solutions(self, progress = None, cancel = None):
+        from checker.basemodels import check_multiple
         solution_queryset = self.solution_set
         final_solutions_queryset = solution_queryset.filter(final=True)
         final_users = set(final_solutions_queryset.values_list('author', flat=True))
@@ -95,29 +103,28 @@ class Task(models.Model):
         non_final_users = set(User.objects.all().values_list('id', flat=True)) - final_users
 
         count = 0
+        latest_only_failed_solutions = []
+        deadlines = self.deadlines()
         for user in non_final_users:
             users_only_failed_solutions = only_failed_solution_set.filter(author=user)
             if users_only_failed_solutions.count() > 0:
                 latest_only_failed_solution = users_only_failed_solutions.latest('number')
-                if self.expired_for_user(user):
-                    check_solution(latest_only_failed_solution, True)
+                if deadlines.expired(self, user):
+                    latest_only_failed_solutions.append(latest_only_failed_solution)
                 count += 1
+        check_multiple(latest_only_failed_solutions, True, progress=progress, cancel=cancel)
         return count
 
-    def check_unchecked_final_solutions(self, secondary_check = False):
+    def check_unchecked_final_solutions(self, secondary_check = False, progress = None, cancel = None):
         from checker.basemodels import check_multiple
-        final_solutions = [solution for solution in self.solution_set.filter(all_checker_finished=False, final=True) if self.expired_for_user(solution.author)]
-        check_multiple(final_solutions, True, secondary_check = secondary_check)
-        return len(final_solutions)
+        deadlines = self.deadlines()
+        final_solutions = [solution for solution in self.solution_set.filter(all_checker_finished=False, final=True) if deadlines.expired(self, solution.author_id)]
+        return check_multiple(final_solutions, True, secondary_check = secondary_check, progress=progress, cancel=cancel)
 
     def get_checkers(self):
-        from checker.basemodels import Checker
-        checker_app = apps.get_app_config('checker')
-
-        checker_classes = [x for x in checker_app.get_models() if issubclass(x, Checker)]
-        unsorted_checker = sum([list(x.objects.filter(task=self)) for x in checker_classes], [])
-        checkers = sorted(unsorted_checker, key=lambda checker: checker.order)
-        return checkers
+        """ Returns the checkers of this task ordered by their order (cached, see checker.basemodels.task_checkers). """
+        from checker.basemodels import task_checkers
+        return task_checkers(self)
 
     def jplag_dir_path(self):
         return os.path.join(settings.UPLOAD_ROOT, 'jplag', 'Task_' + str(self.id))
@@ -203,7 +210,7 @@ class Task(models.Model):
         environ={}
         environ['LANG'] = settings.LANG
         environ['LANGUAGE'] = settings.LANGUAGE
-        [output, error, exitcode, timed_out, oom_ed] = \
+        [output, error, exitcode, timed_out, oom_ed, truncated] = \
          execute_arglist(args, path, environment_variables=environ, unsafe=True)
 
         # remove solution copies
@@ -374,18 +381,39 @@ def get_mediafile_storage_path(instance, filename):
 def get_htmlinjectorfile_storage_path(instance, filename):
     return 'TaskHtmlInjectorFiles/Task_%s/%s' % (instance.task.pk, filename)
 
+EXAM_WINDOWS_CACHE_KEY = "praktomat_exam_windows"
+
+def exam_windows():
+    """ Returns [(task id, publication date, submission date)] of all exams, cached until a task is saved or deleted
+    (or for settings.EXAM_WINDOWS_CACHE_TIMEOUT seconds). """
+    windows = cache.get(EXAM_WINDOWS_CACHE_KEY)
+    if windows is None:
+        windows = list(Task.objects.filter(exam=True).values_list('id', 'publication_date', 'submission_date'))
+        cache.set(EXAM_WINDOWS_CACHE_KEY, windows, settings.EXAM_WINDOWS_CACHE_TIMEOUT)
+    return windows
+
+@receiver([post_save, post_delete], sender=Task, dispatch_uid="exam_windows")
+def task_changed(sender, instance, **kwargs):
+    cache.delete(EXAM_WINDOWS_CACHE_KEY)
+    transaction.on_commit(lambda: cache.delete(EXAM_WINDOWS_CACHE_KEY))
+
 def exam_is_active(user):
-    for task in Task.objects.all():
-        # Extend the "runtime" of a task in each direction for
-        # this calculation. This ensures that students can't access earlier
-        # solutions right before an exam/test starts.
-        publication_date = task.publication_date - timedelta(minutes=60)
-        submission_date = task.submission_date_for_user(user) + get_settings().deadline_tolerance + timedelta(minutes=15)
-        now = datetime.now()
-        is_active = publication_date < now and submission_date > now
-        if is_active and task.exam:
-            return True
-    return False
+    """ Returns whether an exam is running for the user (computed once per request). """
+    return request_memo.memoized(('exam_is_active', user.id), lambda: compute_exam_is_active(user))
+
+def compute_exam_is_active(user):
+    # Extend the "runtime" of a task in each direction for
+    # this calculation. This ensures that students can't access earlier
+    # solutions right before an exam/test starts.
+    now = datetime.now()
+    started = [(task_id, submission_date) for task_id, publication_date, submission_date in exam_windows()
+               if publication_date - timedelta(minutes=60) < now]
+    if not started:
+        return False
+    # the deadline extensions of the user for these exams
+    extensions = dict(DeadlineExtension.objects.filter(user=user, task__in=[task_id for task_id, _ in started]).order_by('-id').values_list('task_id', 'timestamp'))
+    end = get_settings().deadline_tolerance + timedelta(minutes=15)
+    return any(extensions.get(task_id, submission_date) + end > now for task_id, submission_date in started)
 
 
 class MediaFile(models.Model):
@@ -421,6 +449,39 @@ class HtmlInjector(models.Model):
     html_file = DeletingFileField(upload_to=get_htmlinjectorfile_storage_path, max_length=500)
 
 
+class Deadlines:
+    """ The effective deadlines of some tasks for some users (or all users), loaded in two queries.
+
+    Users are blacklisted (see SubmissionBlacklistEntry) or may have a DeadlineExtension,
+    users and tasks may be given as objects or ids. """
+
+    def __init__(self, tasks, users = None):
+        task_ids = [getattr(task, 'id', task) for task in tasks]
+        blacklist = SubmissionBlacklistEntry.objects.filter(task__in=task_ids)
+        extensions = DeadlineExtension.objects.filter(task__in=task_ids)
+        if users is not None:
+            user_ids = [getattr(user, 'id', user) for user in users]
+            blacklist = blacklist.filter(user__in=user_ids)
+            extensions = extensions.filter(user__in=user_ids)
+        self.blacklisted = set(blacklist.values_list('task_id', 'user_id'))
+        self.extensions = {}
+        for task_id, user_id, timestamp in extensions.order_by('-id').values_list('task_id', 'user_id', 'timestamp'):
+            # the oldest extension counts if a user has several
+            self.extensions[task_id, user_id] = timestamp
+        self.deadline_tolerance = get_settings().deadline_tolerance
+        self.now = datetime.now()
+
+    def submission_date(self, task, user):
+        """ Returns the effective submission date of the task for the user. """
+        return self.extensions.get((task.id, getattr(user, 'id', user)), task.submission_date)
+
+    def expired(self, task, user):
+        """ Returns whether the task has expired for the user. """
+        if (task.id, getattr(user, 'id', user)) in self.blacklisted:
+            return True
+        return self.submission_date(task, user) + self.deadline_tolerance < self.now
+
+
 class SubmissionBlacklistEntry(models.Model):
     task = models.ForeignKey(Task, on_delete=models.CASCADE)
     user = models.ForeignKey(User, on_delete=models.CASCADE, limit_choices_to={"groups__name": "User"})
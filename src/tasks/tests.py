@@ -1,11 +1,15 @@
+import io
+import zipfile
 from os.path import dirname, join
 from datetime import datetime, timedelta
 
 from utilities.TestSuite import TestCase
 from django.urls import reverse
 
+from accounts.models import User
 from solutions.models import Solution
-from tasks.models import Task
+from tasks.models import Task, Deadlines, DeadlineExtension, SubmissionBlacklistEntry, exam_is_active
+from utilities.request_memo import RequestMemoMiddleware
 
 class TestUserViews(TestCase):
     def setUp(self):
@@ -23,6 +27,54 @@ class TestUserViews(TestCase):
         response = self.client.get(reverse('task_detail', args=[self.task.id]))
         self.assertEqual(response.status_code, 200)
 
+class TestDeadlines(TestCase):
+    def setUp(self):
+        self.task = Task.objects.all()[0]
+        self.task.submission_date = datetime.now() - timedelta(hours=2)
+        self.task.save()
+        self.user = User.objects.get(username='user')
+        self.tutor = User.objects.get(username='tutor')
+        self.trainer = User.objects.get(username='trainer')
+
+    def test_deadlines(self):
+        extension = datetime.now() + timedelta(days=1)
+        DeadlineExtension.objects.create(task=self.task, user=self.user, timestamp=extension)
+        SubmissionBlacklistEntry.objects.create(task=self.task, user=self.tutor)
+        with self.assertNumQueries(3): # incl. the settings
+            deadlines = self.task.deadlines()
+        for user in [self.user, self.tutor, self.trainer]:
+            self.assertEqual(deadlines.expired(self.task, user), self.task.expired_for_user(user))
+            self.assertEqual(deadlines.expired(self.task, user.id), self.task.expired_for_user(user))
+            self.assertEqual(deadlines.submission_date(self.task, user), self.task.submission_date_for_user(user))
+        self.assertFalse(deadlines.expired(self.task, self.user))
+        self.assertEqual(deadlines.submission_date(self.task, self.user), extension)
+        self.assertTrue(deadlines.expired(self.task, self.tutor))
+        self.assertTrue(deadlines.expired(self.task, self.trainer))
+
+        # only the given users
+        deadlines = Deadlines(Task.objects.all(), [self.trainer])
+        self.assertEqual(deadlines.submission_date(self.task, self.trainer), self.task.submission_date)
+
+    def test_exam_is_active(self):
+        self.assertFalse(exam_is_active(self.user))
+        exam = Task.objects.create(title='Exam', description='', exam=True,
+                                   publication_date=datetime.now() - timedelta(hours=1),
+                                   submission_date=datetime.now() - timedelta(hours=1))
+        self.assertFalse(exam_is_active(self.user))
+        DeadlineExtension.objects.create(task=exam, user=self.user, timestamp=datetime.now() + timedelta(hours=1))
+        self.assertTrue(exam_is_active(self.user))
+        self.assertFalse(exam_is_active(self.trainer))
+        exam.publication_date = datetime.now() + timedelta(hours=2)
+        exam.save()
+        self.assertFalse(exam_is_active(self.user))
+
+        # once per request
+        def view(request):
+            exam_is_active(self.user)
+            exam_is_active(self.user)
+        with self.assertNumQueries(1):
+            RequestMemoMiddleware(view)(None)
+
 class TestStaffViews(TestCase):
     def setUp(self):
         self.client.login(username='trainer', password='demo')
@@ -64,6 +116,16 @@ class TestStaffViews(TestCase):
                         })
         self.assertEqual(response.status_code, 200)
 
+    def test_download_final_solutions(self):
+        solution = self.task.solution_set.all()[0]
+        solution.final = True
+        solution.save()
+        response = self.client.get(reverse('download_final_solutions', args=[self.task.id]))
+        self.assertTrue(response.streaming)
+        zip = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertIsNone(zip.testzip())
+        self.assertEqual(sorted(zip.namelist()), sorted(solution_file.file.name for solution_file in solution.solutionfile_set.all()))
+
     def test_task_run_all_checker(self):
         # needs to be expired first
         self.task.submission_date = datetime.now() - timedelta(hours=2)
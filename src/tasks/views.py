@@ -1,11 +1,8 @@
-import tempfile
-import zipfile
-
 from django.contrib.auth.decorators import login_required
 from django.contrib.admin.views.decorators import staff_member_required
 from django.shortcuts import render, get_object_or_404
 from django.http import Http404
-from django.http import HttpResponseRedirect, HttpResponse
+from django.http import HttpResponseRedirect, StreamingHttpResponse
 from datetime import datetime
 from django import forms
 from django.urls import reverse
@@ -14,7 +11,7 @@ from django.contrib import messages
 import django.utils.timezone
 from django.conf import settings
 
-from tasks.models import Task
+from tasks.models import Task, Deadlines
 from solutions.forms import ModelSolutionFormSet
 from solutions.models import Solution, SolutionFile
 from accounts.models import User
@@ -22,6 +19,7 @@ from accounts.views import access_denied
 from attestation.models import Attestation
 from attestation.views import user_task_attestation_map
 from configuration import get_settings
+from utilities.zipstream import zip_files
 
 @login_required
 def taskList(request):
@@ -39,7 +37,8 @@ def taskList(request):
     attestations = list(map(lambda a, b: (a,)+b, tasks, attestations))
 
     def tasksWithSolutionsAndDeadlineExtension(tasks):
-        return [{'task': t, 'final_solution': t.final_solution(request.user), 'expired': t.expired_for_user(request.user), 'submission_date': t.submission_date_for_user(request.user)} for t in tasks]
+        deadlines = Deadlines(tasks, [request.user])
+        return [{'task': t, 'final_solution': t.final_solution(request.user), 'expired': deadlines.expired(t, request.user), 'submission_date': deadlines.submission_date(t, request.user)} for t in tasks]
 
     return render(request,
                   'tasks/task_list.html',
@@ -98,14 +97,9 @@ def import_tasks(request):
 @staff_member_required
 def download_final_solutions(request, task_id):
     """ download all final solutions of a task from the admin interface """
-    zip_file = tempfile.SpooledTemporaryFile()
-    zip = zipfile.ZipFile(zip_file, 'w')
-    for solution_file in SolutionFile.objects.filter(solution__task=task_id):
-        if solution_file.solution.final:
-            zip.write(solution_file.file.path, solution_file.file.name)
-    zip.close()
-    zip_file.seek(0)
-    response = HttpResponse(zip_file.read(), content_type="application/zip")
+    solution_files = SolutionFile.objects.filter(solution__task=task_id, solution__final=True).only('file')
+    files = ((solution_file.file.path, solution_file.file.name) for solution_file in solution_files.iterator())
+    response = StreamingHttpResponse(zip_files(files), content_type="application/zip")
     response['Content-Disposition'] = 'attachment; filename=FinalSolutions.zip'
     return response
 
@@ -37,6 +37,7 @@ urlpatterns = [
     re_path(r'^admin/tasks/task/(?P<task_id>\d+)/model_solution', tasks.views.model_solution, name="model_solution"),
     re_path(r'^admin/tasks/task/(?P<task_id>\d+)/final_solutions', tasks.views.download_final_solutions, name="download_final_solutions"),
     re_path(r'^admin/attestation/ratingscale/generate', attestation.views.generate_ratingscale, name="generate_ratingscale"),
+    re_path(r'^admin/metrics/$', utilities.views.metrics_dashboard, name="metrics_dashboard"),
     re_path(r'^admin/doc/', include(django.contrib.admindocs.urls)),
     re_path(r'^admin/', admin.site.urls),
 
@@ -85,6 +86,9 @@ urlpatterns = [
     re_path(r'^tutorial/$', attestation.views.tutorial_overview, name='tutorial_overview'),
     re_path(r'^tutorial/(?P<tutorial_id>\d+)$', attestation.views.tutorial_overview, name='tutorial_overview'),
 
+    # Metrics of the checking subsystem (Prometheus text format)
+    re_path(r'^metrics$', utilities.views.metrics, name='metrics'),
+
     # Uploaded media
     re_path(r'^upload/(?P<path>SolutionArchive/Task_\d+/User_.*/Solution_(?P<solution_id>\d+)/.*)$', utilities.views.serve_solution_file),
     re_path(r'^upload/(?P<path>TaskMediaFiles/Task_(?P<task_id>\d+)/.*)$', utilities.views.serve_media_file),
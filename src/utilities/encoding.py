@@ -1,19 +1,22 @@
+import codecs
 import chardet
 import re
 
+def normalize_charset(charset):
+    """ Treat any 8-bit ASCII extension as latin1/western european """
+    if charset:
+        charset = re.sub(r"ISO-8859-[0-9]", "ISO-8859-1", charset)
+    if charset:
+        charset = re.sub(r"windows-125[01235]", "ISO-8859-1", charset)
+    return charset
+
 def get_unicode(bytestring):
     if bytestring:
         """ Returns guessed unicode representation of file content. """
         if isinstance(bytestring, str):
             return bytestring
 
-
-        # Treat any 8-bit ASCII extension as latin1/western european
-        charset = chardet.detect(bytestring)["encoding"]
-        if charset:
-            charset = re.sub(r"ISO-8859-[0-9]", "ISO-8859-1", charset)
-        if charset:
-            charset = re.sub(r"windows-125[01235]", "ISO-8859-1", charset)
+        charset = normalize_charset(chardet.detect(bytestring)["encoding"])
 
         for chset in ["utf-8", charset, "ISO-8859-1"]:
             if chset:
@@ -27,5 +30,41 @@ def get_unicode(bytestring):
     else:
         return ''
 
+def decode(bytestring, charset):
+    """ Returns the unicode representation of file content with the charset detected before (see CharsetDetector),
+    falling back to latin1 like get_unicode. """
+    for chset in [charset, "ISO-8859-1"]:
+        try:
+            return bytestring.decode(chset)
+        except (UnicodeDecodeError, LookupError):
+            pass
+
+class CharsetDetector:
+    """ Detects the charset get_unicode would decode a bytestring with, from the bytestring fed in chunks. """
+
+    def __init__(self):
+        self.utf8 = codecs.getincrementaldecoder("utf-8")()
+        self.is_utf8 = True
+        self.detector = chardet.UniversalDetector()
+
+    def feed(self, data):
+        if self.is_utf8:
+            try:
+                self.utf8.decode(data)
+            except UnicodeDecodeError:
+                self.is_utf8 = False
+        if not self.detector.done:
+            self.detector.feed(data)
+
+    def charset(self):
+        if self.is_utf8:
+            try:
+                self.utf8.decode(b"", final=True)
+                return "utf-8"
+            except UnicodeDecodeError:
+                pass
+        self.detector.close()
+        return normalize_charset(self.detector.result["encoding"]) or "ISO-8859-1"
+
 def get_utf8(unicodestring):
     return unicodestring.encode("utf-8")
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+""" A stand-in for the docker command line client, to test the safe-docker container pool without a docker daemon.
+
+Usage (see settings.DOCKER_COMMAND): fake_docker.py STATE_DIR run|exec|kill|rm ...
+
+Containers are only records in STATE_DIR, commands run on the host without any isolation.
+Paths below the --tmpfs mounts of a container are redirected to a directory of the container
+in STATE_DIR, so files copied into a container are not visible on the host. Every invocation
+is logged to STATE_DIR/calls.log.
+Do not use a reset command which kills processes (see settings.DOCKER_POOL_RESET_COMMAND) with it. """
+
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+
+# options of docker run/exec which take a separate value
+OPTIONS_WITH_VALUE = ["--tmpfs", "--name", "--label", "--volume", "--workdir", "--user", "--env", "-v", "-w", "-u", "-e"]
+
+
+def parse_options(args):
+    """ Splits args into the leading options (as a list of (name, value)) and the remaining arguments. """
+    options = []
+    while args and args[0].startswith("-"):
+        option = args.pop(0)
+        if "=" in option:
+            option, value = option.split("=", 1)
+        elif option in OPTIONS_WITH_VALUE:
+            value = args.pop(0)
+        else:
+            value = None
+        options.append((option, value))
+    return options, args
+
+
+def container_file(state_dir, name):
+    return os.path.join(state_dir, "containers", name + ".json")
+
+
+def container_root(state_dir, name):
+    return os.path.join(state_dir, "containers", name)
+
+
+def load_container(state_dir, name):
+    try:
+        with open(container_file(state_dir, name)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def redirect(container, arg):
+    """ Redirects the paths below the tmpfs mounts of the container in arg. """
+    paths = "|".join(re.escape(path) for path in sorted(container["tmpfs"], key=len, reverse=True))
+    return re.sub(r"(?<![\w/.-])(" + paths + r")(?=/|\s|$|\"|')", lambda match: container["root"] + match.group(1), arg)
+
+
+def run(state_dir, args):
+    options, args = parse_options(args)
+    tmpfs = [value.split(":")[0] for option, value in options if option == "--tmpfs"]
+    options = dict(options)
+    if "--detach" not in options and "-d" not in options:
+        sys.stderr.write("fake docker only supports detached containers\n")
+        return 125
+    name = options.get("--name")
+    root = container_root(state_dir, name)
+    os.makedirs(root)
+    for path in tmpfs:
+        os.makedirs(root + path, exist_ok=True)
+    with open(container_file(state_dir, name), "w") as f:
+        json.dump({"name": name, "root": root, "tmpfs": tmpfs, "image": args[0], "command": args[1:]}, f)
+    print(name)
+    return 0
+
+
+def exec_(state_dir, args):
+    options, args = parse_options(args)
+    options = dict(options)
+    container = load_container(state_dir, args[0])
+    if container is None:
+        sys.stderr.write("Error: No such container: %s\n" % args[0])
+        return 1
+    workdir = redirect(container, options.get("--workdir") or options.get("-w") or "/")
+    command = [redirect(container, arg) for arg in args[1:]]
+    try:
+        return subprocess.call(command, cwd=workdir if os.path.isdir(workdir) else None,
+            stdin=None if "--interactive" in options or "-i" in options else subprocess.DEVNULL)
+    except OSError:
+        return 127
+
+
+def remove(state_dir, args):
+    options, args = parse_options(args)
+    status = 0
+    for name in args:
+        if load_container(state_dir, name) is None:
+            status = 1
+            continue
+        os.remove(container_file(state_dir, name))
+        shutil.rmtree(container_root(state_dir, name), ignore_errors=True)
+    return status
+
+
+def main(argv):
+    state_dir, command, args = argv[1], argv[2], argv[3:]
+    os.makedirs(os.path.join(state_dir, "containers"), exist_ok=True)
+    with open(os.path.join(state_dir, "calls.log"), "a") as log:
+        log.write(" ".join([command] + args) + "\n")
+    commands = {"run": run, "exec": exec_, "kill": remove, "rm": remove}
+    if command not in commands:
+        sys.stderr.write("fake docker does not support '%s'\n" % command)
+        return 125
+    return commands[command](state_dir, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
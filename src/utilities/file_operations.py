@@ -1,3 +1,6 @@
+import fcntl
+import hashlib
+import json
 import os
 import grp
 import tempfile
@@ -23,8 +26,8 @@ def makedirs(path):
         os.chmod(path, 0o770)
 
 
-def create_file(path, content, override=True, binary=False):
-    """ """
+def prepare_file(path, override=True):
+    """ Creates the directory of path and removes an existing file at path (or raises an exception if not override). """
     dirname = os.path.dirname(path)
     if not os.path.exists(dirname):
         makedirs(dirname)
@@ -34,11 +37,9 @@ def create_file(path, content, override=True, binary=False):
                 os.remove(path)
             else: # throw exception
                 raise Exception('File already exists')
-    with open(path, 'wb') as fd:
-        if binary:
-            fd.write(content)
-        else:
-            fd.write(encoding.get_utf8(encoding.get_unicode(content)))
+
+
+def set_file_permissions(path):
     if (gid):
         # chown :praktomat <path>
         os.chown(path, -1, gid)
@@ -46,12 +47,66 @@ def create_file(path, content, override=True, binary=False):
         os.chmod(path, 0o770)
 
 
+def create_file(path, content, override=True, binary=False):
+    """ """
+    prepare_file(path, override)
+    with open(path, 'wb') as fd:
+        if binary:
+            fd.write(content)
+        else:
+            fd.write(encoding.get_utf8(encoding.get_unicode(content)))
+    set_file_permissions(path)
+
+
 def copy_file(from_path, to_path, to_is_directory=False, override=True):
     """ """
     if to_is_directory:
         to_path = os.path.join(to_path, os.path.basename(from_path))
-    with open(from_path, "rb") as fd:
-        create_file(to_path, fd.read(), override=override, binary=True)
+    prepare_file(to_path, override)
+    clone_file(from_path, to_path)
+    set_file_permissions(to_path)
+
+
+# ioctl of Linux to share the data of a file with another file until it is changed (copy on write), see ioctl_ficlone(2)
+FICLONE = 0x40049409
+
+def clone_file(from_path, to_path):
+    """ Copies the file without reading it into memory: as a reflink on file systems which support them
+    (btrfs, xfs, ...), else within the kernel with copy_file_range, else in chunks. """
+    with open(from_path, 'rb') as source, open(to_path, 'wb') as target:
+        try:
+            fcntl.ioctl(target.fileno(), FICLONE, source.fileno())
+            return
+        except OSError:
+            pass
+        try:
+            while os.copy_file_range(source.fileno(), target.fileno(), 1 << 30):
+                pass
+            return
+        except (AttributeError, OSError):
+            # e.g. not supported between these file systems (or by this Python)
+            source.seek(0)
+            target.seek(0)
+            target.truncate()
+        shutil.copyfileobj(source, target, 1024 * 1024)
+
+
+def clone_file_with_metadata(from_path, to_path):
+    """ Like shutil.copy2, but clones the file (see clone_file). """
+    clone_file(from_path, to_path)
+    shutil.copystat(from_path, to_path)
+    return to_path
+
+
+def copy_tree(from_path, to_path):
+    """ Copies the directory tree into the (existing) directory to_path, cloning the files (see clone_file). """
+    shutil.copytree(from_path, to_path, symlinks=True, dirs_exist_ok=True, copy_function=clone_file_with_metadata)
+
+
+def read_file(path):
+    """ Returns the content of the file as bytes. """
+    with open(path, 'rb') as fd:
+        return fd.read()
 
 
 def create_tempfolder(path):
@@ -66,6 +121,62 @@ def create_tempfolder(path):
 class InvalidZipFile(Exception):
     pass
 
+class ReadBudget:
+    """ The number of bytes which may still be read by the HashingReaders sharing it. """
+
+    def __init__(self, size):
+        self.left = size
+
+    def spend(self, size):
+        self.left -= size
+        if self.left < 0:
+            raise InvalidZipFile("The zip file is too big.")
+
+class HashingReader:
+    """ Reads from a file object (e.g. a member of a zip file) while computing the sha256 hash, the size and
+    the number of lines of what has been read, and spending it from the budget (a ReadBudget, if given).
+    With detect_charset, the charset of the content is detected as well (see encoding.CharsetDetector). """
+
+    def __init__(self, file, budget=None, detect_charset=False):
+        self.file = file
+        self.budget = budget
+        self.hash = hashlib.sha256()
+        self.size = 0
+        self.newlines = 0
+        self.last = b""
+        self.charset_detector = encoding.CharsetDetector() if detect_charset else None
+
+    def read(self, size=-1):
+        data = self.file.read(size)
+        self.update(data)
+        return data
+
+    def update(self, data):
+        if self.budget is not None:
+            self.budget.spend(len(data))
+        self.hash.update(data)
+        self.size += len(data)
+        self.newlines += data.count(b"\n")
+        if data:
+            self.last = data[-1:]
+        if self.charset_detector is not None:
+            self.charset_detector.feed(data)
+
+    def consume(self, chunk_size=64 * 1024):
+        """ Reads the file to its end. """
+        while self.read(chunk_size):
+            pass
+
+    def hexdigest(self):
+        return self.hash.hexdigest()
+
+    def line_count(self):
+        """ The number of lines, a last line without a line break included """
+        return self.newlines + (1 if self.last not in (b"", b"\n") else 0)
+
+    def charset(self):
+        return self.charset_detector.charset() if self.charset_detector is not None else ""
+
 def unpack_zipfile_to(zipfilename, to_path, override_cb=None, file_cb=None):
     """
     Extracts a zipfile to the given location, trying to safeguard against wrong paths
@@ -95,3 +206,63 @@ def unpack_zipfile_to(zipfilename, to_path, override_cb=None, file_cb=None):
         zip.extract(finfo, to_path)
         if file_cb is not None and os.path.isfile(os.path.join(to_path, finfo.filename)):
             file_cb(finfo.filename)
+
+def unpack_zipfile_template(zipfilename, template_dir):
+    """
+    Extracts a zipfile into template_dir (like unpack_zipfile_to), unless this was done before,
+    and returns the names of its entries. The files can then be copied from there by
+    copy_zipfile_template, as often as needed, without reading and checking the zipfile again.
+
+    The directory appears once it is complete, so processes doing the same at the same time
+    don't see a half extracted zipfile.
+    """
+    manifest = os.path.join(template_dir, 'manifest.json')
+    try:
+        with open(manifest) as fd:
+            return json.load(fd)
+    except FileNotFoundError:
+        pass
+    makedirs(os.path.dirname(template_dir))
+    building = tempfile.mkdtemp(dir=os.path.dirname(template_dir))
+    names = None
+    try:
+        unpack_zipfile_to(zipfilename, os.path.join(building, 'files'))
+        with zipfile.ZipFile(zipfilename, 'r') as zip:
+            names = zip.namelist()
+        with open(os.path.join(building, 'manifest.json'), 'w') as fd:
+            json.dump(names, fd)
+        os.rename(building, template_dir)
+    except OSError:
+        # somebody else was faster
+        if not os.path.exists(manifest):
+            raise
+    finally:
+        shutil.rmtree(building, ignore_errors=True)
+    if names is None:
+        with open(manifest) as fd:
+            names = json.load(fd)
+    return names
+
+def copy_zipfile_template(template_dir, names, to_path, override_cb=None, file_cb=None, root=None):
+    """
+    Puts the entries of a zipfile extracted by unpack_zipfile_template to the given location,
+    cloning the files (see clone_file). The callbacks are called like by unpack_zipfile_to.
+
+    Raises InvalidZipFile if an entry would end up outside of root (by default to_path), e.g. through
+    a symlink that was put there before.
+    """
+    files = os.path.join(template_dir, 'files')
+    root = os.path.realpath(to_path if root is None else root)
+    for name in names:
+        dest = os.path.join(to_path, name)
+        if os.path.commonpath([root, os.path.realpath(dest)]) != root:
+            raise InvalidZipFile("Entry %s would be written outside of %s." % (name, root))
+        if override_cb is not None and os.path.exists(dest):
+            override_cb(name)
+        source = os.path.join(files, name)
+        if os.path.isfile(source):
+            copy_file(source, dest)
+            if file_cb is not None:
+                file_cb(name)
+        else:
+            makedirs(dest)
@@ -0,0 +1,294 @@
+""" Counters, gauges and histograms describing the checking subsystem, exported in the Prometheus text format (see utilities.views.metrics).
+
+Every process (web server, check workers, runallcheckers) counts in memory and writes its values to a file in
+settings.METRICS_DIR at most every settings.METRICS_FLUSH_INTERVAL seconds. Collecting adds up the files of all
+processes, so counting only costs a dict update. Gauges of processes which are gone are dropped, their counters
+and histograms are kept in an archive file.
+
+The directory may be shared by processes on several hosts (or containers), so the files are named by host, boot
+and process id. Whether a process of another host is gone can't be checked, its file is archived once it was not
+written for settings.METRICS_STALE_AFTER seconds. A process whose file was archived nevertheless only writes what
+it counted afterwards. """
+
+import atexit
+import fcntl
+import json
+import math
+import os
+import socket
+import threading
+import time
+
+from django.conf import settings
+
+# name -> (type, description)
+METRICS = {
+    "praktomat_checker_runs_started_total": ("counter", "Checker runs started, by checker class."),
+    "praktomat_checker_runs_finished_total": ("counter", "Checker runs finished, by checker class and result (passed, failed or error)."),
+    "praktomat_command_duration_seconds": ("histogram", "Duration of the commands run in the sandbox by execute_arglist, by phase (see utilities.timing)."),
+    "praktomat_command_timeouts_total": ("counter", "Commands run by execute_arglist which were stopped after a timeout."),
+    "praktomat_command_oom_kills_total": ("counter", "Commands run by execute_arglist which were stopped for exceeding the memory limit."),
+    "praktomat_check_pool_workers": ("gauge", "Worker processes of the check pool while solutions are checked by check_multiple."),
+    "praktomat_check_pool_busy_workers": ("gauge", "Worker processes of the check pool checking a solution."),
+    "praktomat_pending_rechecks": ("gauge", "Solutions not yet (re)checked by a running check_multiple, by task."),
+    "praktomat_check_queue_depth": ("gauge", "Checks waiting for a runcheckworker, by task."),
+}
+
+DURATION_BUCKETS = [0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, math.inf]
+
+_lock = threading.Lock()
+_counters = {}
+_gauges = {}
+_histograms = {}
+_last_flush = time.monotonic()
+# (path, values) of the file of this process, None before it was written
+_written = None
+
+
+def sample_key(name, labels):
+    """ Returns the key of a sample in the dicts of a snapshot (see collect()). """
+    return (name, tuple(sorted((label, str(value)) for label, value in labels.items())))
+
+
+def inc(name, amount=1, **labels):
+    """ Increases a counter. """
+    key = sample_key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+    maybe_flush()
+
+
+def set_gauge(name, value, **labels):
+    """ Sets a gauge of this process. """
+    key = sample_key(name, labels)
+    with _lock:
+        _gauges[key] = value
+    maybe_flush()
+
+
+def observe(name, value, **labels):
+    """ Adds a value (e.g. a duration in seconds) to a histogram. """
+    key = sample_key(name, labels)
+    with _lock:
+        histogram = _histograms.setdefault(key, {"buckets": [0] * len(DURATION_BUCKETS), "sum": 0, "count": 0})
+        histogram["buckets"][next(i for i, bound in enumerate(DURATION_BUCKETS) if value <= bound)] += 1
+        histogram["sum"] += value
+        histogram["count"] += 1
+    maybe_flush()
+
+
+def snapshot():
+    """ Returns the values of this process. """
+    with _lock:
+        return {
+            "counters": dict(_counters),
+            "gauges": dict(_gauges),
+            "histograms": {key: {"buckets": list(h["buckets"]), "sum": h["sum"], "count": h["count"]} for key, h in _histograms.items()},
+        }
+
+
+def _reset_after_fork():
+    """ A forked process (e.g. a worker of the check pool) starts counting from zero in its own file. """
+    global _lock, _last_flush, _written
+    _lock = threading.Lock()
+    _counters.clear()
+    _gauges.clear()
+    _histograms.clear()
+    _last_flush = time.monotonic()
+    _written = None
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def read_boot_id():
+    try:
+        with open("/proc/sys/kernel/random/boot_id") as f:
+            return f.read().strip()
+    except OSError:
+        return "unknown"
+
+# identifies the process table the process ids refer to
+HOST_ID = "%s-%s" % (socket.gethostname().replace("-", "_"), read_boot_id().replace("-", ""))
+
+
+def process_file(pid, host_id=HOST_ID):
+    return os.path.join(settings.METRICS_DIR, "process-%s-%d.json" % (host_id, pid))
+
+
+def parse_process_file(filename):
+    """ Returns (host id, pid) of the name of a process file, None for other files. """
+    if not (filename.startswith("process-") and filename.endswith(".json")):
+        return None
+    host_id, _, pid = filename[len("process-"):-len(".json")].rpartition("-")
+    if not host_id or not pid.isdigit():
+        return None
+    return host_id, int(pid)
+
+
+def archive_file():
+    return os.path.join(settings.METRICS_DIR, "archive.json")
+
+
+def maybe_flush():
+    if time.monotonic() - _last_flush >= settings.METRICS_FLUSH_INTERVAL:
+        flush()
+
+
+@atexit.register
+def flush():
+    """ Writes the values of this process to its file in settings.METRICS_DIR. """
+    global _last_flush, _written
+    _last_flush = time.monotonic()
+    if not settings.METRICS_DIR:
+        return
+    if not any(snapshot().values()):
+        return
+    try:
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        path = process_file(os.getpid())
+        with open(os.path.join(settings.METRICS_DIR, "lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            if _written is not None and _written[0] == path and not os.path.exists(path):
+                # collect() took the file for a stale one and archived its values, don't count them twice
+                forget(_written[1])
+            data = snapshot()
+            write_file(path, data)
+            _written = (path, data)
+    except OSError:
+        # metrics must never break a check
+        pass
+
+
+def forget(data):
+    """ Subtracts the counters and histograms of data from the values of this process. """
+    with _lock:
+        for key, value in data["counters"].items():
+            _counters[key] = _counters.get(key, 0) - value
+        for key, histogram in data["histograms"].items():
+            if key in _histograms:
+                own = _histograms[key]
+                own["buckets"] = [a - b for a, b in zip(own["buckets"], histogram["buckets"])]
+                own["sum"] -= histogram["sum"]
+                own["count"] -= histogram["count"]
+
+
+def to_json(data):
+    return {kind: [[name, dict(labels), value] for (name, labels), value in samples.items()] for kind, samples in data.items()}
+
+
+def from_json(data):
+    return {kind: {sample_key(name, labels): value for name, labels, value in data.get(kind, [])} for kind in ["counters", "gauges", "histograms"]}
+
+
+def write_file(path, data):
+    tmp = "%s.%d.tmp" % (path, os.getpid())
+    with open(tmp, "w") as f:
+        json.dump(to_json(data), f)
+    os.replace(tmp, path)
+
+
+def read_file(path):
+    try:
+        with open(path) as f:
+            return from_json(json.load(f))
+    except (OSError, ValueError):
+        return None
+
+
+def merge(target, data, with_gauges=True):
+    """ Adds the values of data to target. """
+    for key, value in data["counters"].items():
+        target["counters"][key] = target["counters"].get(key, 0) + value
+    if with_gauges:
+        for key, value in data["gauges"].items():
+            target["gauges"][key] = target["gauges"].get(key, 0) + value
+    for key, histogram in data["histograms"].items():
+        total = target["histograms"].setdefault(key, {"buckets": [0] * len(DURATION_BUCKETS), "sum": 0, "count": 0})
+        total["buckets"] = [a + b for a, b in zip(total["buckets"], histogram["buckets"])]
+        total["sum"] += histogram["sum"]
+        total["count"] += histogram["count"]
+
+
+def process_alive(host_id, pid, path):
+    """ Whether the process which writes the given file may still be running. """
+    if host_id != HOST_ID:
+        try:
+            return time.time() - os.path.getmtime(path) < settings.METRICS_STALE_AFTER
+        except OSError:
+            return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def collect():
+    """ Returns the sum of the values of all processes as {"counters": {key: value}, "gauges": ..., "histograms": ...}. """
+    total = {"counters": {}, "gauges": {}, "histograms": {}}
+    if not settings.METRICS_DIR or not os.path.isdir(settings.METRICS_DIR):
+        merge(total, snapshot())
+        return total
+    flush()
+    with open(os.path.join(settings.METRICS_DIR, "lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        archive = read_file(archive_file()) or {"counters": {}, "gauges": {}, "histograms": {}}
+        archived = []
+        for filename in os.listdir(settings.METRICS_DIR):
+            process = parse_process_file(filename)
+            if process is None:
+                continue
+            path = os.path.join(settings.METRICS_DIR, filename)
+            data = read_file(path)
+            if data is None:
+                continue
+            if process_alive(*process, path):
+                merge(total, data)
+            else:
+                # fold the file of a finished process into the archive
+                merge(archive, data, with_gauges=False)
+                archived.append(path)
+        if archived:
+            write_file(archive_file(), archive)
+            for path in archived:
+                os.remove(path)
+    merge(total, archive, with_gauges=False)
+    return total
+
+
+def format_labels(labels, extra=()):
+    labels = list(labels) + list(extra)
+    if not labels:
+        return ""
+    escaped = ['%s="%s"' % (label, value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")) for label, value in labels]
+    return "{" + ",".join(escaped) + "}"
+
+
+def format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(data):
+    """ Returns the collected values in the Prometheus text format. """
+    lines = []
+    for name, (kind, description) in METRICS.items():
+        samples = data["histograms" if kind == "histogram" else kind + "s"]
+        keys = sorted(key for key in samples if key[0] == name)
+        lines.append("# HELP %s %s" % (name, description))
+        lines.append("# TYPE %s %s" % (name, kind))
+        for key in keys:
+            labels = key[1]
+            if kind == "histogram":
+                cumulative = 0
+                for bound, count in zip(DURATION_BUCKETS, samples[key]["buckets"]):
+                    cumulative += count
+                    lines.append("%s_bucket%s %d" % (name, format_labels(labels, [("le", format_value(bound))]), cumulative))
+                lines.append("%s_sum%s %s" % (name, format_labels(labels), format_value(samples[key]["sum"])))
+                lines.append("%s_count%s %d" % (name, format_labels(labels), samples[key]["count"]))
+            else:
+                lines.append("%s%s %s" % (name, format_labels(labels), format_value(samples[key])))
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,36 @@
+""" Values computed at most once per request, e.g. the site wide settings or whether an exam is active for the user. """
+
+import contextvars
+
+# The memo of the current request (a dict), None outside of requests
+_memo = contextvars.ContextVar('request_memo', default=None)
+
+
+def memoized(key, compute):
+    """ Returns compute(), computed only once per request for the key (and every time outside of requests). """
+    memo = _memo.get()
+    if memo is None:
+        return compute()
+    if key not in memo:
+        memo[key] = compute()
+    return memo[key]
+
+
+def forget(key):
+    """ Makes memoized() compute the value for the key again in this request. """
+    memo = _memo.get()
+    if memo is not None:
+        memo.pop(key, None)
+
+
+class RequestMemoMiddleware:
+    """ Gives every request its own memo (see memoized). """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _memo.set({})
+        try:
+            return self.get_response(request)
+        finally:
+            _memo.reset(token)
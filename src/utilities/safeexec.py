@@ -1,3 +1,4 @@
+import atexit
 import os
 from os.path import *
 import time
@@ -6,12 +7,17 @@ import signal
 import string
 import resource
 import psutil
+import select
+import sys
+import threading
 import uuid
 
 from copy import deepcopy
 
 from django.conf import settings
 
+from utilities import metrics, timing
+
 # found at http://stackoverflow.com/questions/1230669/subprocess-deleting-child-processes-in-windows
 # should work for linux, too
 # TODO: should kill child or grandchild processes, but didn't if they are running as other user;
@@ -37,14 +43,173 @@ def kill_proc_tree(pid, including_parent=False):
 		parent.kill()
 		parent.wait(5)
 
-def execute_arglist(args, working_directory, environment_variables={}, timeout=None, maxmem=None, fileseeklimit=None, extradirs=[], unsafe=False, error_to_output=True, filenumberlimit=128):
-    """ Wrapper to execute Commands with the praktomat testuser. Expects Command as list of arguments, the first being the executable to run. """
+# Marks the gap in truncated outputs (see truncated_log in checker/basemodels.py)
+TRUNCATION_WARNING = '======= Warning: Output too long, hence truncated ======\n'
+TRUNCATION_GAP = "\n...\n...\n...\n...\n"
+
+# Seconds to wait for the rest of the output of a stopped command
+OUTPUT_GRACE_TIME = 5
+
+class MeasuredPopen(subprocess.Popen):
+    """ A Popen which keeps the resource usage (see os.wait4) of the process once it was waited for. """
+    rusage = None
+
+    def __init__(self, *args, **kwargs):
+        # the output threads (see execute_arglist) may poll while another thread waits
+        self.reap_lock = threading.Lock()
+        super().__init__(*args, **kwargs)
+
+    def poll(self):
+        """ Like Popen.poll, but reaps the process with os.wait4. """
+        with self.reap_lock:
+            if self.returncode is None:
+                try:
+                    (pid, status, rusage) = os.wait4(self.pid, os.WNOHANG)
+                except ChildProcessError:
+                    # reaped elsewhere, Popen assumes success then, too
+                    self.returncode = 0
+                else:
+                    if pid == self.pid:
+                        self.rusage = rusage
+                        self.returncode = os.waitstatus_to_exitcode(status)
+        return self.returncode
+
+    def wait(self, timeout=None):
+        """ Like Popen.wait, but reaps the process with os.wait4. Wakes up when the process ends (through a pidfd) where possible. """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        pidfd = None
+        interval = 0.001
+        try:
+            while self.poll() is None:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise subprocess.TimeoutExpired(self.args, timeout)
+                if pidfd is None:
+                    try:
+                        pidfd = os.pidfd_open(self.pid)
+                    except (AttributeError, OSError):
+                        # not supported (or the process is gone already)
+                        pidfd = -1
+                if pidfd >= 0:
+                    select.select([pidfd], [], [], remaining)
+                else:
+                    time.sleep(interval if remaining is None else min(interval, remaining))
+                    interval = min(interval * 2, 0.05)
+        finally:
+            if pidfd is not None and pidfd >= 0:
+                os.close(pidfd)
+        return self.returncode
+
+class OutputCapture:
+    """ Reads a pipe in a background thread. If the output gets longer than maxsize bytes,
+        only its beginning and its end are kept, so huge outputs don't fill up the memory. """
+
+    def __init__(self, pipe, maxsize=None, on_overflow=None):
+        self.pipe = pipe
+        self.maxsize = maxsize
+        self.on_overflow = on_overflow
+        self.head = bytearray()
+        self.tail = bytearray()
+        self.truncated = False
+        self.thread = threading.Thread(target=self.read, daemon=True)
+        self.thread.start()
+
+    def read(self):
+        # the number of bytes kept of the beginning and of the end, at least one so the slices below work
+        keep = max(1, self.maxsize // 2) if self.maxsize is not None else None
+        while True:
+            chunk = os.read(self.pipe.fileno(), 65536)
+            if not chunk:
+                break
+            if self.truncated:
+                self.tail += chunk
+                del self.tail[:-keep]
+            else:
+                self.head += chunk
+                if self.maxsize is not None and len(self.head) > self.maxsize:
+                    self.truncated = True
+                    self.tail = self.head[-keep:]
+                    del self.head[keep:]
+                    if self.on_overflow is not None:
+                        self.on_overflow()
+        self.pipe.close()
+
+    def wait(self, timeout=None):
+        """ Waits (at most timeout seconds) for the end of the output. Returns whether it ended. """
+        self.thread.join(timeout)
+        return not self.thread.is_alive()
+
+    def result(self, timeout=None):
+        """ Waits (at most timeout seconds) for the end of the output and returns it (with a warning if it was truncated). """
+        self.thread.join(timeout)
+        if self.truncated:
+            return TRUNCATION_WARNING.encode() + bytes(self.head) + TRUNCATION_GAP.encode() + bytes(self.tail)
+        return bytes(self.head)
+
+
+def session_alive(sid):
+    """ Whether any (non-zombie) process of the session is still running. """
+    for proc in psutil.process_iter():
+        try:
+            if os.getsid(proc.pid) == sid and proc.status() != psutil.STATUS_ZOMBIE:
+                return True
+        except (psutil.Error, ProcessLookupError, PermissionError):
+            pass
+    return False
+
+
+def wait_for_session_end(process, seconds):
+    """ Waits (at most seconds) until all processes of the session started by process are gone. Returns whether they are. """
+    deadline = time.monotonic() + seconds
+    interval = 0.01
+    while True:
+        # reap our own child, zombies don't count
+        process.poll()
+        if not session_alive(process.pid):
+            return True
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(min(interval, max(0, deadline - time.monotonic())))
+        interval = min(interval * 2, 0.5)
+
+
+def terminate_process(process, unsafe, sudo_prefix, container_name):
+    """ Stops the process started by execute_arglist and everything it started.
+
+    The signals of settings.TEST_TERMINATION_SCHEDULE are sent to the session of the process
+    one after the other, until all processes of the session are gone. """
+    if not unsafe and settings.USESAFEDOCKER:
+        docker_kill_cmd = settings.DOCKER_COMMAND + ["kill", container_name]
+        subprocess.call(docker_kill_cmd)
+    if unsafe or not settings.USESAFEDOCKER or process.poll() is None:
+        # For Docker: in case the "docker kill didn't help"
+        # http://bencane.com/2014/04/01/understanding-the-kill-command-and-how-to-terminate-processes-in-linux/
+        for signal_name, seconds in settings.TEST_TERMINATION_SCHEDULE:
+            pkill_cmd = ["pkill", "-" + signal_name, "-s", str(process.pid)]
+            if not unsafe and settings.USEPRAKTOMATTESTER:
+                pkill_cmd = sudo_prefix + pkill_cmd
+            subprocess.call(pkill_cmd)
+            if wait_for_session_end(process, seconds):
+                return
+        if process.poll() is None:
+            #if we are here, than we retry to kill the subprocesses in an other way
+            kill_proc_tree(pid=process.pid)
+            process.kill()
+    #killpg(process.pid, signal.SIGKILL)
+
+
+def execute_arglist(args, working_directory, environment_variables={}, timeout=None, maxmem=None, fileseeklimit=None, extradirs=[], unsafe=False, error_to_output=True, filenumberlimit=128, maxlogsize=None, phase="execute"):
+    """ Wrapper to execute Commands with the praktomat testuser. Expects Command as list of arguments, the first being the executable to run.
+
+    Output longer than maxlogsize kbytes is truncated while it is read (and the command is killed if settings.TEST_KILL_ON_MAXLOGSIZE is set).
+    The time the command runs is recorded as the given phase of the current check (see utilities.timing).
+    Returns [output, error, returncode, timed_out, oom_ed, truncated]. """
     assert isinstance(args, list)
 
     command = args[:]
 
-    environment = os.environ
-    environment.update(environment_variables)
+    # checkers run in parallel threads, so don't change the environment of the process
+    environment = dict(os.environ, **environment_variables)
     if fileseeklimit is not None:
         fileseeklimitbytes = fileseeklimit * 1024
 
@@ -59,6 +224,8 @@ def execute_arglist(args, working_directory, environment_variables={}, timeout=N
         prlimit_prefix += ['--fsize=%d' % fileseeklimitbytes]
 
     command = prlimit_prefix
+    container = None
+    container_name = None
 
     if unsafe:
         pass
@@ -71,138 +238,188 @@ def execute_arglist(args, working_directory, environment_variables={}, timeout=N
         if fileseeklimit is not None:
             docker_ulimits += [f"fsize={fileseeklimitbytes}"]
 
-        safe_docker_cmd, container_name, volumes = safe_docker(
-            environment_variables=environment_variables,
-            extra_dirs=extradirs,
-            maxmem=maxmem,
-            ulimits=docker_ulimits,
-            working_directory=abspath(working_directory),
-        )
-        command += safe_docker_cmd
+        # Prefer a container of the sandbox session or a warm container from the pool over starting a new one
+        with timing.phase("container"):
+            pool = get_container_pool(abspath(working_directory), environment_variables, extradirs, maxmem, docker_ulimits)
+            container = pool.lease() if pool else None
+        with timing.phase("copy"):
+            if container and container.copies and not container.copy_in(abspath(working_directory)):
+                pool.release(container, reusable=False)
+                container = None
+
+        if container:
+            env_args = ["%s=%s" % (k, v) for k, v in environment_variables.items()]
+            command += container.exec_command(["env"] + env_args, workdir=abspath(working_directory))
+            container_name, volumes = container.name, []
+        else:
+            safe_docker_cmd, container_name, volumes = safe_docker(
+                environment_variables=environment_variables,
+                extra_dirs=extradirs,
+                maxmem=maxmem,
+                ulimits=docker_ulimits,
+                working_directory=abspath(working_directory),
+            )
+            command += safe_docker_cmd
 
     command += args[:]
 
-    # TODO: Dont even read in output longer than fileseeklimit. This might be most conveniently done by supplying a file like object instead of PIPE
-
-    process = subprocess.Popen(
-        command,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT if error_to_output else subprocess.PIPE,
-        cwd=working_directory,
-        env=environment,
-        start_new_session=True)
-
-    timed_out = False
-    oom_ed = False
-    try:
-        [output, error] = process.communicate(timeout=timeout)
-    except subprocess.TimeoutExpired:
-        timed_out = True
-		# http://bencane.com/2014/04/01/understanding-the-kill-command-and-how-to-terminate-processes-in-linux/
-        term_cmd = ["pkill", "-TERM", "-s", str(process.pid)]
-        int_cmd  = ["pkill","-INT","-s",str(process.pid)]
-        hup_cmd  = ["pkill","-HUP","-s",str(process.pid)]
-        kill_cmd = ["pkill", "-KILL", "-s", str(process.pid)]
-        if not unsafe and settings.USEPRAKTOMATTESTER:
-            term_cmd = sudo_prefix + term_cmd
-            int_cmd = sudo_prefix + int_cmd
-            hup_cmd = sudo_prefix + hup_cmd
-            kill_cmd = sudo_prefix + kill_cmd
-        if not unsafe and settings.USESAFEDOCKER:
-            docker_kill_cmd = ["sudo", "docker", "kill", container_name]
-            subprocess.call(docker_kill_cmd)
-        if unsafe or not settings.USESAFEDOCKER or process.poll() is None:
-            # For Docker: in case the "docker kill didn't help"
-            subprocess.call(term_cmd)
-            time.sleep(5)
-            subprocess.call(int_cmd)
-            time.sleep(9)
-            subprocess.call(hup_cmd)
-            time.sleep(5)
-            subprocess.call(kill_cmd)
-            time.sleep(5)
-            if process.poll() is None:
-                #if we are here, than we retry to kill the subprocesses in an other way
-                kill_proc_tree(pid=process.pid)
-                time.sleep(5)
-                process.kill()
-        [output, error] = process.communicate()
-        #killpg(process.pid, signal.SIGKILL)
+    with timing.phase(phase):
+        start = time.monotonic()
+        process = MeasuredPopen(
+            command,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT if error_to_output else subprocess.PIPE,
+            cwd=working_directory,
+            env=environment,
+            start_new_session=True)
+
+        # Both output threads (on too long output) and this thread (on timeout) may stop the process,
+        # only the first one does
+        stopping = threading.Lock()
+        stopped_by = []
+        def stop(reason):
+            with stopping:
+                if stopped_by:
+                    return
+                stopped_by.append(reason)
+            terminate_process(process, unsafe, sudo_prefix, container_name)
+
+        def kill_on_overflow():
+            if settings.TEST_KILL_ON_MAXLOGSIZE:
+                stop("overflow")
+
+        maxsize = maxlogsize * 1024 if maxlogsize is not None else None
+        output_capture = OutputCapture(process.stdout, maxsize, kill_on_overflow)
+        error_capture = None if error_to_output else OutputCapture(process.stderr, maxsize, kill_on_overflow)
+
+        captures = [capture for capture in (output_capture, error_capture) if capture is not None]
+
+        # Like communicate(timeout): one deadline for the end of the process and of its output,
+        # which background processes started by it may keep open
+        deadline = start + timeout if timeout is not None else None
+        def remaining():
+            return None if deadline is None else max(0, deadline - time.monotonic())
+
+        timed_out = False
+        oom_ed = False
+        try:
+            process.wait(timeout=remaining())
+            if not all(capture.wait(remaining()) for capture in captures):
+                raise subprocess.TimeoutExpired(command, timeout)
+        except subprocess.TimeoutExpired:
+            timed_out = True
+            stop("timeout")
+            process.wait()
+        # Processes which escaped the session may still hold the output open, don't wait for them forever
+        output_timeout = OUTPUT_GRACE_TIME if timed_out else None
+        output = output_capture.result(output_timeout)
+        error = error_capture.result(output_timeout) if error_capture else None
+        duration = time.monotonic() - start
+        killed = "overflow" in stopped_by
+
+    # The usage of the docker client says nothing about the command in the container
+    if process.rusage is not None and (unsafe or not settings.USESAFEDOCKER):
+        timing.add_usage(process.rusage.ru_utime + process.rusage.ru_stime, process.rusage.ru_maxrss)
+    truncated = output_capture.truncated or (error_capture is not None and error_capture.truncated)
 
     # These exit codes originate from the original safe-docker script
-    if not unsafe and settings.USESAFEDOCKER and not timed_out and (process.returncode == 255 or process.returncode == 137):
+    if not unsafe and settings.USESAFEDOCKER and not timed_out and not killed and (process.returncode == 255 or process.returncode == 137):
         oom_ed = True
 
-    if not unsafe and settings.USESAFEDOCKER:
-        safe_docker_cleanup(volumes)
-
-    return [output.decode('utf-8'), error, process.returncode, timed_out, oom_ed]
-
-
-def safe_docker(environment_variables, extra_dirs, maxmem, ulimits, working_directory):
-    cmd = ["sudo", "docker", "run", "--rm", "--sig-proxy",
-        "--tmpfs", "/tmp", "--tmpfs", "/run", "--tmpfs", "/home"]
-
+    metrics.observe("praktomat_command_duration_seconds", duration, phase=phase)
+    if timed_out:
+        metrics.inc("praktomat_command_timeouts_total")
+    if oom_ed:
+        metrics.inc("praktomat_command_oom_kills_total")
+
+    if container:
+        # the container was killed on timeout or too long output
+        if container.copies and not timed_out and not killed and not settings.DOCKER_DISCARD_ARTEFACTS:
+            with timing.phase("copy"):
+                container.copy_out(abspath(working_directory))
+        with timing.phase("container"):
+            pool.release(container, reusable=not (timed_out or oom_ed or killed))
+    elif not unsafe and settings.USESAFEDOCKER:
+        with timing.phase("container"):
+            safe_docker_cleanup(volumes)
+
+    # the output may have been truncated in the middle of a character
+    return [output.decode('utf-8', errors='replace' if truncated else 'strict'), error, process.returncode, timed_out, oom_ed, truncated]
+
+
+def docker_external_dir(environment_variables):
+    """ Returns the directory to mount as /external (see settings.DOCKER_CONTAINER_EXTERNAL_DIR) or None. """
+    if settings.DOCKER_CONTAINER_EXTERNAL_DIR is None:
+        return None
+    tmpl = string.Template(settings.DOCKER_CONTAINER_EXTERNAL_DIR)
+    var_id = "TASK_ID_CUSTOM"
+    if var_id not in tmpl.get_identifiers():
+        return settings.DOCKER_CONTAINER_EXTERNAL_DIR
+    task_id_custom = environment_variables.get(var_id)
+    if task_id_custom is not None and task_id_custom != "":
+        return tmpl.substitute(TASK_ID_CUSTOM=task_id_custom)
+    return None
+
+
+def add_docker_dir(path, read_only, volumes):
+    """ Returns the docker run options making path available in the container at the same path. """
     uid = os.getuid()
     gid = os.getgid()
 
-    if ":" in working_directory:
-        raise Exception("working directory contains a ':'")
-    for d in extra_dirs:
-        if ":" in d:
-            raise Exception(f"extra directory 'f{d}' contains a ':'")
-
-    volumes = []
-    def add_dir(path, read_only, volumes):
-        ro_flag = ""
-        if read_only:
-            ro_flag = ":ro"
-
-        if not exists("/.dockerenv"):
-            # Praktomat is not running in a dockerized environment
-            return [f"--volume={path}:{path}{ro_flag}"]
-
-        # Praktomat is running in a dockerized environment
-
-        if not path.endswith("/"):
-            # Add trailing slash to path
-            path += "/"
-
-        volume_name = f"tmp-{uuid.uuid4()}"
-        helper_name = f"tmp-helper-{uuid.uuid4()}"
-        subprocess.run(
-            ["sudo", "docker", "volume", "create", volume_name],
-            stdin=subprocess.DEVNULL,
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL
-        )
-        subprocess.run(
-            ["sudo", "docker", "run", "-d", f"--volume={volume_name}:{path}", "--name",
-                helper_name, "busybox", "sleep", "infinity"],
-            stdin=subprocess.DEVNULL,
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL
-        )
-        subprocess.run(
-            ["sudo", "docker", "cp", f"{path}.", f"{helper_name}:{path}"],
-            stdin=subprocess.DEVNULL,
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL
-        )
-        subprocess.run(
-            ["sudo", "docker", "exec", helper_name, "chown", "-R", f"{uid}:{gid}", path],
-            stdin=subprocess.DEVNULL,
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL
-        )
-        subprocess.run(
-            ["sudo", "docker", "kill", helper_name],
-            stdin=subprocess.DEVNULL,
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL
-        )
-        volumes += [{"container": helper_name, "dir": path, "volume": volume_name}]
-        return [f"--volume={volume_name}:{path}{ro_flag}"]
+    ro_flag = ""
+    if read_only:
+        ro_flag = ":ro"
+
+    if not exists("/.dockerenv"):
+        # Praktomat is not running in a dockerized environment
+        return [f"--volume={path}:{path}{ro_flag}"]
+
+    # Praktomat is running in a dockerized environment
+
+    if not path.endswith("/"):
+        # Add trailing slash to path
+        path += "/"
+
+    volume_name = f"tmp-{uuid.uuid4()}"
+    helper_name = f"tmp-helper-{uuid.uuid4()}"
+    subprocess.run(
+        settings.DOCKER_COMMAND + ["volume", "create", volume_name],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    subprocess.run(
+        settings.DOCKER_COMMAND + ["run", "-d", f"--volume={volume_name}:{path}", "--name",
+            helper_name, "busybox", "sleep", "infinity"],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    subprocess.run(
+        settings.DOCKER_COMMAND + ["cp", f"{path}.", f"{helper_name}:{path}"],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    subprocess.run(
+        settings.DOCKER_COMMAND + ["exec", helper_name, "chown", "-R", f"{uid}:{gid}", path],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    subprocess.run(
+        settings.DOCKER_COMMAND + ["kill", helper_name],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    volumes += [{"container": helper_name, "dir": path, "volume": volume_name}]
+    return [f"--volume={volume_name}:{path}{ro_flag}"]
+
+
+def safe_docker_options(maxmem, ulimits, extra_dirs, external_dir, volumes):
+    """ Returns the docker run options (isolation and resource limits) shared by all safe-docker containers. """
+    cmd = ["--tmpfs", "/tmp", "--tmpfs", "/run", "--tmpfs", "/home"]
 
     if settings.DOCKER_CONTAINER_HOST_NET:
         # Allow accessing the host network
@@ -218,28 +435,32 @@ def safe_docker(environment_variables, extra_dirs, maxmem, ulimits, working_dire
     cmd += [f"--memory={maxmem}m"]
     for ulimit in ulimits:
         cmd += [f"--ulimit={ulimit}"]
-    
+
     if settings.DOCKER_UID_MOD:
-        cmd += [f"--user={uid}:{gid}"]
+        cmd += [f"--user={os.getuid()}:{os.getgid()}"]
 
     for d in extra_dirs:
-        cmd += add_dir(d, True, volumes)
-
-    if settings.DOCKER_CONTAINER_EXTERNAL_DIR is not None:
-        external_dir = None
-        tmpl = string.Template(settings.DOCKER_CONTAINER_EXTERNAL_DIR)
-        var_id = "TASK_ID_CUSTOM"
-        requires_task_id_custom = var_id in tmpl.get_identifiers()
-        if requires_task_id_custom:
-            task_id_custom = environment_variables.get(var_id)
-            if task_id_custom is not None and task_id_custom != "":
-                external_dir = string.Template(settings.DOCKER_CONTAINER_EXTERNAL_DIR).substitute(TASK_ID_CUSTOM=task_id_custom)
-        else:
-            external_dir = settings.DOCKER_CONTAINER_EXTERNAL_DIR
-        if external_dir is not None:
-            cmd += [f"--volume={external_dir}:/external:ro"]
-    
-    cmd += add_dir(working_directory, False, volumes)
+        cmd += add_docker_dir(d, True, volumes)
+
+    if external_dir is not None:
+        cmd += [f"--volume={external_dir}:/external:ro"]
+
+    return cmd
+
+
+def safe_docker(environment_variables, extra_dirs, maxmem, ulimits, working_directory):
+    cmd = settings.DOCKER_COMMAND + ["run", "--rm", "--sig-proxy"]
+
+    if ":" in working_directory:
+        raise Exception("working directory contains a ':'")
+    for d in extra_dirs:
+        if ":" in d:
+            raise Exception(f"extra directory 'f{d}' contains a ':'")
+
+    volumes = []
+    cmd += safe_docker_options(maxmem, ulimits, extra_dirs, docker_external_dir(environment_variables), volumes)
+
+    cmd += add_docker_dir(working_directory, False, volumes)
     cmd += [f"--workdir={working_directory}"]
 
     container_name = f"secure-tmp-{uuid.uuid4()}"
@@ -254,27 +475,286 @@ def safe_docker(environment_variables, extra_dirs, maxmem, ulimits, working_dire
     return cmd, container_name, volumes
 
 
-def safe_docker_cleanup(volumes):
+def safe_docker_cleanup(volumes, copy_back=True):
     for volume in volumes:
         helper_name = volume["container"]
         volume_name = volume["volume"]
         path = volume["dir"]
-        if not settings.DOCKER_DISCARD_ARTEFACTS:
+        if copy_back and not settings.DOCKER_DISCARD_ARTEFACTS:
             subprocess.run(
-                ["sudo", "docker", "cp", f"{helper_name}:{path}.", path],
+                settings.DOCKER_COMMAND + ["cp", f"{helper_name}:{path}.", path],
                 stdin=subprocess.DEVNULL,
                 stdout=subprocess.DEVNULL,
                 stderr=subprocess.DEVNULL
             )
         subprocess.run(
-            ["sudo", "docker", "container", "rm", helper_name],
+            settings.DOCKER_COMMAND + ["container", "rm", helper_name],
             stdin=subprocess.DEVNULL,
             stdout=subprocess.DEVNULL,
             stderr=subprocess.DEVNULL
         )
         subprocess.run(
-            ["sudo", "docker", "volume", "rm", volume_name],
+            settings.DOCKER_COMMAND + ["volume", "rm", volume_name],
             stdin=subprocess.DEVNULL,
             stdout=subprocess.DEVNULL,
             stderr=subprocess.DEVNULL
         )
+
+
+class PooledContainer:
+    """ A started safe-docker container of a ContainerPool. """
+
+    def __init__(self, name, volumes, copies):
+        self.name = name
+        self.volumes = volumes
+        # whether working directories need to be copied into the container (instead of being mounted)
+        self.copies = copies
+        self.uses = 0
+        self.last_used = time.time()
+
+    def exec_command(self, args, interactive=False, workdir=None):
+        """ Returns the command running args in this container. """
+        cmd = settings.DOCKER_COMMAND + ["exec"]
+        if interactive:
+            cmd += ["--interactive"]
+        if workdir is not None:
+            cmd += [f"--workdir={workdir}"]
+        return cmd + [self.name] + args
+
+    def run(self, args, **kwargs):
+        """ Runs args in this container and returns whether it succeeded. """
+        return subprocess.run(
+            args,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            **kwargs
+        ).returncode == 0
+
+    def is_healthy(self):
+        return self.run(self.exec_command(["true"]), stdin=subprocess.DEVNULL, timeout=settings.DOCKER_POOL_HEALTH_CHECK_TIMEOUT)
+
+    def copy_in(self, directory):
+        """ Copies the contents of the (host) directory to the same path in the container. """
+        tar = subprocess.Popen(["tar", "-c", "-C", directory, "."], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        copied = self.run(self.exec_command(["sh", "-c", 'mkdir -p "$1" && tar -x -C "$1"', "sh", directory], interactive=True), stdin=tar.stdout)
+        tar.stdout.close()
+        return tar.wait() == 0 and copied
+
+    def copy_out(self, directory):
+        """ Copies the contents of the directory in the container back to the host. """
+        tar = subprocess.Popen(self.exec_command(["tar", "-c", "-C", directory, "."]), stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        self.run(["tar", "-x", "-C", directory], stdin=tar.stdout)
+        tar.stdout.close()
+        tar.wait()
+
+    def reset(self, reset_command):
+        """ Runs the reset command (see settings.DOCKER_POOL_RESET_COMMAND) in the container. Returns whether it succeeded. """
+        reset_command = [arg % {"sandbox": settings.SANDBOX_DIR} for arg in reset_command]
+        try:
+            return self.run(self.exec_command(reset_command), stdin=subprocess.DEVNULL, timeout=settings.DOCKER_POOL_HEALTH_CHECK_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            return False
+
+    def remove(self):
+        subprocess.run(
+            settings.DOCKER_COMMAND + ["rm", "--force", self.name],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+        safe_docker_cleanup(self.volumes, copy_back=False)
+
+
+class ContainerPool:
+    """ Started, idle safe-docker containers with the same options (image, limits and mounted directories).
+
+    execute_arglist leases a container, copies the working directory into it, executes the command
+    with "docker exec" and copies the working directory back. Afterwards the container is reset and
+    returned to the pool, which saves starting a new container for every command.
+
+    The pools of a SandboxSession mount the directory of the session into their containers (if Praktomat
+    is not running in docker itself), so it does not need to be copied. """
+
+    def __init__(self, maxmem, ulimits, extra_dirs, external_dir, directory=None):
+        self.maxmem = maxmem
+        self.ulimits = ulimits
+        self.extra_dirs = extra_dirs
+        self.external_dir = external_dir
+        self.directory = directory
+        self.idle = []
+        self.lock = threading.Lock()
+
+    def size(self):
+        """ The maximal number of idle containers. The containers of a session are kept until the session is closed. """
+        return settings.DOCKER_POOL_SIZE if self.directory is None else sys.maxsize
+
+    def start(self):
+        """ Starts a new container, returns None if that failed. """
+        volumes = []
+        name = f"secure-pool-{uuid.uuid4()}"
+        cmd = settings.DOCKER_COMMAND + ["run", "--detach", "--label", "praktomat-pool", "--name", name]
+        cmd += safe_docker_options(self.maxmem, self.ulimits, self.extra_dirs, self.external_dir, volumes)
+        copies = self.directory is None or exists("/.dockerenv")
+        if copies:
+            # the working directories are copied into the container, they need to be writable and executable
+            cmd += ["--tmpfs", f"{settings.SANDBOX_DIR}:rw,exec,mode=1777"]
+        else:
+            cmd += [f"--volume={self.directory}:{self.directory}"]
+        cmd += [settings.DOCKER_IMAGE_NAME, "sleep", "infinity"]
+        container = PooledContainer(name, volumes, copies)
+        if not container.run(cmd, stdin=subprocess.DEVNULL):
+            container.remove()
+            return None
+        return container
+
+    def warm_up(self):
+        """ Starts containers until settings.DOCKER_POOL_SIZE containers are idle. """
+        while len(self.idle) < self.size():
+            container = self.start()
+            if container is None:
+                return
+            if not self.put(container):
+                container.remove()
+                return
+
+    def put(self, container):
+        """ Adds the container to the idle containers unless the pool is full. Returns whether it was added. """
+        with self.lock:
+            if len(self.idle) < self.size():
+                self.idle.append(container)
+                return True
+        return False
+
+    def lease(self):
+        """ Returns an idle (or else a new) container for exclusive use, None if none could be started. """
+        while True:
+            with self.lock:
+                container = self.idle.pop() if self.idle else None
+            if container is None:
+                return self.start()
+            if time.time() - container.last_used < settings.DOCKER_POOL_HEALTH_CHECK_INTERVAL or container.is_healthy():
+                return container
+            container.remove()
+
+    def release(self, container, reusable=True):
+        """ Returns a leased container to the pool, or removes it if it is not reusable (any more). """
+        container.uses += 1
+        container.last_used = time.time()
+        # the directory of a session must survive the reset
+        reset_command = settings.DOCKER_POOL_RESET_COMMAND if self.directory is None else settings.DOCKER_SESSION_RESET_COMMAND
+        if reusable and container.uses < settings.DOCKER_POOL_MAX_USES and container.reset(reset_command) and self.put(container):
+            return
+        container.remove()
+
+    def shutdown(self):
+        with self.lock:
+            containers, self.idle = self.idle, []
+        for container in containers:
+            container.remove()
+
+
+_container_pools = {}
+_container_pools_lock = threading.Lock()
+
+class SandboxSession:
+    """ The safe-docker containers executing the commands in a working directory (that of a CheckerEnvironment).
+
+    Commands of the session run in containers which are started on first use and kept until the session is
+    closed, instead of in a new container per command (see ContainerPool). """
+
+    def __init__(self, directory):
+        self.directory = abspath(directory)
+        self.pools = {}
+        self.lock = threading.Lock()
+
+    def get_container_pool(self, environment_variables, extra_dirs, maxmem, ulimits):
+        """ Returns the pool of the session's containers with the given options, None if the command can not be run in the session. """
+        # The directory is already mounted
+        extra_dirs = [d for d in extra_dirs if abspath(d) != self.directory]
+        sandbox_dir = join(realpath(settings.SANDBOX_DIR), "")
+        if any(realpath(d).startswith(sandbox_dir) for d in extra_dirs):
+            return None
+        if exists("/.dockerenv") and not realpath(self.directory).startswith(sandbox_dir):
+            return None
+
+        key = (settings.DOCKER_IMAGE_NAME, maxmem, tuple(ulimits), tuple(extra_dirs), docker_external_dir(environment_variables))
+        with self.lock:
+            pool = self.pools.get(key)
+            if pool is None:
+                pool = self.pools[key] = ContainerPool(maxmem, ulimits, extra_dirs, key[-1], self.directory)
+        return pool
+
+    def close(self):
+        """ Removes the containers of this session. """
+        with _sandbox_sessions_lock:
+            if _sandbox_sessions.get(self.directory) is self:
+                del _sandbox_sessions[self.directory]
+        with self.lock:
+            pools, self.pools = list(self.pools.values()), {}
+        for pool in pools:
+            pool.shutdown()
+
+
+_sandbox_sessions = {}
+_sandbox_sessions_lock = threading.Lock()
+
+def start_sandbox_session(directory):
+    """ Starts a session, so safe-docker commands in the directory share their containers until session.close(). """
+    session = SandboxSession(directory)
+    with _sandbox_sessions_lock:
+        _sandbox_sessions[session.directory] = session
+    return session
+
+
+def get_container_pool(working_directory, environment_variables, extra_dirs, maxmem, ulimits):
+    """ Returns the container pool to execute a command in, or None if no pool can be used for it. """
+    with _sandbox_sessions_lock:
+        session = _sandbox_sessions.get(working_directory)
+    if session is not None:
+        return session.get_container_pool(environment_variables, extra_dirs, maxmem, ulimits)
+
+    if settings.DOCKER_POOL_SIZE <= 0:
+        return None
+    # The reset only cleans the writable directories, a writable root file system would keep the changes of a command
+    # for the commands of other solutions
+    if settings.DOCKER_CONTAINER_WRITABLE:
+        return None
+    # Only directories below the sandbox dir are copied into the containers, other directories need to be mounted
+    sandbox_dir = join(realpath(settings.SANDBOX_DIR), "")
+    if not realpath(working_directory).startswith(sandbox_dir):
+        return None
+    if any(realpath(d).startswith(sandbox_dir) for d in extra_dirs):
+        return None
+
+    key = (settings.DOCKER_IMAGE_NAME, maxmem, tuple(ulimits), tuple(extra_dirs), docker_external_dir(environment_variables))
+    with _container_pools_lock:
+        pool = _container_pools.get(key)
+        if pool is None:
+            pool = _container_pools[key] = ContainerPool(maxmem, ulimits, extra_dirs, key[-1])
+            threading.Thread(target=pool.warm_up, daemon=True).start()
+    return pool
+
+@atexit.register
+def shutdown_container_pools():
+    """ Removes all idle pooled containers and the containers of open sandbox sessions. """
+    with _container_pools_lock:
+        pools = list(_container_pools.values())
+        _container_pools.clear()
+    for pool in pools:
+        pool.shutdown()
+    with _sandbox_sessions_lock:
+        sessions = list(_sandbox_sessions.values())
+    for session in sessions:
+        session.close()
+
+
+def _reset_after_fork():
+    """ A forked process (e.g. a worker of the check pool) must not use the containers of its parent,
+        they may be leased (and reset) by the parent or by other workers at the same time. """
+    global _container_pools_lock, _sandbox_sessions_lock
+    _container_pools_lock = threading.Lock()
+    _container_pools.clear()
+    _sandbox_sessions_lock = threading.Lock()
+    _sandbox_sessions.clear()
+
+os.register_at_fork(after_in_child=_reset_after_fork)
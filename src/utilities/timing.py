@@ -0,0 +1,123 @@
+""" Measures how long the phases of a check take (see CheckerResult.timings and Solution.check_timings).
+
+The code running a check records into a Timings object with recording(), everything called from
+there (in the same thread) marks its phases with phase() and reports the resource usage of the
+sandboxed commands with add_usage(), without having to pass the Timings object around. """
+
+import threading
+import time
+from contextlib import contextmanager
+
+# The phases in the order they usually happen, time not spent in any phase is reported as "other"
+PHASES = ["setup", "copy", "container", "compile", "execute", "checkers", "save", "cleanup"]
+
+_local = threading.local()
+
+
+class Timings:
+    """ The durations of the phases of a checker run or a check, and the CPU time and peak memory of its sandboxed commands.
+
+    Phases may be nested, a phase only counts the time which is not spent in a nested phase.
+    The resource usage is also added to the parent (e.g. the check the checker run belongs to), which may be shared between threads. """
+
+    def __init__(self, parent=None):
+        self.parent = parent
+        self.start = time.monotonic()
+        self.phases = {}
+        self.cpu_time = None
+        self.max_rss = None
+        self._running = []
+        self._switched = self.start
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name):
+        self._switch()
+        self._running.append(name)
+        try:
+            yield
+        finally:
+            self._switch()
+            self._running.pop()
+
+    def _switch(self):
+        """ Adds the time since the last switch to the innermost running phase. """
+        now = time.monotonic()
+        if self._running:
+            name = self._running[-1]
+            self.phases[name] = self.phases.get(name, 0) + now - self._switched
+        self._switched = now
+
+    def add_usage(self, cpu_time, max_rss):
+        """ Adds the CPU time (in seconds) and the peak resident memory (in kbytes) of a finished command. """
+        with self._lock:
+            self.cpu_time = (self.cpu_time or 0) + cpu_time
+            self.max_rss = max(self.max_rss or 0, max_rss)
+        if self.parent is not None:
+            self.parent.add_usage(cpu_time, max_rss)
+
+    def total(self):
+        """ Returns the time since the start in seconds. """
+        return time.monotonic() - self.start
+
+    def as_dict(self):
+        """ Returns the timings in milliseconds (and kbytes) for storing them in a JSONField. """
+        total = self.total()
+        phases = {name: int(self.phases[name] * 1000) for name in sorted(self.phases, key=phase_order)}
+        phases["other"] = max(0, int(total * 1000) - sum(phases.values()))
+        return {
+            "total": int(total * 1000),
+            "phases": phases,
+            "cpu_time": int(self.cpu_time * 1000) if self.cpu_time is not None else None,
+            "max_rss": self.max_rss,
+        }
+
+
+def phase_order(name):
+    return PHASES.index(name) if name in PHASES else len(PHASES)
+
+
+def current():
+    """ Returns the Timings recorded into in this thread, if any. """
+    return getattr(_local, "timings", None)
+
+
+@contextmanager
+def recording(timings):
+    """ Records the phases and resource usage in this thread into timings until the end of the block. """
+    previous = current()
+    _local.timings = timings
+    try:
+        yield timings
+    finally:
+        _local.timings = previous
+
+
+@contextmanager
+def phase(name):
+    """ Marks a phase of the check recorded into in this thread (does nothing if none is recorded). """
+    timings = current()
+    if timings is None:
+        yield
+    else:
+        with timings.phase(name):
+            yield
+
+
+def add_usage(cpu_time, max_rss):
+    """ Reports the resource usage of a sandboxed command to the check recorded into in this thread. """
+    timings = current()
+    if timings is not None:
+        timings.add_usage(cpu_time, max_rss)
+
+
+def format_timings(timings):
+    """ Returns a short human readable summary of the dict returned by Timings.as_dict(). """
+    if not timings:
+        return ""
+    parts = ["%s: %d ms" % (name, duration) for name, duration in timings["phases"].items() if duration]
+    if timings.get("cpu_time") is not None:
+        parts.append("CPU time: %d ms" % timings["cpu_time"])
+    if timings.get("max_rss") is not None:
+        parts.append("peak memory: %d kB" % timings["max_rss"])
+    return "total %d ms (%s)" % (timings["total"], ", ".join(parts))
@@ -1,14 +1,19 @@
 import os, sys, mimetypes, urllib
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
+from django.db.models import Count
 from django.http import HttpResponse, Http404
-from django.shortcuts import get_object_or_404
+from django.shortcuts import get_object_or_404, render
+from django.utils.crypto import constant_time_compare
 from django.conf import settings
 from django.views.static import serve
 from django.utils.encoding import smart_str
 
 from accounts.views import access_denied
+from checker.basemodels import CheckJob
 from solutions.models import Solution
 from tasks.models import Task
+from utilities import metrics as metrics_registry
 
 def serve_unrestricted(request, path):
     return sendfile(request, path)
@@ -39,16 +44,25 @@ def serve_media_file(request, path, task_id):
     return sendfile(request, path)
 
 def sendfile(request, path):
-    """ Serve files with mod_xsendfile (http://tn123.ath.cx/mod_xsendfile/)"""
+    """ Sends the file at path (relative to settings.UPLOAD_ROOT) after the permission checks of the calling view.
+
+    The bytes are transferred by the front-end web server if settings.SENDFILE_BACKEND says so, see SENDFILE_BACKENDS. """
     filename = os.path.join(settings.UPLOAD_ROOT, path)
     if not os.path.isfile(filename):
         raise Http404
+    return SENDFILE_BACKENDS[sendfile_backend()](request, path, filename)
+
+def sendfile_backend():
+    if settings.SENDFILE_BACKEND is not None:
+        return settings.SENDFILE_BACKEND
     if 'runserver' in sys.argv or 'runserver_plus' in sys.argv or 'runconcurrentserver' in sys.argv:
         # serve with development server when not run in apache
-        return serve(request, path, document_root=settings.UPLOAD_ROOT)
+        return "python"
+    return "xsendfile"
+
+def file_response(path, filename):
+    """ An empty response with the headers describing the file, for the web server to fill in. """
     response = HttpResponse()
-    # Need to url-quote the filename for mod_xsendfile V1.0
-    response['X-Sendfile'] =  urllib.parse.quote(smart_str(filename)) if settings.MOD_XSENDFILE_V1_0 else smart_str(filename)
     content_type, encoding = mimetypes.guess_type(path)
     if not content_type:
         content_type = 'application/octet-stream'
@@ -56,8 +70,64 @@ def sendfile(request, path):
     response['Content-Length'] = os.path.getsize(filename)
     return response
 
+def sendfile_xsendfile(request, path, filename):
+    """ Serve files with mod_xsendfile (http://tn123.ath.cx/mod_xsendfile/)"""
+    response = file_response(path, filename)
+    # Need to url-quote the filename for mod_xsendfile V1.0
+    response['X-Sendfile'] =  urllib.parse.quote(smart_str(filename)) if settings.MOD_XSENDFILE_V1_0 else smart_str(filename)
+    return response
+
+def sendfile_nginx(request, path, filename):
+    """ Serve files with an internal location of nginx aliased to UPLOAD_ROOT (see settings.SENDFILE_NGINX_LOCATION) """
+    response = file_response(path, filename)
+    response['X-Accel-Redirect'] = urllib.parse.quote(smart_str(settings.SENDFILE_NGINX_LOCATION + path))
+    return response
+
+def sendfile_python(request, path, filename):
+    """ Serve files by Django itself, e.g. with the development server """
+    return serve(request, path, document_root=settings.UPLOAD_ROOT)
+
+SENDFILE_BACKENDS = {
+    "xsendfile": sendfile_xsendfile,
+    "nginx": sendfile_nginx,
+    "python": sendfile_python,
+}
+
 def forbidden(request, path):
     filename = os.path.join(settings.UPLOAD_ROOT, path)
     if not os.path.isfile(filename):
         raise Http404
     return access_denied(request)
+
+def collect_metrics():
+    """ Returns the metrics of all processes and the state of the check queue (see utilities.metrics.collect). """
+    data = metrics_registry.collect()
+    for queued in CheckJob.objects.filter(status=CheckJob.QUEUED).values('solution__task').annotate(count=Count('id')):
+        data["gauges"][metrics_registry.sample_key("praktomat_check_queue_depth", {"task": queued['solution__task']})] = queued['count']
+    return data
+
+def metrics(request):
+    """ The metrics of the checking subsystem in the Prometheus text format, for staff or with the settings.METRICS_TOKEN. """
+    authorization = request.META.get('HTTP_AUTHORIZATION', '')
+    token_given = settings.METRICS_TOKEN and constant_time_compare(authorization, "Bearer " + settings.METRICS_TOKEN)
+    if not token_given and not (request.user.is_authenticated and request.user.is_staff):
+        return HttpResponse("Forbidden\n", status=403, content_type="text/plain")
+    return HttpResponse(metrics_registry.render(collect_metrics()), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+@staff_member_required
+def metrics_dashboard(request):
+    data = collect_metrics()
+    rows = []
+    for name, (kind, description) in metrics_registry.METRICS.items():
+        samples = data["histograms" if kind == "histogram" else kind + "s"]
+        for (sample_name, labels), value in sorted(samples.items()):
+            if sample_name != name:
+                continue
+            row = {'name': name, 'description': description, 'labels': ", ".join("%s=%s" % label for label in labels)}
+            if kind == "histogram":
+                row['value'] = value['count']
+                row['mean'] = value['sum'] / value['count'] if value['count'] else None
+            else:
+                row['value'] = value
+            rows.append(row)
+    return render(request, 'admin/metrics.html', {'rows': rows, 'title': "Metrics"})
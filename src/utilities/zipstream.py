@@ -0,0 +1,90 @@
+""" Writes zip archives as a sequence of byte chunks, to send them with a StreamingHttpResponse while they are built.
+
+    zip = ZipStream()
+    def chunks():
+        yield from zip.writestr("README", "...")
+        yield from zip.write("/path/to/file", "file")
+        yield from zip.close()
+    response = StreamingHttpResponse(chunks(), content_type="application/zip")
+
+Only the entry being written is buffered (in chunks of CHUNK_SIZE), the sizes and checksums of the
+entries follow their data (zipfile does so when writing to a stream which is not seekable). """
+
+import io
+import zipfile
+
+CHUNK_SIZE = 64 * 1024
+
+
+class _Buffer(io.RawIOBase):
+    """ A write-only stream which is not seekable and collects what is written until it is taken. """
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def take(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+class ZipStream:
+    """ A zip archive written to a stream. The writing methods are generators which yield the written bytes. """
+
+    def __init__(self, compression=zipfile.ZIP_STORED):
+        self._buffer = _Buffer()
+        self._zip = zipfile.ZipFile(self._buffer, "w", compression, allowZip64=True)
+
+    def __contains__(self, name):
+        return name in self._zip.NameToInfo
+
+    def getinfo(self, name):
+        return self._zip.getinfo(name)
+
+    def _flush(self):
+        data = self._buffer.take()
+        if data:
+            yield data
+
+    def writestr(self, name, data):
+        """ Adds an entry with the given content (bytes or str). """
+        self._zip.writestr(name, data)
+        yield from self._flush()
+
+    def write(self, path, name):
+        """ Adds the file at path as an entry called name, reading it in chunks. """
+        info = zipfile.ZipInfo.from_file(path, name)
+        info.compress_type = self._zip.compression
+        with open(path, "rb") as source, self._zip.open(info, "w") as target:
+            while True:
+                data = source.read(CHUNK_SIZE)
+                if not data:
+                    break
+                target.write(data)
+                yield from self._flush()
+        yield from self._flush()
+
+    def close(self):
+        """ Writes the central directory. """
+        self._zip.close()
+        yield from self._flush()
+
+
+def zip_files(files):
+    """ Yields the chunks of a zip archive of the given (path, name) pairs. """
+    zip = ZipStream()
+    for path, name in files:
+        yield from zip.write(path, name)
+    yield from zip.close()